@@ -0,0 +1,72 @@
+"""
+Benchmark of the Airbnb JS data extraction with and without a DOM
+
+Usage: python -m benchmarks.airbnb_extraction
+"""
+import json
+import timeit
+import tracemalloc
+
+from booking_sites_parser.sources.airbnb import Airbnb
+
+
+def make_page(size: int = 3 * 1024 * 1024) -> str:
+    """
+    Make a fake listing page of about the size in bytes
+    """
+    data = {
+        'bootstrapData': {
+            'reduxData': {
+                'homePDP': {
+                    'listingInfo': {
+                        'listing': {
+                            'name': 'Benchmark listing',
+                            'photos': [{
+                                'large': 'image_{}'.format(i)
+                            } for i in range(200)],
+                        }
+                    }
+                }
+            }
+        }
+    }
+    block = '<div class="row"><span class="cell">{}</span></div>\n'
+    filler = ''.join(block.format(i) for i in range(size // 50))
+    return ('<html><head><title>Listing</title></head><body>{}'
+            '<script data-state="true">{}</script></body></html>').format(
+                filler, json.dumps(data))
+
+
+def extract(source_code: str, fast_extraction: bool) -> str:
+    """
+    Extract the listing title from the page
+    """
+    airbnb = Airbnb()
+    airbnb.fast_extraction = fast_extraction
+    airbnb.new_context()
+    airbnb.source_code = source_code
+    return airbnb.get_title()
+
+
+def main() -> None:
+    """
+    Run the benchmark
+    """
+    page = make_page()
+    print('page size: {:.1f} MB'.format(len(page) / 1024 / 1024))
+    for fast_extraction in (True, False):
+        assert extract(page, fast_extraction) == 'Benchmark listing'
+        seconds = min(
+            timeit.repeat(lambda: extract(page, fast_extraction),
+                          number=1,
+                          repeat=3))
+        tracemalloc.start()
+        extract(page, fast_extraction)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print('fast_extraction={}: {:.4f} s, peak memory {:.1f} MB'.format(
+            fast_extraction, seconds, peak / 1024 / 1024))
+
+
+if __name__ == '__main__':
+    main()
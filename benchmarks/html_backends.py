@@ -0,0 +1,81 @@
+"""
+Benchmark of the Booking.com extraction with the HTML backends
+
+Usage: python -m benchmarks.html_backends [saved_page.html ...]
+"""
+import sys
+import time
+from typing import List
+
+from booking_sites_parser.html_backends import BACKENDS
+from booking_sites_parser.sources.booking import Booking
+
+
+def make_page(rows: int = 4000) -> str:
+    """
+    Make a fake hotel page
+    """
+    block = '<div class="row"><span class="cell">{}</span><a>link</a></div>'
+    filler = '\n'.join(block.format(i) for i in range(rows))
+    photos = ''.join('<a href="/images/max400/{}.jpg"></a>'.format(i)
+                     for i in range(50))
+    facilities = ''.join(
+        '<div class="facilitiesChecklistSection"><h5>Category {}</h5>'
+        '<ul><li><span>Facility</span></li><li>Other</li></ul></div>'.format(
+            i) for i in range(30))
+    return ('<html><body>{}<h2 id="hp_hotel_name">Hotel</h2>'
+            '<div id="property_description_content">Description</div>'
+            '<p class="address"><span class="hp_address_subtitle">'
+            'Street, City, Country</span></p>'
+            '<div id="photos_distinct">{}</div>{}{}</body></html>').format(
+                filler, photos, facilities, filler)
+
+
+def extract(booking: Booking, page: str) -> None:
+    """
+    Run the Booking.com getters on the page
+    """
+    booking.new_context()
+    booking.source_code = page
+    booking.get_title()
+    booking.get_description()
+    booking.get_address()
+    booking.get_images()
+    booking.get_service_names()
+
+
+def main(pages: List[str]) -> None:
+    """
+    Run the benchmark
+    """
+    size = sum(len(p) for p in pages) / len(pages) / 1024
+    print('pages: {}, average size: {:.0f} KB'.format(len(pages), size))
+    for backend in BACKENDS:
+        for partial_parsing in (False, True):
+            booking = Booking()
+            booking.html_backend = backend
+            booking.partial_parsing = partial_parsing
+            name = '{} ({})'.format(backend,
+                                    'partial' if partial_parsing else 'full')
+            try:
+                extract(booking, pages[0])
+            except ImportError:
+                print('{:>20}: not installed'.format(name))
+                break
+            start = time.perf_counter()
+            for page in pages:
+                extract(booking, page)
+            seconds = time.perf_counter() - start
+            print('{:>20}: {:.2f} pages/s'.format(name,
+                                                  len(pages) / seconds))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        PAGES = []
+        for path in sys.argv[1:]:
+            with open(path, encoding='utf-8') as page_file:
+                PAGES.append(page_file.read())
+    else:
+        PAGES = [make_page()] * 3
+    main(PAGES)
@@ -0,0 +1,42 @@
+"""
+Benchmark of the package import time
+
+Usage: python -m benchmarks.import_time [module ...]
+"""
+import statistics
+import subprocess
+import sys
+from typing import List
+
+MODULES = ['booking_sites_parser', 'fake_useragent']
+
+
+def measure(module: str, repeat: int = 5) -> List[float]:
+    """
+    Measure the import time of the module in a fresh interpreter
+    in milliseconds
+    """
+    code = ('import time; started_at = time.perf_counter(); import {}; '
+            'print((time.perf_counter() - started_at) * 1000)').format(module)
+    return [
+        float(subprocess.check_output([sys.executable, '-c', code]))
+        for _ in range(repeat)
+    ]
+
+
+def main() -> None:
+    """
+    Run the benchmark
+    """
+    for module in sys.argv[1:] or MODULES:
+        try:
+            times = measure(module)
+        except subprocess.CalledProcessError:
+            print('{}: not installed'.format(module))
+            continue
+        print('{}: median {:.1f} ms, min {:.1f} ms'.format(
+            module, statistics.median(times), min(times)))
+
+
+if __name__ == '__main__':
+    main()
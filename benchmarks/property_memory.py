@@ -0,0 +1,44 @@
+"""
+Benchmark of the memory used by a property
+
+Usage: python -m benchmarks.property_memory [count]
+"""
+import gc
+import sys
+import tracemalloc
+from typing import Callable, List
+
+from benchmarks.serialization import make_properties
+
+
+def measure(create: Callable[[], List], count: int) -> float:
+    """
+    Measure the memory kept by the created objects per object in bytes
+    """
+    gc.collect()
+    tracemalloc.start()
+    objects = create()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(objects) == count
+    return size / count
+
+
+def main() -> None:
+    """
+    Run the benchmark
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    results = [
+        ('Property', lambda: make_properties(count)),
+        ('CompactProperty',
+         lambda: [x.to_compact() for x in make_properties(count)]),
+    ]
+    for name, create in results:
+        size = measure(create, count)
+        print('{}: {:.0f} bytes per property'.format(name, size))
+
+
+if __name__ == '__main__':
+    main()
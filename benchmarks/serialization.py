@@ -0,0 +1,65 @@
+"""
+Benchmark of the property JSON serialization
+
+Usage: python -m benchmarks.serialization
+"""
+import json
+import timeit
+from decimal import Decimal
+from typing import List
+
+from booking_sites_parser.models import Address, Property
+from booking_sites_parser.serializers import encode_properties
+from booking_sites_parser.sources.booking import Facility
+
+
+def make_properties(count: int = 2000) -> List[Property]:
+    """
+    Make the properties with all the fields filled
+    """
+    results = []
+    for i in range(count):
+        result = Property('https://www.booking.com/hotel/{}.html'.format(i))
+        result.source_id = 'booking'
+        result.title = 'Hotel {}'.format(i)
+        result.description = 'A description of the hotel. ' * 20
+        result.address = Address('Country', 'Street {}'.format(i), 'Region')
+        result.price = Decimal('{}.50'.format(i))
+        result.images = ['https://images/{}/{}.jpg'.format(i, j)
+                         for j in range(20)]
+        result.services = [Facility('General', 'Service {}'.format(j))
+                           for j in range(30)]
+        result.service_names = [x.name for x in result.services]
+        result.cancellation_policy = 'Free cancellation'
+        results.append(result)
+    return results
+
+
+def encode_generic(results: List[Property]) -> str:
+    """
+    Encode the properties with the generic __dict__ fallback
+    """
+    return json.dumps(results,
+                      default=lambda x: getattr(x, '__dict__', str(x)))
+
+
+def main() -> None:
+    """
+    Run the benchmark
+    """
+    results = make_properties()
+    encoders = [
+        ('generic __dict__', encode_generic),
+        ('to_dict + json', lambda x: encode_properties(x, use_orjson=False)),
+        ('to_dict + orjson', encode_properties),
+    ]
+    for name, encode in encoders:
+        seconds = min(timeit.repeat(lambda: encode(results),
+                                    number=5,
+                                    repeat=3)) / 5
+        print('{}: {:.1f} ms, {:.0f} properties/s'.format(
+            name, seconds * 1000, len(results) / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,21 @@
 """The initialization module for the booking-sites-parser"""
-from .models import Address, BaseSource, ParserException, Property
-from .parser import Parser
-from .sources.airbnb import Airbnb
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .models import Address, BaseSource, ParserException, Property
+    from .parser import Parser
+    from .sources.airbnb import Airbnb
+
+# the modules are imported on first access to keep the import fast
+_LAZY_ATTRIBUTES = {
+    'Parser': '.parser',
+    'Property': '.models',
+    'Address': '.models',
+    'BaseSource': '.models',
+    'Airbnb': '.sources.airbnb',
+    'ParserException': '.models',
+}
 
 __all__ = [
     'Parser',
@@ -13,3 +27,24 @@ __all__ = [
 ]
 __author__ = "webmalc"
 __version__ = "0.0.3"
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Import the public classes on first access
+    """
+    try:
+        module_name = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(
+            __name__, name))
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    """
+    List the module attributes including the lazy ones
+    """
+    return sorted(set(globals()) | set(__all__))
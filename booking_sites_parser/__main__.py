@@ -1,44 +1,182 @@
 """The entry point for the booking-sites-parser"""
 import argparse
-import json
-from typing import Iterator, List
+import itertools
+import sys
+import zlib
+from typing import TYPE_CHECKING, Iterable, Iterator, List, TextIO, Tuple
 
-from booking_sites_parser.models import Property
-from booking_sites_parser.parser import Parser
+from booking_sites_parser.serializers import (encode_properties,
+                                              encode_property)
 
+if TYPE_CHECKING:  # pragma: no cover
+    from booking_sites_parser.models import Property
+    from booking_sites_parser.router import SourceRouter
 
-def get_urls() -> List[str]:
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """
+    Parse the shard argument (i/n, where 0 <= i < n)
     """
-    Get URLs from the command line arguments
+    try:
+        index, count = (int(x) for x in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'The shard must be in the format i/n.')
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(
+            'The shard index must be from 0 to n-1.')
+    return index, count
+
+
+def get_arguments(args: List[str] = None) -> argparse.Namespace:
+    """
+    Parse the command line arguments
     """
     parser = argparse.ArgumentParser(description='Parse the provided URLs.')
-    parser.add_argument('urls', type=str, nargs='+', help='urls to parse')
-    args = parser.parse_args()
-    return args.urls
+    parser.add_argument('urls', type=str, nargs='*', help='urls to parse')
+    parser.add_argument(
+        '-i',
+        '--input',
+        type=argparse.FileType('r'),
+        help='a file with an URL per line to parse (- for stdin)')
+    parser.add_argument(
+        '--format',
+        choices=['json', 'jsonl'],
+        default='json',
+        help='json: an indented array printed when all the URLs are parsed, '
+        'jsonl: a line per property printed as soon as it is parsed')
+    parser.add_argument('--workers',
+                        type=int,
+                        default=None,
+                        help='the number of URLs to parse at once')
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=None,
+        help='the maximum number of requests per second to a domain')
+    parser.add_argument(
+        '--shard',
+        type=parse_shard,
+        default=None,
+        help='parse only the shard i of n of the URLs (i/n, 0 <= i < n)')
+    arguments = parser.parse_args(args)
+    if not arguments.urls and not arguments.input:
+        parser.error('the urls or the --input file are required')
+    return arguments
+
+
+def read_urls(stream: TextIO) -> Iterator[str]:
+    """
+    Read the URLs from the stream lazily
+    (the empty lines and the lines starting with # are skipped)
+
+    :param stream: a stream with an URL per line
+    """
+    for line in stream:
+        url = line.strip()
+        if url and not url.startswith('#'):
+            yield url
+
+
+def in_shard(url: str,
+             index: int,
+             count: int,
+             router: 'SourceRouter' = None) -> bool:
+    """
+    Check if the URL belongs to the shard
+    (the URLs of the same page get the same shard in any process)
+
+    :param url: an URL
+    :param index: the shard index
+    :param count: the number of the shards
+    :param router: the router to get the page keys of the URLs
+                   (see BaseSource.get_url_key)
+    """
+    source = router.route(url) if router else None
+    key = source.get_url_key(url) if source else url
+    return zlib.crc32(key.encode('utf-8')) % count == index
+
+
+def get_urls(arguments: argparse.Namespace = None) -> Iterator[str]:
+    """
+    Get URLs from the command line arguments and the input file
+
+    :param arguments: the parsed arguments (from sys.argv by default)
+    """
+    arguments = arguments or get_arguments()
+    urls: Iterable[str] = arguments.urls
+    if arguments.input:
+        urls = itertools.chain(urls, read_urls(arguments.input))
+    if arguments.shard:
+        # imported here, so --help does not load the sources
+        from booking_sites_parser.registry import create_sources
+        from booking_sites_parser.router import SourceRouter
+
+        index, count = arguments.shard
+        router = SourceRouter(create_sources())
+        urls = (x for x in urls if in_shard(x, index, count, router))
+    return iter(urls)
 
 
-def parse_urls(urls: List[str]) -> Iterator[Property]:
+def parse_urls(urls: Iterable[str],
+               workers: int = None,
+               rate: float = None) -> Iterator['Property']:
     """
     Parse the provided URLs.
+
+    :param urls: the URLs to parse
+    :param workers: the number of URLs to parse at once
+    :param rate: the maximum number of requests per second to a domain
     """
+    # imported here, so --help does not load the parser dependencies
+    from booking_sites_parser.http_client import HttpClient
+    from booking_sites_parser.parser import Parser
+    from booking_sites_parser.rate_limiter import DomainRateLimiter
+
     parser = Parser()
-    return parser.parse(urls)
+    if rate:
+        parser.set_http_client(
+            HttpClient(
+                rate_limiter=DomainRateLimiter(rate=rate, max_rate=rate)))
+    return parser.parse(urls, workers=workers)
 
 
-def json_encode(results: Iterator[Property], indent=None) -> str:
+def json_encode(results: Iterator['Property'], indent=None) -> str:
     """
     Parse the results
     """
-    return json.dumps(list(results),
-                      indent=indent,
-                      default=lambda x: getattr(x, '__dict__', str(x)))
+    return encode_properties(results, indent)
+
+
+def write_jsonl(results: Iterable['Property'],
+                stream: TextIO = None) -> int:
+    """
+    Write the results as JSON Lines flushing each line
+
+    :param results: the properties to write
+    :param stream: the output stream (stdout by default)
+    :return: the number of the written lines
+    """
+    stream = stream or sys.stdout
+    count = 0
+    for result in results:
+        stream.write(encode_property(result) + '\n')
+        stream.flush()
+        count += 1
+    return count
 
 
 def run():
     """
     Run the main code
     """
-    print(json_encode(parse_urls(get_urls()), indent=4))
+    args = get_arguments()
+    results = parse_urls(get_urls(args), args.workers, args.rate)
+    if args.format == 'jsonl':
+        write_jsonl(results)
+    else:
+        # orjson supports only the 2 spaces indentation
+        print(json_encode(results, indent=2))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,240 @@
+"""
+Asynchronous HTTP client
+"""
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple, Union
+
+from .http_cache import HttpCache
+from .http_client import (BaseHttpResponse, CircuitBreakers, HttpClient,
+                          HttpClientStats, HttpResponse, RetryPolicy,
+                          _get_cached, _update_cache)
+from .rate_limiter import DomainRateLimiter
+from .user_agents import UserAgentPool
+
+
+def _import_aiohttp() -> Any:
+    """
+    Import aiohttp on first use (it takes longer than the whole package)
+    """
+    try:
+        import aiohttp
+    except ImportError:  # pragma: no cover
+        raise ImportError('The aiohttp package is required '
+                          'for the asynchronous HTTP client.')
+    return aiohttp
+
+
+class BaseAsyncHttpClient(ABC):
+    """
+    Base class for making asynchronous HTTP requests
+    """
+
+    @abstractmethod
+    async def get(self, url: str,
+                  use_cache: bool = True) -> BaseHttpResponse:
+        """
+        Make GET request
+        :param url: a requested URL
+        :param use_cache: use the response cache (if the client has one)
+        """
+
+
+class AsyncHttpClient(BaseAsyncHttpClient):
+    """
+    Class for making asynchronous HTTP requests
+
+    The client keeps a session with a pool of keep-alive connections
+    for each event loop it is used in. It requires the aiohttp package
+    (pip install booking-sites-parser[async]).
+    """
+
+    headers = HttpClient.headers
+
+    def __init__(
+            self,
+            limit: int = 100,
+            limit_per_host: int = 10,
+            keepalive_timeout: float = 15,
+            timeout: Union[float, Tuple[float, float]] = (5, 30),
+            retry_policy: RetryPolicy = None,
+            failure_threshold: int = 5,
+            recovery_timeout: float = 30,
+            rate_limiter: DomainRateLimiter = None,
+            cache: HttpCache = None,
+            user_agents: UserAgentPool = None,
+    ) -> None:
+        """
+        Class constructor
+        :param limit: the maximum number of the open connections
+        :param limit_per_host: the maximum number of connections per host
+        :param keepalive_timeout: how long to keep an idle connection open
+        :param timeout: the connect and read timeouts in seconds
+        :param retry_policy: the policy of retrying the failed requests
+        :param failure_threshold: the number of consecutive failures
+                                  to stop requesting a domain
+        :param recovery_timeout: how long to stop requesting a domain
+        :param rate_limiter: the per-domain rate limiter (no limits if None)
+        :param cache: the persistent response cache (no caching if None)
+        :param user_agents: the pool of the user agents to send
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breakers = CircuitBreakers(failure_threshold,
+                                                recovery_timeout)
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.user_agents = user_agents or UserAgentPool()
+        self.stats = HttpClientStats()
+        self._sessions: Dict[asyncio.AbstractEventLoop, Any] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> Any:
+        """
+        Get the session of the running event loop (created on first use)
+
+        The sessions of the closed loops are dropped, their connections
+        can not be closed without their loops (close the client
+        before its loop is closed).
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._sessions.get(loop)
+            if session is None or session.closed:
+                self._sessions = {
+                    key: value
+                    for key, value in self._sessions.items()
+                    if not key.is_closed()
+                }
+                session = self._sessions[loop] = self._create_session()
+        return session
+
+    def _create_session(self) -> Any:
+        """
+        Create a session with the configured connection pool
+        """
+        aiohttp = _import_aiohttp()
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_connection_create_end(*_args):
+            self.stats.add_connection()
+
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        connect_timeout, read_timeout = self.timeout if isinstance(
+            self.timeout, tuple) else (self.timeout, self.timeout)
+        return aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            trace_configs=[trace_config],
+            timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout,
+                                          sock_read=read_timeout),
+        )
+
+    @property
+    def rates(self) -> Dict[str, float]:
+        """
+        The current number of requests per second to each domain
+        """
+        return self.rate_limiter.rates if self.rate_limiter else {}
+
+    async def close(self) -> None:
+        """
+        Close the session of the running event loop and its connections
+        """
+        with self._lock:
+            session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+    async def get(self, url: str, use_cache: bool = True) -> HttpResponse:
+        """
+        Make GET request
+        :param url: a requested URL
+        :param use_cache: use the response cache (if the client has one)
+        """
+        aiohttp = _import_aiohttp()
+        cache = self.cache if use_cache else None
+        cached, entry = _get_cached(cache, url)
+        if cached:
+            return cached
+        headers = entry.get_conditional_headers() if entry else {}
+        breaker = self.circuit_breakers.get(url)
+        if not breaker.allow_request():
+            return HttpResponse(
+                error='The circuit breaker of the domain is open.')
+        attempt = 0
+        try:
+            while True:
+                result = await self._send(url, headers)
+                if not self.retry_policy.should_retry(result, attempt):
+                    break
+                await asyncio.sleep(
+                    self.retry_policy.get_backoff(
+                        attempt, result.headers.get('retry-after')))
+                attempt += 1
+        except (aiohttp.InvalidURL, ValueError) as error:
+            # the request itself is invalid, so it is not retried
+            breaker.release_trial()
+            return HttpResponse(error='{}: {}'.format(
+                type(error).__name__, error))
+        except BaseException:
+            # e.g. the task has been cancelled
+            breaker.release_trial()
+            raise
+        if self.retry_policy.is_failure(result):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return _update_cache(cache, url, entry, result)
+
+    def _record_rate(self, url: str, status_code: Optional[int],
+                     started_at: float) -> None:
+        """
+        Pass the result of a request to the rate limiter
+        """
+        if self.rate_limiter:
+            self.rate_limiter.record(url, status_code,
+                                     time.monotonic() - started_at)
+
+    async def _send(self, url: str,
+                    extra_headers: Dict[str, str]) -> HttpResponse:
+        """
+        Make a single GET request
+
+        :param url: a requested URL
+        :param extra_headers: the headers to add to the default ones
+        """
+        aiohttp = _import_aiohttp()
+        if self.rate_limiter:
+            delay = self.rate_limiter.reserve(url)
+            if delay:
+                await asyncio.sleep(delay)
+        started_at = time.monotonic()
+        try:
+            headers = dict(extra_headers)
+            headers['user-agent'] = self.user_agents.get()
+            async with self.session.get(url, headers=headers) as response:
+                result = HttpResponse(response.status,
+                                      ok=response.status < 400,
+                                      headers=response.headers,
+                                      content=await response.read())
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            if isinstance(error, aiohttp.InvalidURL):
+                raise
+            self._record_rate(url, None, started_at)
+            return HttpResponse(error='{}: {}'.format(
+                type(error).__name__, error))
+        self._record_rate(url, result.status_code, started_at)
+        self.stats.add_request()
+        return result
@@ -0,0 +1,281 @@
+"""
+Columnar batches of the parsed properties
+
+The columns follow the Arrow layout, so the writers can pass them
+to pyarrow without converting the rows (pip install
+booking-sites-parser[arrow]).
+"""
+import math
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .models import Property
+
+
+def _import_pyarrow() -> Any:
+    """
+    Import pyarrow on first use
+    """
+    try:
+        import pyarrow
+    except ImportError:  # pragma: no cover
+        raise ImportError('The pyarrow package is required '
+                          'for the Arrow and Parquet writers.')
+    return pyarrow
+
+
+class DictionaryColumn():
+    """
+    Dictionary-encoded column of strings
+    (the indices of the values in the dictionary, -1 for null)
+    """
+
+    def __init__(self) -> None:
+        """
+        Class constructor
+        """
+        self.indices = array('i')
+        self.dictionary: List[str] = []
+        self._positions: Dict[str, int] = {}
+
+    def append(self, value: Optional[str]) -> None:
+        """
+        Append a value to the column
+        """
+        if value is None:
+            self.indices.append(-1)
+            return
+        position = self._positions.get(value)
+        if position is None:
+            position = self._positions[value] = len(self.dictionary)
+            self.dictionary.append(value)
+        self.indices.append(position)
+
+    def to_pylist(self) -> List[Optional[str]]:
+        """
+        Decode the column
+        """
+        return [self.dictionary[i] if i >= 0 else None for i in self.indices]
+
+    def to_arrow(self) -> Any:
+        """
+        Convert the column to an Arrow dictionary array
+        """
+        pyarrow = _import_pyarrow()
+        indices = pyarrow.array(self.indices,
+                                type=pyarrow.int32(),
+                                mask=[i < 0 for i in self.indices])
+        return pyarrow.DictionaryArray.from_arrays(
+            indices, pyarrow.array(self.dictionary, type=pyarrow.string()))
+
+
+class ListColumn():
+    """
+    Column of string lists (the offsets of the rows in the flat values)
+    """
+
+    def __init__(self) -> None:
+        """
+        Class constructor
+        """
+        self.offsets = array('q', [0])
+        self.values: List[str] = []
+
+    def append(self, values: Optional[Iterable[str]]) -> None:
+        """
+        Append a list to the column (an empty one for None)
+        """
+        if values:
+            self.values.extend(values)
+        self.offsets.append(len(self.values))
+
+    def to_pylist(self) -> List[List[str]]:
+        """
+        Decode the column
+        """
+        return [
+            self.values[start:end]
+            for start, end in zip(self.offsets, self.offsets[1:])
+        ]
+
+    def to_arrow(self) -> Any:
+        """
+        Convert the column to an Arrow list array
+        """
+        pyarrow = _import_pyarrow()
+        return pyarrow.LargeListArray.from_arrays(
+            pyarrow.array(self.offsets, type=pyarrow.int64()),
+            pyarrow.array(self.values, type=pyarrow.string()))
+
+
+class PropertyBatch():
+    """
+    Columnar batch of the properties
+
+    The price (as float64) and the maximum guests are numeric arrays
+    with NaN and -1 for null. The source ID, the country and the region
+    are dictionary encoded. The images and the service names are stored
+    as offsets and flat values.
+    """
+
+    dictionary_columns = ('source_id', 'country', 'region')
+    list_columns = ('images', 'service_names')
+
+    def __init__(self) -> None:
+        """
+        Class constructor
+        """
+        self.url: List[str] = []
+        self.title: List[Optional[str]] = []
+        self.description: List[Optional[str]] = []
+        self.cancellation_policy: List[Optional[str]] = []
+        self.address: List[Optional[str]] = []
+        self.price = array('d')
+        self.max_guests = array('q')
+        self.source_id = DictionaryColumn()
+        self.country = DictionaryColumn()
+        self.region = DictionaryColumn()
+        self.images = ListColumn()
+        self.service_names = ListColumn()
+
+    def __len__(self) -> int:
+        """
+        The number of the properties in the batch
+        """
+        return len(self.url)
+
+    def append(self, result: Property) -> None:
+        """
+        Append a property to the batch
+        """
+        self.url.append(result.url)
+        self.title.append(result.title)
+        self.description.append(result.description)
+        self.cancellation_policy.append(result.cancellation_policy)
+        address = result.address
+        self.address.append(address.address if address else None)
+        self.country.append(address.country if address else None)
+        self.region.append(address.region if address else None)
+        self.price.append(
+            float(result.price) if result.price is not None else math.nan)
+        self.max_guests.append(
+            result.max_guests if result.max_guests is not None else -1)
+        self.source_id.append(result.source_id)
+        self.images.append(result.images)
+        self.service_names.append(result.service_names)
+
+    @classmethod
+    def create_from_properties(
+            cls, results: Iterable[Property]) -> 'PropertyBatch':
+        """
+        Create a batch from the properties
+        """
+        batch = cls()
+        for result in results:
+            batch.append(result)
+        return batch
+
+    @property
+    def column_names(self) -> Sequence[str]:
+        """
+        The names of the columns in the Arrow layout
+        """
+        return ('url', 'source_id', 'title', 'description', 'address',
+                'region', 'country', 'price', 'max_guests', 'images',
+                'service_names', 'cancellation_policy')
+
+    def to_arrow(self) -> Any:
+        """
+        Convert the batch to an Arrow record batch
+        """
+        pyarrow = _import_pyarrow()
+        columns = {
+            'url': pyarrow.array(self.url, type=pyarrow.string()),
+            'title': pyarrow.array(self.title, type=pyarrow.string()),
+            'description': pyarrow.array(self.description,
+                                         type=pyarrow.string()),
+            'address': pyarrow.array(self.address, type=pyarrow.string()),
+            'cancellation_policy': pyarrow.array(self.cancellation_policy,
+                                                 type=pyarrow.string()),
+            'price': pyarrow.array(self.price,
+                                   type=pyarrow.float64(),
+                                   from_pandas=True),
+            'max_guests': pyarrow.array(self.max_guests,
+                                        type=pyarrow.int64(),
+                                        mask=[x < 0
+                                              for x in self.max_guests]),
+        }
+        for name in self.dictionary_columns + self.list_columns:
+            columns[name] = getattr(self, name).to_arrow()
+        return pyarrow.RecordBatch.from_arrays(
+            [columns[x] for x in self.column_names],
+            names=list(self.column_names))
+
+
+def iter_batches(results: Iterable[Property],
+                 batch_size: int = 1000) -> Iterable[PropertyBatch]:
+    """
+    Group the properties into the columnar batches
+
+    :param results: the properties
+    :param batch_size: the maximum number of the properties in a batch
+    """
+    batch = PropertyBatch()
+    for result in results:
+        batch.append(result)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = PropertyBatch()
+    if len(batch):
+        yield batch
+
+
+def write_parquet(batches: Iterable[PropertyBatch], path: str) -> int:
+    """
+    Write the batches to a Parquet file
+
+    :param batches: the batches to write
+    :param path: the file path
+    :return: the number of the written properties
+    """
+    _import_pyarrow()
+    from pyarrow import parquet
+
+    count = 0
+    writer = None
+    try:
+        for batch in batches:
+            record_batch = batch.to_arrow()
+            if writer is None:
+                writer = parquet.ParquetWriter(path, record_batch.schema)
+            writer.write_batch(record_batch)
+            count += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def write_arrow(batches: Iterable[PropertyBatch], path: str) -> int:
+    """
+    Write the batches to an Arrow IPC stream file
+    (each batch has its own dictionaries)
+
+    :param batches: the batches to write
+    :param path: the file path
+    :return: the number of the written properties
+    """
+    pyarrow = _import_pyarrow()
+    count = 0
+    writer = None
+    try:
+        for batch in batches:
+            record_batch = batch.to_arrow()
+            if writer is None:
+                writer = pyarrow.ipc.new_stream(path, record_batch.schema)
+            writer.write_batch(record_batch)
+            count += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
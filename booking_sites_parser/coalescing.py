@@ -0,0 +1,155 @@
+"""
+Coalescing of the duplicate requests
+
+The calls with the same key share one execution: the concurrent callers
+wait for the running call, and the recent results are remembered,
+so the later duplicates are not executed at all.
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import (Any, Awaitable, Callable, Dict, Hashable, Optional,
+                    TypeVar)
+
+T = TypeVar('T')
+
+
+class CoalescerStats():
+    """
+    Statistics of the request coalescer
+    """
+
+    def __init__(self) -> None:
+        """
+        Class constructor
+        """
+        self.calls = 0
+        self.coalesced = 0
+        self.reused = 0
+
+    def __str__(self) -> str:
+        """
+        Return a stats summary
+        """
+        return 'calls: {}, coalesced: {}, reused: {}'.format(
+            self.calls, self.coalesced, self.reused)
+
+
+class RequestCoalescer():
+    """
+    Coalescer sharing the result of a call between the callers
+    with the same key (single flight)
+
+    The exceptions are shared with the concurrent callers only,
+    they are not remembered.
+    """
+
+    def __init__(self, max_results: int = 10000) -> None:
+        """
+        Class constructor
+        :param max_results: the number of the recent results to remember
+                            (0 to share the running calls only)
+        """
+        self.max_results = max_results
+        self.stats = CoalescerStats()
+        self._results: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._calls: Dict[Hashable, Future] = {}
+        self._async_calls: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def _get_result(self, key: Hashable) -> Optional[list]:
+        """
+        Get the remembered result of the key as a list (None if it is absent)
+        """
+        if key not in self._results:
+            return None
+        self._results.move_to_end(key)
+        self.stats.reused += 1
+        return [self._results[key]]
+
+    def _remember(self, key: Hashable, result: Any) -> None:
+        """
+        Remember the result of the key (the least recent ones are forgotten)
+        """
+        if not self.max_results:
+            return
+        self._results[key] = result
+        if len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+
+    def call(self, key: Hashable, function: Callable[..., T], *args: Any,
+             **kwargs: Any) -> T:
+        """
+        Call the function or get the result of the call with the same key
+
+        :param key: the key of the call
+        :param function: the function to call
+        """
+        with self._lock:
+            remembered = self._get_result(key)
+            if remembered is not None:
+                return remembered[0]
+            future = self._calls.get(key)
+            leader = future is None
+            if future is None:
+                future = self._calls[key] = Future()
+                self.stats.calls += 1
+            else:
+                self.stats.coalesced += 1
+        if not leader:
+            return future.result()
+        try:
+            result = function(*args, **kwargs)
+        except BaseException as error:
+            with self._lock:
+                del self._calls[key]
+            future.set_exception(error)
+            raise
+        with self._lock:
+            del self._calls[key]
+            self._remember(key, result)
+        future.set_result(result)
+        return result
+
+    async def acall(self, key: Hashable,
+                    function: Callable[..., Awaitable[T]], *args: Any,
+                    **kwargs: Any) -> T:
+        """
+        Await the coroutine function or the call with the same key
+        on the running event loop
+
+        :param key: the key of the call
+        :param function: the coroutine function to call
+        """
+        with self._lock:
+            remembered = self._get_result(key)
+            if remembered is not None:
+                return remembered[0]
+            future = self._async_calls.get(key)
+            leader = future is None
+            if future is None:
+                future = asyncio.get_running_loop().create_future()
+                self._async_calls[key] = future
+                self.stats.calls += 1
+            else:
+                self.stats.coalesced += 1
+        if not leader:
+            return await asyncio.shield(future)
+        try:
+            result = await function(*args, **kwargs)
+        except BaseException as error:
+            with self._lock:
+                del self._async_calls[key]
+            if isinstance(error, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(error)
+                # the error is raised by the leader even without waiters
+                future.exception()
+            raise
+        with self._lock:
+            del self._async_calls[key]
+            self._remember(key, result)
+        future.set_result(result)
+        return result
@@ -0,0 +1,78 @@
+"""
+Content types and encodings of the HTTP responses
+
+The encoding of a body is taken from its declaration only,
+so the bodies are never scanned to detect it.
+"""
+import codecs
+import re
+from typing import Optional, Union
+
+JSON_TYPES = frozenset(('application/json', 'text/json'))
+CHARSET_PATTERN = re.compile(r'charset\s*=\s*([^\s;]+)', re.I)
+# the encoding of a HTML page is declared in its first 1024 bytes
+META_PRESCAN_SIZE = 1024
+META_CHARSET_PATTERN = re.compile(
+    br'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+
+
+def get_media_type(content_type: Optional[str]) -> str:
+    """
+    Get the lowercase media type of the Content-Type header
+
+    :param content_type: the header value
+    """
+    return (content_type or '').split(';', 1)[0].strip().lower()
+
+
+def is_json_type(media_type: str) -> bool:
+    """
+    Check if the media type is JSON (application/json, */*+json)
+
+    :param media_type: the media type without the parameters
+    """
+    return media_type in JSON_TYPES or media_type.endswith('+json')
+
+
+def _lookup_encoding(name: Union[str, bytes, None]) -> Optional[str]:
+    """
+    Get the codec name of the encoding or None if it is unknown
+    """
+    if isinstance(name, bytes):
+        name = name.decode('ascii', 'ignore')
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.strip().strip('"\'')).name
+    except LookupError:
+        return None
+
+
+def get_encoding(content_type: Optional[str],
+                 content: bytes = b'') -> Optional[str]:
+    """
+    Get the declared encoding of the body without detecting it
+    (the charset of the Content-Type header or the meta tag of a HTML page)
+
+    :param content_type: the Content-Type header value
+    :param content: the raw body
+    """
+    match = CHARSET_PATTERN.search(content_type or '')
+    if match:
+        return _lookup_encoding(match.group(1))
+    media_type = get_media_type(content_type)
+    if content and (not media_type or 'html' in media_type):
+        meta_match = META_CHARSET_PATTERN.search(content[:META_PRESCAN_SIZE])
+        if meta_match:
+            return _lookup_encoding(meta_match.group(1))
+    return None
+
+
+def decode(content: bytes, encoding: Optional[str] = None) -> str:
+    """
+    Decode the body with the encoding (UTF-8 if it is not declared)
+
+    :param content: the raw body
+    :param encoding: the declared encoding
+    """
+    return content.decode(encoding or 'utf-8', 'replace')
@@ -0,0 +1,355 @@
+"""
+HTML parser backends
+"""
+import re
+from abc import ABC, abstractmethod
+from typing import (Any, Callable, Dict, Iterable, List, Optional, Sequence,
+                    Union)
+
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+
+
+class HtmlElement(ABC):
+    """
+    Base class representing an HTML element of a document
+    """
+
+    @property
+    @abstractmethod
+    def text(self) -> str:
+        """
+        The text of the element and its descendants
+        """
+
+    @abstractmethod
+    def get(self, name: str, default: str = None) -> Optional[str]:
+        """
+        Get an attribute value of the element
+
+        :param name: the attribute name
+        :param default: the value to return if the attribute is not found
+        """
+
+    @abstractmethod
+    def select_one(self, selector: str) -> Optional['HtmlElement']:
+        """
+        Get the first descendant element matching the CSS selector
+        """
+
+    @abstractmethod
+    def select(self, selector: str) -> List['HtmlElement']:
+        """
+        Get the descendant elements matching the CSS selector
+        """
+
+    def __getitem__(self, name: str) -> str:
+        """
+        Get an attribute value of the element
+        """
+        value = self.get(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+
+class SoupElement(HtmlElement):
+    """
+    BeautifulSoup HTML element
+    """
+
+    def __init__(self, element: Any) -> None:
+        """
+        Class constructor
+
+        :param element: a BeautifulSoup tag
+        """
+        self.element = element
+
+    @property
+    def text(self) -> str:
+        """
+        The text of the element and its descendants
+        """
+        return self.element.text
+
+    def get(self, name: str, default: str = None) -> Optional[str]:
+        """
+        Get an attribute value of the element
+        """
+        value = self.element.get(name, default)
+        if isinstance(value, list):
+            return ' '.join(value)
+        return value
+
+    def select_one(self, selector: str) -> Optional[HtmlElement]:
+        """
+        Get the first descendant element matching the CSS selector
+        """
+        element = self.element.select_one(selector)
+        return SoupElement(element) if element is not None else None
+
+    def select(self, selector: str) -> List[HtmlElement]:
+        """
+        Get the descendant elements matching the CSS selector
+        """
+        return [SoupElement(e) for e in self.element.select(selector)]
+
+
+class SelectolaxElement(HtmlElement):
+    """
+    Selectolax (lexbor) HTML element
+    """
+
+    def __init__(self, node: Any) -> None:
+        """
+        Class constructor
+
+        :param node: a selectolax node
+        """
+        self.node = node
+
+    @property
+    def text(self) -> str:
+        """
+        The text of the element and its descendants
+        """
+        return self.node.text()
+
+    def get(self, name: str, default: str = None) -> Optional[str]:
+        """
+        Get an attribute value of the element
+        """
+        value = self.node.attributes.get(name, default)
+        return default if value is None else value
+
+    def select_one(self, selector: str) -> Optional[HtmlElement]:
+        """
+        Get the first descendant element matching the CSS selector
+        """
+        node = self.node.css_first(selector)
+        return SelectolaxElement(node) if node is not None else None
+
+    def select(self, selector: str) -> List[HtmlElement]:
+        """
+        Get the descendant elements matching the CSS selector
+        """
+        return [SelectolaxElement(n) for n in self.node.css(selector)]
+
+
+class HtmlDocument():
+    """
+    A parsed HTML document
+    """
+
+    def __init__(self, tree: Any, root: HtmlElement) -> None:
+        """
+        Class constructor
+
+        :param tree: the native tree of the backend
+        :param root: the root element of the document
+        """
+        self.tree = tree
+        self.root = root
+
+    def select_one(self, selector: str) -> Optional[HtmlElement]:
+        """
+        Get the first element matching the CSS selector
+        """
+        return self.root.select_one(selector)
+
+    def select(self, selector: str) -> List[HtmlElement]:
+        """
+        Get the elements matching the CSS selector
+        """
+        return self.root.select(selector)
+
+
+class SelectorRoot():
+    """
+    The first compound (tag#id.class) of a CSS selector
+    """
+    pattern = re.compile(r'^(?P<tag>[a-zA-Z][\w-]*|\*)?'
+                         r'(?P<rest>(?:[#.][\w-]+)*)$')
+
+    def __init__(self, tag: str = None, element_id: str = None,
+                 classes: Iterable[str] = ()) -> None:
+        """
+        Class constructor
+
+        :param tag: the tag name
+        :param element_id: the element id
+        :param classes: the element classes
+        """
+        self.tag = tag
+        self.element_id = element_id
+        self.classes = frozenset(classes)
+
+    @classmethod
+    def create_from_selector(cls, selector: str) -> Optional['SelectorRoot']:
+        """
+        Create a selector root from a CSS selector
+        or return None if the selector is not supported
+
+        :param selector: a CSS selector
+        """
+        compound = re.split(r'[\s>+~]+', selector.strip(), maxsplit=1)[0]
+        match = cls.pattern.match(compound)
+        if not compound or not match:
+            return None
+        tag = match.group('tag')
+        parts = re.findall(r'([#.])([\w-]+)', match.group('rest'))
+        ids = [value for kind, value in parts if kind == '#']
+        if len(ids) > 1 or (not tag and not parts):
+            return None
+        return cls(
+            tag if tag != '*' else None,
+            ids[0] if ids else None,
+            [value for kind, value in parts if kind == '.'],
+        )
+
+    def matches(self, name: str, attrs: Optional[Dict[str, Any]]) -> bool:
+        """
+        Check if a start tag matches the selector root
+
+        :param name: the tag name
+        :param attrs: the tag attributes
+        """
+        attrs = attrs or {}
+        if self.tag and self.tag != name:
+            return False
+        if self.element_id and attrs.get('id') != self.element_id:
+            return False
+        if self.classes:
+            classes = attrs.get('class') or ''
+            if isinstance(classes, str):
+                classes = classes.split()
+            if not self.classes.issubset(classes):
+                return False
+        return True
+
+
+class SelectorStrainer(SoupStrainer):
+    """
+    A strainer keeping only the subtrees of the elements
+    matching the first compounds of the CSS selectors
+    """
+
+    def __init__(self, roots: Sequence[SelectorRoot]) -> None:
+        """
+        Class constructor
+
+        :param roots: the selector roots to keep
+        """
+        super().__init__()
+        self.roots = roots
+
+    @classmethod
+    def create_from_selectors(
+            cls, selectors: Iterable[str]) -> Optional['SelectorStrainer']:
+        """
+        Create a strainer from the CSS selectors or return None
+        if any of the selectors is not supported
+
+        :param selectors: CSS selectors
+        """
+        roots = []
+        for selector in selectors:
+            for part in selector.split(','):
+                root = SelectorRoot.create_from_selector(part)
+                if root is None:
+                    return None
+                roots.append(root)
+        return cls(roots) if roots else None
+
+    def matches_start_tag(self, name: str,
+                          attrs: Optional[Dict[str, Any]]) -> bool:
+        """
+        Check if a start tag matches any of the selector roots
+        """
+        return any(root.matches(name, attrs) for root in self.roots)
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        """
+        Check if a tag should be kept (beautifulsoup4 >= 4.13)
+        """
+        return self.matches_start_tag(name, attrs)
+
+    def search_tag(self, markup_name=None, markup_attrs=None) -> bool:
+        """
+        Check if a tag should be kept (beautifulsoup4 < 4.13)
+        """
+        return self.matches_start_tag(markup_name, markup_attrs)
+
+
+def _soup_backend(features: str, strainable: bool = True) -> Callable:
+    """
+    Create a BeautifulSoup backend with the tree builder
+    """
+
+    def _create(source_code: Union[str, bytes],
+                parse_only: Sequence[str] = None,
+                encoding: str = None) -> HtmlDocument:
+        strainer = None
+        if parse_only and strainable:
+            strainer = SelectorStrainer.create_from_selectors(parse_only)
+        kwargs: Dict[str, Any] = {}
+        if isinstance(source_code, bytes):
+            # try the declared encoding before detecting it
+            kwargs['from_encoding'] = encoding or 'utf-8'
+        try:
+            soup = BeautifulSoup(source_code,
+                                 features,
+                                 parse_only=strainer,
+                                 **kwargs)
+        except FeatureNotFound:
+            raise ImportError(
+                'The {} package is required for the HTML backend.'.format(
+                    features))
+        return HtmlDocument(soup, SoupElement(soup))
+
+    return _create
+
+
+def _selectolax_backend(source_code: Union[str, bytes],
+                        _parse_only: Sequence[str] = None,
+                        encoding: str = None) -> HtmlDocument:
+    """
+    Create a selectolax (lexbor) document
+    (the bytes are passed as they are if they are UTF-8,
+    the whole page is always parsed)
+    """
+    from selectolax.lexbor import LexborHTMLParser
+
+    if isinstance(source_code, bytes) and encoding not in (None, 'utf-8'):
+        source_code = source_code.decode(encoding, 'replace')
+
+    tree = LexborHTMLParser(source_code)
+    return HtmlDocument(tree, SelectolaxElement(tree.root))
+
+
+BACKENDS: Dict[str, Callable[..., HtmlDocument]] = {
+    'html.parser': _soup_backend('html.parser'),
+    'lxml': _soup_backend('lxml'),
+    'html5lib': _soup_backend('html5lib', strainable=False),
+    'selectolax': _selectolax_backend,
+}
+
+
+def create_document(source_code: Union[str, bytes],
+                    backend: str = 'html.parser',
+                    parse_only: Sequence[str] = None,
+                    encoding: Optional[str] = None) -> HtmlDocument:
+    """
+    Parse the source code with the backend
+
+    :param source_code: the HTML source code (the text or the raw bytes)
+    :param backend: the backend name (html.parser, lxml, html5lib, selectolax)
+    :param parse_only: build only the subtrees needed by the CSS selectors
+                       (the bs4 backends except html5lib)
+    :param encoding: the declared encoding of the bytes (UTF-8 if None)
+    """
+    try:
+        create = BACKENDS[backend]
+    except KeyError:
+        raise ValueError('Unknown HTML backend: {}.'.format(backend))
+    return create(source_code, parse_only, encoding)
@@ -0,0 +1,289 @@
+"""
+Persistent HTTP response cache
+"""
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .content_types import decode, get_encoding
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize the URL to use it as a cache key
+    (the lowercase scheme and host without the default port,
+    the sorted query parameters and no fragment)
+
+    :param url: an URL
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc += ':{}'.format(parts.port)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or '/', query, ''))
+
+
+class CacheEntry():
+    """
+    A cached response
+    """
+
+    def __init__(self,
+                 content: bytes,
+                 etag: str = None,
+                 last_modified: str = None,
+                 stored_at: float = 0.0,
+                 content_type: str = None) -> None:
+        """
+        Class constructor
+        :param content: the raw response body
+        :param etag: the ETag header of the response
+        :param last_modified: the Last-Modified header of the response
+        :param stored_at: when the response was received or revalidated
+        :param content_type: the Content-Type header of the response
+        """
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+        self.content_type = content_type
+
+    @property
+    def text(self) -> str:
+        """
+        The response body decoded with the declared encoding
+        """
+        return decode(self.content,
+                      get_encoding(self.content_type, self.content))
+
+    def get_conditional_headers(self) -> Dict[str, str]:
+        """
+        Get the headers to revalidate the response
+        """
+        headers = {}
+        if self.etag:
+            headers['if-none-match'] = self.etag
+        if self.last_modified:
+            headers['if-modified-since'] = self.last_modified
+        return headers
+
+
+class HttpCacheStats():
+    """
+    Statistics of the HTTP cache
+    """
+
+    def __init__(self) -> None:
+        """
+        Class constructor
+        """
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def __str__(self) -> str:
+        """
+        Return a stats summary
+        """
+        return 'hits: {}, revalidated: {}, misses: {}'.format(
+            self.hits, self.revalidated, self.misses)
+
+
+class HttpCache():
+    """
+    SQLite cache of the successful responses
+
+    The fresh responses (younger than the TTL) are served without requests.
+    The stale ones with an ETag or Last-Modified header are revalidated
+    with a conditional request. The bodies are compressed and the least
+    recently used responses are evicted when the cache exceeds its size.
+    The access times of the hits are saved in batches (and before
+    an eviction), so a hit does not write to the database.
+    """
+
+    # the number of the access times kept in memory before saving them
+    access_batch_size: int = 100
+
+    def __init__(
+            self,
+            path: str = 'http_cache.sqlite',
+            ttl: float = 3600,
+            max_size: int = 100 * 1024 * 1024,
+            compression_level: int = 6,
+    ) -> None:
+        """
+        Class constructor
+        :param path: the database file path (':memory:' for a memory cache)
+        :param ttl: how long a response is fresh in seconds
+        :param max_size: the maximum size of the compressed bodies in bytes
+        :param compression_level: the zlib compression level
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.compression_level = compression_level
+        self.stats = HttpCacheStats()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                content_type TEXT
+            )""")
+        columns = [
+            row[1] for row in self._connection.execute(
+                'PRAGMA table_info(responses)')
+        ]
+        if 'content_type' not in columns:
+            self._connection.execute(
+                'ALTER TABLE responses ADD COLUMN content_type TEXT')
+        self._connection.execute("""
+            CREATE INDEX IF NOT EXISTS responses_accessed_at
+            ON responses (accessed_at)""")
+        self._connection.commit()
+        # the size of the bodies is kept up to date by set and _evict
+        self._size: int = self._connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        self._accessed: Dict[str, float] = {}
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """
+        Get the cached response of the URL
+
+        :param url: an URL
+        """
+        key = normalize_url(url)
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT body, etag, last_modified, stored_at, content_type '
+                'FROM responses WHERE key = ?', (key, )).fetchone()
+            if row is None:
+                return None
+            self._accessed[key] = time.time()
+            if len(self._accessed) >= self.access_batch_size:
+                self._save_accessed()
+                self._connection.commit()
+        body, etag, last_modified, stored_at, content_type = row
+        return CacheEntry(zlib.decompress(body), etag, last_modified,
+                          stored_at, content_type)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """
+        Check if the cached response can be used without revalidation
+        """
+        return time.time() - entry.stored_at < self.ttl
+
+    def set(self,
+            url: str,
+            content: Union[bytes, str],
+            etag: str = None,
+            last_modified: str = None,
+            content_type: Optional[str] = None) -> None:
+        """
+        Save the response of the URL
+
+        :param url: an URL
+        :param content: the raw response body (a text is saved as UTF-8)
+        :param etag: the ETag header of the response
+        :param last_modified: the Last-Modified header of the response
+        :param content_type: the Content-Type header of the response
+        """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        body = zlib.compress(content, self.compression_level)
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT size FROM responses WHERE key = ?', (key, )).fetchone()
+            self._connection.execute(
+                'INSERT OR REPLACE INTO responses (key, body, size, etag, '
+                'last_modified, stored_at, accessed_at, content_type) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, body, len(body), etag, last_modified, now, now,
+                 content_type))
+            self._accessed.pop(key, None)
+            self._size += len(body) - (row[0] if row else 0)
+            if self._size > self.max_size:
+                self._evict()
+            self._connection.commit()
+
+    def touch(self, url: str) -> None:
+        """
+        Mark the cached response of the URL as fresh (after revalidation)
+        """
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            self._accessed.pop(key, None)
+            self._connection.execute(
+                'UPDATE responses SET stored_at = ?, accessed_at = ? '
+                'WHERE key = ?', (now, now, key))
+            self._connection.commit()
+
+    def _save_accessed(self) -> None:
+        """
+        Save the access times of the recent hits
+        """
+        if self._accessed:
+            self._connection.executemany(
+                'UPDATE responses SET accessed_at = ? WHERE key = ?',
+                [(accessed_at, key)
+                 for key, accessed_at in self._accessed.items()])
+            self._accessed.clear()
+
+    def _evict(self) -> None:
+        """
+        Delete the least recently used responses exceeding the cache size
+        """
+        self._save_accessed()
+        rows = self._connection.execute(
+            'SELECT key, size FROM responses ORDER BY accessed_at, rowid')
+        keys = []
+        for key, entry_size in rows:
+            if self._size <= self.max_size:
+                break
+            keys.append((key, ))
+            self._size -= entry_size
+        self._connection.executemany('DELETE FROM responses WHERE key = ?',
+                                     keys)
+
+    @property
+    def size(self) -> int:
+        """
+        The size of the compressed bodies in bytes
+        """
+        with self._lock:
+            return self._size
+
+    def clear(self) -> None:
+        """
+        Delete all the cached responses
+        """
+        with self._lock:
+            self._connection.execute('DELETE FROM responses')
+            self._connection.commit()
+            self._size = 0
+            self._accessed.clear()
+
+    def close(self) -> None:
+        """
+        Close the database (the access times are saved)
+        """
+        with self._lock:
+            self._save_accessed()
+            self._connection.commit()
+            self._connection.close()
@@ -1,11 +1,25 @@
 """
 HTTP client
 """
+import random
+import socket
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Optional
+from json import loads
+from typing import Dict, Iterable, Mapping, Optional, Tuple, Union
+from urllib.parse import urlsplit
 
 import requests
-from fake_useragent import UserAgent
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from .content_types import decode, get_encoding, get_media_type, is_json_type
+from .http_cache import CacheEntry, HttpCache
+from .rate_limiter import DomainRateLimiter
+from .user_agents import UserAgentPool
 
 
 class BaseHttpResponse(ABC):
@@ -20,11 +34,18 @@ class BaseHttpResponse(ABC):
         Status code
         """
 
+    @property
+    @abstractmethod
+    def content(self) -> bytes:
+        """
+        Raw body
+        """
+
     @property
     @abstractmethod
     def text(self) -> str:
         """
-        Status code
+        Decoded body
         """
 
     @property
@@ -38,7 +59,7 @@ class BaseHttpResponse(ABC):
     @abstractmethod
     def json(self) -> Optional[dict]:
         """
-        Status code
+        Parsed JSON body
         """
 
 
@@ -48,62 +69,634 @@ class BaseHttpClient(ABC):
     """
 
     @abstractmethod
-    def get(self, url: str) -> BaseHttpResponse:
+    def get(self, url: str, use_cache: bool = True) -> BaseHttpResponse:
         """
         Make GET request
         :param url: a requested URL
+        :param use_cache: use the response cache (if the client has one)
         """
 
 
 class HttpResponse(BaseHttpResponse):
     """
     Class representing the HTTP response
+
+    The body is kept as the received bytes. The text is decoded
+    with the declared encoding on first use and the JSON is parsed
+    only for the JSON content types.
     """
     status_code: Optional[int] = None
-    text: str = ''
-    json: Optional[dict] = None
     ok: bool = False
+    error: Optional[str] = None
+    headers: Mapping[str, str] = {}
 
     def __init__(
             self,
             status_code: int = None,
-            text: str = '',
+            text: str = None,
             ok: bool = False,
             json: dict = None,
+            error: str = None,
+            headers: Mapping[str, str] = None,
+            content: bytes = None,
     ):
         """
         Class constructor
         :param status_code: int
+        :param text: the decoded body (if the content is not provided)
+        :param error: the description of a failed request
+        :param headers: the response headers (case-insensitive)
+        :param content: the raw body
         """
         self.status_code = status_code
-        self.text = text
-        self.json = json
         self.ok = ok
+        self.error = error
+        self.headers = headers if headers is not None else {}
+        self._content: Optional[bytes] = content
+        self._text: Optional[str] = text if content is None else None
+        self._json: Optional[dict] = json
+        self._json_loaded = json is not None
+        self._encoding: Optional[str] = None
+        if error is None and status_code is not None and not ok:
+            self.error = 'Status code: {}.'.format(status_code)
+
+    @property
+    def content_type(self) -> str:
+        """
+        The media type of the body without the parameters
+        """
+        return get_media_type(self.headers.get('content-type'))
+
+    @property
+    def encoding(self) -> Optional[str]:
+        """
+        The declared encoding of the body (None if it is not declared)
+        """
+        if self._encoding is None and self._content:
+            self._encoding = get_encoding(self.headers.get('content-type'),
+                                          self._content)
+        return self._encoding
+
+    @property
+    def body(self) -> Union[str, bytes]:
+        """
+        The body as it has been received (the text if there is no content)
+        """
+        if self._content is None:
+            return self._text or ''
+        return self._content
+
+    @property
+    def content(self) -> bytes:
+        """
+        The raw body
+        """
+        if self._content is None:
+            self._content = (self._text or '').encode('utf-8')
+        return self._content
+
+    @property
+    def text(self) -> str:
+        """
+        The body decoded on first use
+        """
+        if self._text is None:
+            self._text = decode(self._content or b'', self.encoding)
+        return self._text
+
+    @text.setter
+    def text(self, value: str) -> None:
+        self._text = value
+        self._content = None
+
+    @property
+    def is_json(self) -> bool:
+        """
+        Is the body declared as JSON
+        """
+        return is_json_type(self.content_type)
+
+    @property
+    def json(self) -> Optional[dict]:
+        """
+        The body parsed on first use (None if it is not a JSON response)
+        """
+        if not self._json_loaded:
+            self._json_loaded = True
+            if self.is_json:
+                # json decodes the UTF-8, UTF-16 and UTF-32 bytes itself
+                utf = self.encoding is None or self.encoding.startswith('utf')
+                self._json = _load_json(self.body if utf else self.text)
+        return self._json
+
+    @json.setter
+    def json(self, value: Optional[dict]) -> None:
+        self._json = value
+        self._json_loaded = True
+
+
+class HttpClientStats():
+    """
+    Connection statistics of the HTTP client
+    """
+
+    def __init__(self) -> None:
+        """
+        Class constructor
+        """
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+
+    def add_request(self) -> None:
+        """
+        Register a sent request
+        """
+        with self._lock:
+            self.requests += 1
+
+    def add_connection(self) -> None:
+        """
+        Register a new opened connection
+        """
+        with self._lock:
+            self.connections += 1
+
+    @property
+    def reused(self) -> int:
+        """
+        The number of requests sent over an already opened connection
+        """
+        return max(self.requests - self.connections, 0)
+
+    @property
+    def reuse_rate(self) -> float:
+        """
+        The share of requests sent over an already opened connection
+        """
+        if not self.requests:
+            return 0.0
+        return self.reused / self.requests
+
+    def __str__(self) -> str:
+        """
+        Return a stats summary
+        """
+        return 'requests: {}, connections: {}, reuse rate: {:.2%}'.format(
+            self.requests, self.connections, self.reuse_rate)
+
+
+class RetryPolicy():
+    """
+    Policy of retrying the failed requests
+
+    The connection errors, timeouts and the statuses of the overloaded
+    servers (429, 5xx) are retried with an exponential backoff with jitter.
+    The other statuses (404 etc.) are final.
+    """
+
+    def __init__(
+            self,
+            retries: int = 2,
+            backoff_factor: float = 0.25,
+            max_backoff: float = 10,
+            retry_statuses: Iterable[int] = (429, 500, 502, 503, 504),
+    ) -> None:
+        """
+        Class constructor
+        :param retries: the maximum number of retries of a request
+        :param backoff_factor: the base delay between the retries in seconds
+        :param max_backoff: the maximum delay between the retries in seconds
+        :param retry_statuses: the status codes to retry
+        """
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+
+    def is_failure(self, response: HttpResponse) -> bool:
+        """
+        Check if the response means the server is unavailable
+        """
+        return response.status_code is None or \
+            response.status_code in self.retry_statuses
+
+    def should_retry(self, response: HttpResponse, attempt: int) -> bool:
+        """
+        Check if the request should be retried
+
+        :param response: the response of the attempt
+        :param attempt: the number of the attempt starting from 0
+        """
+        return attempt < self.retries and self.is_failure(response)
+
+    def get_backoff(self, attempt: int, retry_after: str = None) -> float:
+        """
+        Get the delay before the next attempt in seconds
+        (a random delay up to the exponential backoff or Retry-After)
+
+        :param attempt: the number of the failed attempt starting from 0
+        :param retry_after: the Retry-After header value
+        """
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        backoff = min(self.backoff_factor * 2**attempt, self.max_backoff)
+        return random.uniform(0, backoff)
+
+
+class CircuitBreaker():
+    """
+    Circuit breaker of a domain
+
+    The circuit opens after the number of consecutive failures
+    and the requests fail fast until the recovery timeout has passed.
+    Then a single trial request is allowed to check if the domain
+    has recovered (the half-open state).
+    """
+
+    def __init__(self,
+                 failure_threshold: int = 5,
+                 recovery_timeout: float = 30) -> None:
+        """
+        Class constructor
+        :param failure_threshold: the number of failures to open the circuit
+        :param recovery_timeout: how long the circuit is open in seconds
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """
+        Is the circuit open
+        """
+        return self._opened_at is not None
+
+    def allow_request(self) -> bool:
+        """
+        Check if a request to the domain is allowed
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or \
+                    time.monotonic() - self._opened_at < self.recovery_timeout:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self) -> None:
+        """
+        Register a successful request and close the circuit
+        """
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        """
+        Register a failed request
+        """
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+    def release_trial(self) -> None:
+        """
+        Allow another trial request (the request has ended
+        without a response from the domain, e.g. it was invalid)
+        """
+        with self._lock:
+            self._trial = False
+
+
+class CircuitBreakers():
+    """
+    Circuit breakers of the domains
+    """
+
+    def __init__(self,
+                 failure_threshold: int = 5,
+                 recovery_timeout: float = 30) -> None:
+        """
+        Class constructor
+        :param failure_threshold: the number of failures to open a circuit
+        :param recovery_timeout: how long a circuit is open in seconds
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> CircuitBreaker:
+        """
+        Get the circuit breaker of the URL domain
+        """
+        domain = urlsplit(url).hostname or ''
+        breaker = self._breakers.get(domain)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    domain,
+                    CircuitBreaker(self.failure_threshold,
+                                   self.recovery_timeout))
+        return breaker
+
+
+def _load_json(body: Union[str, bytes]) -> Optional[dict]:
+    """
+    Parse the JSON body or return None if it is not a valid JSON
+    """
+    try:
+        return loads(body)
+    except (ValueError, TypeError):
+        return None
+
+
+def _get_cached(cache: Optional[HttpCache], url: str
+                ) -> Tuple[Optional[HttpResponse], Optional[CacheEntry]]:
+    """
+    Get the fresh cached response or the stale entry to revalidate
+    """
+    entry = cache.get(url) if cache else None
+    if entry is None or not cache.is_fresh(entry):  # type: ignore
+        return None, entry
+    cache.stats.hits += 1  # type: ignore
+    return _create_cached_response(entry), entry
+
+
+def _create_cached_response(entry: CacheEntry,
+                            headers: Mapping[str, str] = None
+                            ) -> HttpResponse:
+    """
+    Create a response with the cached body
+    """
+    response_headers = CaseInsensitiveDict(headers)
+    if entry.content_type:
+        response_headers['content-type'] = entry.content_type
+    return HttpResponse(200,
+                        ok=True,
+                        headers=response_headers,
+                        content=entry.content)
+
+
+def _update_cache(cache: Optional[HttpCache], url: str,
+                  entry: Optional[CacheEntry],
+                  result: HttpResponse) -> HttpResponse:
+    """
+    Save the response to the cache or return the revalidated cached one
+    """
+    if not cache:
+        return result
+    if entry and result.status_code == 304:
+        cache.touch(url)
+        cache.stats.revalidated += 1
+        return _create_cached_response(entry, result.headers)
+    if result.status_code == 200:
+        cache.stats.misses += 1
+        cache.set(url, result.content, result.headers.get('etag'),
+                  result.headers.get('last-modified'),
+                  result.headers.get('content-type'))
+    return result
+
+
+def _describe_error(error: Exception) -> str:
+    """
+    Get the description of a request error
+    """
+    return '{}: {}'.format(type(error).__name__, error)
+
+
+def _counting_pool_class(pool_class: type, stats: HttpClientStats) -> type:
+    """
+    Create a connection pool class registering opened connections in the stats
+    """
+    connection_class = pool_class.ConnectionCls  # type: ignore
+
+    def connect(self):
+        stats.add_connection()
+        return connection_class.connect(self)
+
+    counting_connection_class = type(connection_class.__name__,
+                                     (connection_class, ),
+                                     {'connect': connect})
+    return type(pool_class.__name__, (pool_class, ),
+                {'ConnectionCls': counting_connection_class})
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    HTTP adapter with keep-alive pools counting the opened connections
+    """
+
+    def __init__(self,
+                 stats: HttpClientStats,
+                 keep_alive: bool = True,
+                 **kwargs) -> None:
+        """
+        Class constructor
+        :param stats: the stats to register new connections
+        :param keep_alive: enable TCP keep-alive probes on the sockets
+        """
+        self.stats = stats
+        self.keep_alive = keep_alive
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        """
+        Initialize the pool manager with the counting connection pools
+        """
+        if self.keep_alive:
+            kwargs['socket_options'] = list(
+                HTTPConnection.default_socket_options) + [
+                    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+                ]
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool_class(HTTPConnectionPool, self.stats),
+            'https': _counting_pool_class(HTTPSConnectionPool, self.stats),
+        }
 
 
 class HttpClient(BaseHttpClient):
     """
     Class for making HTTP requests
+
+    The client keeps a long-lived session with a per-host pool
+    of keep-alive connections, so it can be shared between the sources
+    and threads.
     """
 
-    client = requests
     headers = {
-        'user-agent': UserAgent().chrome,
         'cache-control': 'private, max-age=0, no-cache',
     }
 
-    def get(self, url: str) -> HttpResponse:
+    def __init__(
+            self,
+            pool_connections: int = 10,
+            pool_maxsize: int = 10,
+            pool_block: bool = False,
+            keep_alive: bool = True,
+            timeout: Union[float, Tuple[float, float]] = (5, 30),
+            retry_policy: RetryPolicy = None,
+            failure_threshold: int = 5,
+            recovery_timeout: float = 30,
+            rate_limiter: DomainRateLimiter = None,
+            cache: HttpCache = None,
+            user_agents: UserAgentPool = None,
+    ) -> None:
+        """
+        Class constructor
+        :param pool_connections: the number of per-host pools to keep
+        :param pool_maxsize: the maximum number of idle connections per host
+        :param pool_block: wait for a free connection when the pool is full
+        :param keep_alive: keep the connections open between requests
+        :param timeout: the connect and read timeouts in seconds
+        :param retry_policy: the policy of retrying the failed requests
+        :param failure_threshold: the number of consecutive failures
+                                  to stop requesting a domain
+        :param recovery_timeout: how long to stop requesting a domain
+        :param rate_limiter: the per-domain rate limiter (no limits if None)
+        :param cache: the persistent response cache (no caching if None)
+        :param user_agents: the pool of the user agents to send
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breakers = CircuitBreakers(failure_threshold,
+                                                recovery_timeout)
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.user_agents = user_agents or UserAgentPool()
+        self.stats = HttpClientStats()
+        self._session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        Get the shared session (created on first use)
+        """
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self) -> requests.Session:
+        """
+        Create a session with the configured connection pools
+        """
+        session = requests.Session()
+        adapter = PooledHTTPAdapter(
+            self.stats,
+            keep_alive=self.keep_alive,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @property
+    def rates(self) -> Dict[str, float]:
+        """
+        The current number of requests per second to each domain
+        """
+        return self.rate_limiter.rates if self.rate_limiter else {}
+
+    def close(self) -> None:
+        """
+        Close the session and its connections
+        """
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def get(self, url: str, use_cache: bool = True) -> HttpResponse:
         """
         Make GET request
         :param url: a requested URL
+        :param use_cache: use the response cache (if the client has one)
         """
+        cache = self.cache if use_cache else None
+        cached, entry = _get_cached(cache, url)
+        if cached:
+            return cached
+        headers = entry.get_conditional_headers() if entry else {}
+        breaker = self.circuit_breakers.get(url)
+        if not breaker.allow_request():
+            return HttpResponse(
+                error='The circuit breaker of the domain is open.')
+        attempt = 0
         try:
-            response = self.client.get(url, headers=self.headers)
-        except requests.exceptions.RequestException:
-            return HttpResponse()
-        result = HttpResponse(response.status_code, response.text, response.ok)
+            while True:
+                result = self._send(url, headers)
+                if not self.retry_policy.should_retry(result, attempt):
+                    break
+                time.sleep(
+                    self.retry_policy.get_backoff(
+                        attempt, result.headers.get('retry-after')))
+                attempt += 1
+        except requests.exceptions.RequestException as error:
+            # the request itself is invalid, so it is not retried
+            breaker.release_trial()
+            return HttpResponse(error=_describe_error(error))
+        except BaseException:
+            breaker.release_trial()
+            raise
+        if self.retry_policy.is_failure(result):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return _update_cache(cache, url, entry, result)
+
+    def _record_rate(self, url: str, status_code: Optional[int],
+                     started_at: float) -> None:
+        """
+        Pass the result of a request to the rate limiter
+        """
+        if self.rate_limiter:
+            self.rate_limiter.record(url, status_code,
+                                     time.monotonic() - started_at)
+
+    def _send(self, url: str, extra_headers: Dict[str, str]) -> HttpResponse:
+        """
+        Make a single GET request
+
+        :param url: a requested URL
+        :param extra_headers: the headers to add to the default ones
+        """
+        headers = dict(self.headers, **extra_headers)
+        headers['user-agent'] = self.user_agents.get()
+        if not self.keep_alive:
+            headers['connection'] = 'close'
+        if self.rate_limiter:
+            self.rate_limiter.acquire(url)
+        started_at = time.monotonic()
         try:
-            result.json = response.json()
-        except (ValueError, TypeError):
-            pass
-        return result
+            response = self.session.get(url,
+                                        headers=headers,
+                                        timeout=self.timeout)
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout) as error:
+            self._record_rate(url, None, started_at)
+            return HttpResponse(error=_describe_error(error))
+        self._record_rate(url, response.status_code, started_at)
+        self.stats.add_request()
+        return HttpResponse(response.status_code,
+                            ok=response.ok,
+                            headers=response.headers,
+                            content=response.content)
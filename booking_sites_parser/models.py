@@ -1,16 +1,32 @@
 """
 Package models
 """
+import copy
+import functools
+import hashlib
 import re
+import sys
 from abc import ABC, abstractmethod
+from contextvars import ContextVar
 from decimal import Decimal
-from typing import Any, List, Optional
-
-from bs4 import BeautifulSoup
+from typing import (Any, Dict, Iterable, List, NamedTuple, Optional, Pattern,
+                    Sequence, Tuple, Union)
 
+from .async_http_client import AsyncHttpClient
+from .html_backends import HtmlDocument, create_document
+from .http_cache import normalize_url
+from .content_types import decode
 from .http_client import HttpClient, HttpResponse
 
 
+@functools.lru_cache(maxsize=256)
+def _compile(pattern: str) -> Pattern:
+    """
+    Compile a regex pattern once
+    """
+    return re.compile(pattern)
+
+
 class ParserException(Exception):
     """
     Base parser exception
@@ -61,6 +77,54 @@ class Address():
         parts = [x for x in [self.address, self.region, self.country] if x]
         return ', '.join(parts)
 
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        """
+        Convert the address to a dictionary
+        """
+        return {
+            'address': self.address,
+            'region': self.region,
+            'country': self.country,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Address':
+        """
+        Create an address from a dictionary
+
+        :param data: a dictionary returned by to_dict
+        """
+        return cls(data['country'], data.get('address'), data.get('region'))
+
+
+PROPERTY_FIELDS: Tuple[str, ...] = (
+    'title',
+    'description',
+    'address',
+    'price',
+    'images',
+    'services',
+    'service_names',
+    'cancellation_policy',
+    'max_guests',
+)
+
+
+def get_fields(fields: Iterable[str] = None) -> Tuple[str, ...]:
+    """
+    Check the requested property fields and return them in the fields order
+
+    :param fields: the requested fields (all the fields by default)
+    """
+    if fields is None:
+        return PROPERTY_FIELDS
+    fields = set(fields)
+    invalid = fields.difference(PROPERTY_FIELDS)
+    if invalid:
+        raise ValueError('Invalid property fields: {}.'.format(', '.join(
+            sorted(invalid))))
+    return tuple(x for x in PROPERTY_FIELDS if x in fields)
+
 
 class Property():
     """
@@ -68,15 +132,18 @@ class Property():
     """
 
     url: str
-    source_id: str
-    title: str
-    description: str
-    address: Optional[Address]
-    price: Optional[Decimal]
-    images: List[str] = []
-    services: List[Any] = []
-    service_names: List[str] = []
-    cancellation_policy: Optional[str]
+    source_id: Optional[str] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    address: Optional[Address] = None
+    price: Optional[Decimal] = None
+    images: Sequence[str] = ()
+    services: Sequence[Any] = ()
+    service_names: Sequence[str] = ()
+    cancellation_policy: Optional[str] = None
+    max_guests: Optional[int] = None
+    # the hash of the page content (see BaseSource.parse_changes)
+    content_hash: Optional[str] = None
 
     def __init__(self, url: str):
         """
@@ -91,25 +158,293 @@ class Property():
         """ Get property ID """
         return self.url
 
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the property to a dictionary with a stable schema
+        (the price stays a Decimal, the named tuple services
+        become dictionaries)
+        """
+        return {
+            'url': self.url,
+            'source_id': self.source_id,
+            'title': self.title,
+            'description': self.description,
+            'address': self.address.to_dict() if self.address else None,
+            'price': self.price,
+            'images': list(self.images),
+            'services': [
+                dict(zip(x._fields, x)) if hasattr(x, '_fields') else x
+                for x in self.services
+            ],
+            'service_names': list(self.service_names),
+            'cancellation_policy': self.cancellation_policy,
+            'max_guests': self.max_guests,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Property':
+        """
+        Create a property from a dictionary
+
+        :param data: a dictionary returned by to_dict
+        """
+        result = cls(data['url'])
+        result.source_id = data.get('source_id')
+        for field in PROPERTY_FIELDS:
+            if data.get(field) is not None:
+                setattr(result, field, data[field])
+        if result.address is not None:
+            result.address = Address.from_dict(data['address'])
+        if result.price is not None:
+            result.price = Decimal(str(result.price))
+        return result
+
+    def to_compact(self) -> 'CompactProperty':
+        """
+        Convert the property to the compact immutable representation
+        """
+        address = self.address
+        return CompactProperty(
+            self.url,
+            _intern(self.source_id),
+            self.title,
+            self.description,
+            CompactAddress(address.address, _intern(address.region),
+                           _intern(address.country)) if address else None,
+            self.price,
+            tuple(self.images),
+            tuple(_share_service(x) for x in self.services),
+            tuple(_intern(x) for x in self.service_names),
+            _intern(self.cancellation_policy),
+            self.max_guests,
+        )
+
+
+class CompactAddress(NamedTuple):
+    """
+    Compact immutable address (the region and the country are interned)
+    """
+    address: Optional[str]
+    region: Optional[str]
+    country: str
+
+    def to_address(self) -> Address:
+        """
+        Convert the compact address to an address
+        """
+        return Address(self.country, self.address, self.region)
+
+
+class CompactProperty(NamedTuple):
+    """
+    Compact immutable property for keeping many results in memory
+
+    The lists are tuples, the repeated strings are interned and the equal
+    services are shared between the properties, so they must not be changed.
+    """
+    url: str
+    source_id: Optional[str]
+    title: Optional[str]
+    description: Optional[str]
+    address: Optional[CompactAddress]
+    price: Optional[Decimal]
+    images: Tuple[str, ...]
+    services: Tuple[Any, ...]
+    service_names: Tuple[str, ...]
+    cancellation_policy: Optional[str]
+    max_guests: Optional[int] = None
+
+    def to_property(self) -> Property:
+        """
+        Convert the compact property to a property
+        """
+        result = Property(self.url)
+        result.source_id = self.source_id
+        result.title = self.title
+        result.description = self.description
+        if self.address:
+            result.address = self.address.to_address()
+        result.price = self.price
+        result.images = list(self.images)
+        result.services = [copy.copy(x) for x in self.services]
+        result.service_names = list(self.service_names)
+        result.cancellation_policy = self.cancellation_policy
+        result.max_guests = self.max_guests
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the property to a dictionary with a stable schema
+        """
+        return self.to_property().to_dict()
+
+
+_SHARED_SERVICES: Dict[Any, Any] = {}
+_SHARED_SERVICES_LIMIT = 100000
+
+
+def _intern(value: Any) -> Any:
+    """
+    Intern the string to keep a single copy of it in memory
+    """
+    return sys.intern(value) if type(value) is str else value
+
+
+def _share_service(service: Any) -> Any:
+    """
+    Get the shared copy of the service with the interned strings
+    """
+    try:
+        if isinstance(service, dict):
+            key: Any = (type(service), tuple(service.items()))
+        else:
+            key = (type(service), service)
+        shared = _SHARED_SERVICES.get(key)
+    except TypeError:  # unhashable
+        return service
+    if shared is None:
+        if isinstance(service, dict):
+            shared = copy.copy(service)
+            shared.update([(k, _intern(v)) for k, v in service.items()])
+        else:
+            shared = _intern(service)
+        if len(_SHARED_SERVICES) < _SHARED_SERVICES_LIMIT:
+            _SHARED_SERVICES[key] = shared
+    return shared
+
+
+class ParseContext():
+    """
+    The state of a source while it parses an URL
+    """
+
+    def __init__(self, url: str = None) -> None:
+        """
+        Class constructor
+
+        :param url: the URL to parse
+        """
+        self.url = url
+        # the raw bytes of the response until the text is needed
+        self.source_code: Union[str, bytes] = ''
+        self.encoding: Optional[str] = None
+        self.document: Optional[HtmlDocument] = None
+        self.amenities: List[Any] = []
+        self.data: Dict[str, Any] = {}
+
 
 class BaseSource(ABC):
     """
     Base class for sources classes (booking, airbnb, etc)
+
+    The per-URL state is kept in a parse context, which is local
+    to the current thread or asyncio task. So one source instance
+    can parse many URLs at once.
     """
 
-    source_code: str = ''
-    parser: BeautifulSoup
     priority: int = 0
-    url: Optional[str] = None
+    html_backend: str = 'html.parser'
+    partial_parsing: bool = False
     url_regex_pattern: str = r'^https?:\/\/(www\.)?{domain}$'
     http_client: HttpClient = HttpClient()
-    _amenities: List[Any] = []
+    async_http_client: AsyncHttpClient = AsyncHttpClient()
+    # the fields extracted even if the page content has not changed
+    volatile_fields: Tuple[str, ...] = ('price', )
+    # the price is requested from an API instead of parsed from the page
+    remote_price: bool = False
 
     # CSS selectors
     title_css_selector: str
     description_css_selector: str
     address_css_selector: str
 
+    def __init__(self) -> None:
+        """
+        Class constructor
+        """
+        self._context: ContextVar[ParseContext] = ContextVar(
+            '{}_context'.format(type(self).__name__))
+
+    @property
+    def context(self) -> ParseContext:
+        """
+        Get the current parse context
+        """
+        context = self._context.get(None)
+        if context is None:
+            context = self.new_context()
+        return context
+
+    def new_context(self, url: str = None) -> ParseContext:
+        """
+        Start a new parse context in the current thread or task
+
+        :param url: the URL to parse
+        """
+        context = ParseContext(url)
+        self._context.set(context)
+        return context
+
+    @property
+    def url(self) -> Optional[str]:
+        """
+        The URL being parsed
+        """
+        return self.context.url
+
+    @url.setter
+    def url(self, value: Optional[str]) -> None:
+        self.context.url = value
+
+    @property
+    def source_code(self) -> str:
+        """
+        The HTML source code of the URL being parsed
+        (decoded from the response bytes on first use)
+        """
+        context = self.context
+        if isinstance(context.source_code, bytes):
+            context.source_code = decode(context.source_code,
+                                         context.encoding)
+        return context.source_code
+
+    @source_code.setter
+    def source_code(self, value: str) -> None:
+        self.context.source_code = value
+        self.context.encoding = None
+
+    @property
+    def document(self) -> HtmlDocument:
+        """
+        The parsed source code (built on first use,
+        an empty document if there is no source code)
+        """
+        context = self.context
+        if context.document is not None:
+            return context.document
+        if not context.source_code:
+            return create_document('', self.html_backend)
+        return self.get_document()
+
+    @property
+    def parser(self) -> Any:
+        """
+        The native tree of the parsed source code
+        (BeautifulSoup for the bs4 backends, None if there is no source code)
+        """
+        context = self.context
+        if context.document is None and not context.source_code:
+            return None
+        return self.document.tree
+
+    @property
+    def _amenities(self) -> List[Any]:
+        return self.context.amenities
+
+    @_amenities.setter
+    def _amenities(self, value: List[Any]) -> None:
+        self.context.amenities = value
+
     @property
     @abstractmethod
     def id(self) -> str:
@@ -138,14 +473,30 @@ class BaseSource(ABC):
         """
         Get HTML element text by the selector
         """
-        element = self.parser.select_one(selector)
+        element = self.document.select_one(selector)
 
         return getattr(element, 'text', '')
 
-    def _do_request(self, url: str) -> HttpResponse:
-        response = self.http_client.get(url)
+    def _do_request(self, url: str, use_cache: bool = True) -> HttpResponse:
+        response = self.http_client.get(url, use_cache=use_cache)
+        self._check_response(response)
+        return response
+
+    @staticmethod
+    def _check_response(response: HttpResponse) -> None:
+        """
+        Raise an exception with the error details if the request has failed
+        """
         if not response.ok:
-            raise ParserException('The HTTP request has failed.')
+            message = 'The HTTP request has failed.'
+            if response.error:
+                message += ' ' + response.error
+            raise ParserException(message)
+
+    async def _ado_request(self, url: str,
+                           use_cache: bool = True) -> HttpResponse:
+        response = await self.async_http_client.get(url, use_cache=use_cache)
+        self._check_response(response)
         return response
 
     @abstractmethod
@@ -160,6 +511,12 @@ class BaseSource(ABC):
         Get property price
         """
 
+    async def aget_price(self) -> Optional[Decimal]:
+        """
+        Get property price (asynchronous version)
+        """
+        return self.get_price()
+
     @abstractmethod
     def get_images(self) -> List[str]:
         """
@@ -215,56 +572,296 @@ class BaseSource(ABC):
             return Address.create_from_string(address_str)
         return None
 
+    def get_url_key(self, url: str) -> str:
+        """
+        Get the key of the page of an URL, so the duplicate URLs
+        are fetched and parsed once (the normalized URL by default)
+        :param url: an URL
+        """
+        return '{}:{}'.format(self.id, normalize_url(url))
+
     def check_url(self, url: str = None) -> bool:
         """
         Check if the url is suitable for this source
         """
         url = self.__get_url(url)
-        pattern = re.compile(self.url_regex_pattern.format(domain=self.domain))
+        pattern = _compile(self.url_regex_pattern.format(domain=self.domain))
         return bool(pattern.match(url))
 
-    def get_source(self, url: str = None) -> str:
+    def load_source(self, url: str = None) -> None:
         """
-        Get HTML source from URL
+        Get HTML source from URL without decoding it
+        :param url: source URL
+        """
+        self.source_code = ''
+        url = self.__get_url(url)
+        self._set_source(self._do_request(url))
+
+    async def aload_source(self, url: str = None) -> None:
+        """
+        Get HTML source from URL without decoding it (asynchronous version)
         :param url: source URL
         """
         self.source_code = ''
         url = self.__get_url(url)
-        response = self._do_request(url)
-        self.source_code = response.text
+        self._set_source(await self._ado_request(url))
+
+    def _set_source(self, response: HttpResponse) -> None:
+        """
+        Keep the response body with its declared encoding
+        """
+        self.context.source_code = response.body
+        self.context.encoding = response.encoding
+
+    def get_source(self, url: str = None) -> str:
+        """
+        Get HTML source from URL
+        :param url: source URL
+        """
+        self.load_source(url)
 
         return self.source_code
 
-    def get_parser(self) -> BeautifulSoup:
+    async def aget_source(self, url: str = None) -> str:
+        """
+        Get HTML source from URL (asynchronous version)
+        :param url: source URL
+        """
+        await self.aload_source(url)
+
+        return self.source_code
+
+    def get_document(self) -> HtmlDocument:
+        """
+        Parse the source code with the HTML backend of the source
+        """
+        context = self.context
+        context.document = None
+        if not context.source_code:
+            self.load_source()
+        parse_only = None
+        if self.partial_parsing:
+            parse_only = self.get_css_selectors()
+        document = create_document(context.source_code, self.html_backend,
+                                   parse_only, context.encoding)
+        context.document = document
+
+        return document
+
+    def get_css_selectors(self) -> List[str]:
+        """
+        Get the CSS selectors declared by the source (*_css_selector)
+        """
+        return [
+            getattr(self, name) for name in sorted(dir(type(self)))
+            if name.endswith('_css_selector')
+            and isinstance(getattr(self, name, None), str)
+        ]
+
+    def get_parser(self) -> Any:
         """
         Get a parser for the source code
         """
-        self.parser = None
-        if not self.source_code:
-            self.get_source()
-        self.parser = BeautifulSoup(self.source_code, 'html.parser')
+        return self.get_document().tree
 
-        return self.parser
+    def fetch(self, url: str) -> HttpResponse:
+        """
+        Request the page of an URL without parsing it
+        (raises ParserException if the request has failed)
+        :param url: source URL
+        """
+        return self._do_request(url)
+
+    def parse_source(self,
+                     url: str,
+                     source_code: Union[str, bytes],
+                     encoding: Optional[str] = None,
+                     fields: Iterable[str] = None) -> Property:
+        """
+        Parse the fetched source code of an URL and return a Property object
+        :param url: the fetched url
+        :param source_code: the page text or raw bytes
+        :param encoding: the declared encoding of the bytes
+        :param fields: the property fields to get (all by default)
+        """
+        fields = get_fields(fields)
+        self._prepare_source(url, source_code, encoding)
+        price = self.get_price() if 'price' in fields else None
+
+        return self._create_property(url, fields, price)
 
-    def parse(self, url: str) -> Property:
+    def fetch_price(self,
+                    url: str,
+                    source_code: Union[str, bytes],
+                    encoding: Optional[str] = None) -> Optional[Decimal]:
+        """
+        Get the price of the fetched source code of an URL
+        (the remote price is requested with the client of the source)
+        :param url: the fetched url
+        :param source_code: the page text or raw bytes
+        :param encoding: the declared encoding of the bytes
+        """
+        self._prepare_source(url, source_code, encoding)
+        return self.get_price()
+
+    def parse(self, url: str, fields: Iterable[str] = None) -> Property:
         """
         Parse an URL and return a Property object
         :param url: an url to parse
+        :param fields: the property fields to get (all by default)
         """
-        self.url = url
+        fields = get_fields(fields)
+        self._prepare(url)
+        self.load_source(url)
+        price = self.get_price() if 'price' in fields else None
+
+        return self._create_property(url, fields, price)
+
+    async def aparse(self, url: str, fields: Iterable[str] = None) -> Property:
+        """
+        Parse an URL and return a Property object (asynchronous version)
+        :param url: an url to parse
+        :param fields: the property fields to get (all by default)
+        """
+        fields = get_fields(fields)
+        self._prepare(url)
+        await self.aload_source(url)
+        price = await self.aget_price() if 'price' in fields else None
+
+        return self._create_property(url, fields, price)
+
+    def parse_changes(self,
+                      url: str,
+                      content_hashes: Dict[str, str],
+                      fields: Iterable[str] = None) -> Property:
+        """
+        Parse an URL skipping the fields extracted from the same content
+        by the previous crawls
+        (the hash of the content is saved to Property.content_hash)
+        :param url: an url to parse
+        :param content_hashes: the content hashes of the pages
+                               the known fields were extracted from
+        :param fields: the property fields to get (all by default)
+        """
+        fields = get_fields(fields)
+        self._prepare(url)
+        self.load_source(url)
+        fields, new_hash = self._get_changed_fields(fields, content_hashes)
+        price = self.get_price() if 'price' in fields else None
+
+        result = self._create_property(url, fields, price)
+        result.content_hash = new_hash
+        return result
+
+    async def aparse_changes(self,
+                             url: str,
+                             content_hashes: Dict[str, str],
+                             fields: Iterable[str] = None) -> Property:
+        """
+        Parse an URL skipping the fields extracted from the same content
+        by the previous crawls (asynchronous version)
+        :param url: an url to parse
+        :param content_hashes: the content hashes of the pages
+                               the known fields were extracted from
+        :param fields: the property fields to get (all by default)
+        """
+        fields = get_fields(fields)
+        self._prepare(url)
+        await self.aload_source(url)
+        fields, new_hash = self._get_changed_fields(fields, content_hashes)
+        price = await self.aget_price() if 'price' in fields else None
+
+        result = self._create_property(url, fields, price)
+        result.content_hash = new_hash
+        return result
+
+    def _get_changed_fields(
+            self, fields: Sequence[str],
+            content_hashes: Dict[str, str]) -> Tuple[Tuple[str, ...], str]:
+        """
+        Get the fields to extract from the loaded page and its content hash
+        :param fields: the requested fields
+        :param content_hashes: the content hashes of the known fields
+        """
+        new_hash = self.get_content_hash()
+        reusable = self.get_reusable_fields(content_hashes, new_hash)
+        return tuple(x for x in fields if x not in reusable), new_hash
+
+    def get_reusable_fields(self, content_hashes: Dict[str, str],
+                            content_hash: Optional[str]) -> Tuple[str, ...]:
+        """
+        Get the known fields extracted from the content with the hash
+        (except the volatile fields)
+        :param content_hashes: the content hashes of the known fields
+        :param content_hash: the content hash of the loaded page
+        """
+        return tuple(
+            field for field, field_hash in content_hashes.items()
+            if content_hash and field_hash == content_hash
+            and field not in self.volatile_fields)
+
+    def get_content_payload(self) -> bytes:
+        """
+        Get the part of the loaded page the fields are extracted from
+        (the texts of the elements matched by the CSS selectors
+        or the whole page if there are no selectors)
+        """
+        selectors = self.get_css_selectors()
+        if not selectors:
+            source_code = self.context.source_code
+            if isinstance(source_code, str):
+                source_code = source_code.encode('utf-8')
+            return source_code
+        document = self.document
+        texts = [
+            element.text for selector in selectors
+            for element in document.select(selector)
+        ]
+        return '\x00'.join(texts).encode('utf-8')
+
+    def get_content_hash(self) -> str:
+        """
+        Get the hash of the content of the loaded page
+        """
+        return hashlib.blake2b(self.get_content_payload(),
+                               digest_size=16).hexdigest()
+
+    def _prepare(self, url: str) -> None:
+        """
+        Check the URL and start a new parse context for it
+        :param url: an url to parse
+        """
+        self.new_context(url)
         if not self.check_url(url):
             raise ParserException('Invalid URL has been provided.')
-        self.get_source(url)
-        self.get_parser()
+
+    def _prepare_source(self, url: str, source_code: Union[str, bytes],
+                        encoding: Optional[str]) -> None:
+        """
+        Start a new parse context for the fetched source code of an URL
+        :param url: the fetched url
+        :param source_code: the page text or raw bytes
+        :param encoding: the declared encoding of the bytes
+        """
+        self._prepare(url)
+        self.context.source_code = source_code
+        self.context.encoding = encoding
+
+    def _create_property(self, url: str, fields: Sequence[str],
+                         price: Optional[Decimal]) -> Property:
+        """
+        Create a Property object from the parsed source code
+        :param url: the parsed url
+        :param fields: the property fields to get
+        :param price: the property price
+        """
         result = Property(url)
         result.source_id = self.id
-        result.title = self.get_title()
-        result.description = self.get_description()
-        result.address = self.get_address()
-        result.price = self.get_price()
-        result.images = self.get_images()
-        result.services = self.get_services()
-        result.service_names = self.get_service_names()
-        result.cancellation_policy = self.get_cancellation_policy()
+        for field in fields:
+            if field == 'price':
+                value: Any = price
+            else:
+                value = getattr(self, 'get_' + field)()
+            setattr(result, field, value)
 
         return result
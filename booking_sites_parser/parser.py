@@ -1,12 +1,26 @@
 """
 Parser module
 """
-from typing import Iterable, Iterator, List, Tuple
+import asyncio
+import copy
+import functools
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, Future, ThreadPoolExecutor,
+                                wait)
+from decimal import Decimal
+from typing import (Any, AsyncIterable, AsyncIterator, Awaitable, Callable,
+                    Deque, Iterable, Iterator, List, Sequence, Set, Tuple,
+                    Union)
 
-from .models import BaseSource, Optional, ParserException, Property
-from .sources.airbnb import Airbnb
-from .sources.airbnb_plus import AirbnbPlus
-from .sources.booking import Booking
+from .batches import PropertyBatch, iter_batches
+from .coalescing import RequestCoalescer
+from .html_backends import BACKENDS
+from .http_client import HttpClient
+from .models import (BaseSource, Optional, ParserException, Property,
+                     get_fields)
+from .registry import create_sources
+from .result_store import ResultStore, StoredListing
+from .router import SourceRouter
 
 
 class Parser():
@@ -14,16 +28,112 @@ class Parser():
     Class for parsing the provided websites
     """
 
-    _sources: List[BaseSource] = []
+    _source_list: Optional[List[BaseSource]] = None
+    _router: Optional[SourceRouter] = None
+    concurrency: int = 1
+    html_backend: Optional[str] = None
+    http_client: Optional[HttpClient] = None
+    result_store: Optional[ResultStore] = None
+    incremental: bool = False
 
-    def __init__(self, sources: List[BaseSource] = None):
+    def __init__(
+            self,
+            sources: List[BaseSource] = None,
+            concurrency: int = 1,
+            html_backend: str = None,
+            http_client: HttpClient = None,
+            result_store: ResultStore = None,
+            incremental: bool = False,
+    ):
         """
         Class constructor
+
+        :param sources: the sources to use
+                        (the registered ones are created on first use)
+        :param concurrency: the default number of URLs to parse at once
+        :param html_backend: the HTML backend for all the sources
+        :param http_client: the HTTP client for all the sources
+                            (the one of the source classes by default)
+        :param result_store: the store of the parsed results to reuse
+                             the fresh fields of the listings
+        :param incremental: reuse the expired stored fields of the pages
+                            with the same content (only the volatile
+                            fields, such as the price, are parsed)
         """
+        self.concurrency = concurrency
+        self.result_store = result_store
+        self.incremental = incremental
         if sources:
-            self._sources = sources
-        else:
-            self._sources = [Airbnb(), AirbnbPlus(), Booking()]
+            self._source_list = sources
+        if html_backend:
+            self.set_html_backend(html_backend)
+        if http_client:
+            self.set_http_client(http_client)
+
+    @property
+    def _sources(self) -> List[BaseSource]:
+        """
+        Get the sources (the registered ones are created on first use)
+        """
+        if self._source_list is None:
+            self._source_list = create_sources()
+            if self.html_backend:
+                self._apply_html_backend()
+            if self.http_client:
+                self._apply_http_client()
+        return self._source_list
+
+    @_sources.setter
+    def _sources(self, sources: List[BaseSource]) -> None:
+        self._source_list = sources
+
+    def set_html_backend(self, html_backend: str) -> None:
+        """
+        Set the HTML backend for all the sources
+
+        :param html_backend: the backend name (see html_backends.BACKENDS)
+        """
+        if html_backend not in BACKENDS:
+            raise ValueError('Unknown HTML backend: {}.'.format(html_backend))
+        self.html_backend = html_backend
+        if self._source_list is not None:
+            self._apply_html_backend()
+
+    def _apply_html_backend(self) -> None:
+        """
+        Set the HTML backend of the parser for all the sources
+        """
+        for source in self._sources:
+            source.html_backend = self.html_backend  # type: ignore
+
+    def set_http_client(self, http_client: HttpClient) -> None:
+        """
+        Set the HTTP client for the sources of the parser
+        (the source classes keep their clients)
+
+        :param http_client: the HTTP client
+        """
+        self.http_client = http_client
+        if self._source_list is not None:
+            self._apply_http_client()
+
+    def _apply_http_client(self) -> None:
+        """
+        Set the HTTP client of the parser for all the sources
+        """
+        for source in self._sources:
+            source.http_client = self.http_client  # type: ignore
+
+    @property
+    def router(self) -> SourceRouter:
+        """
+        Get the routing index of the sources
+        (rebuilt when the sources are changed)
+        """
+        router = self._router
+        if router is None or router.sources != tuple(self._sources):
+            router = self._router = SourceRouter(self._sources)
+        return router
 
     def sort_sources_by_priority(self) -> None:
         """
@@ -57,29 +167,533 @@ class Parser():
             self._sources.append(source)
 
     @staticmethod
-    def _try_source(source: BaseSource, url: str) -> Optional[Property]:
+    def _try_source(
+            source: BaseSource,
+            url: str,
+            fields: Sequence[str] = None,
+            previous: Optional[StoredListing] = None,
+    ) -> Optional[Property]:
         """
         Try to get a property object from the source
 
         :param url: URL to parse
         :param source: source to try
+        :param fields: the property fields to get
+        :param previous: the stored listing to parse the changes only
+        """
+        result = None
+        try:
+            if not source.check_url(url):
+                pass
+            elif previous is None:
+                result = source.parse(url, fields)
+            else:
+                result = source.parse_changes(url, previous.content_hashes,
+                                              fields)
+        except ParserException:
+            pass
+        return result
+
+    @staticmethod
+    async def _atry_source(
+            source: BaseSource,
+            url: str,
+            fields: Sequence[str] = None,
+            previous: Optional[StoredListing] = None,
+    ) -> Optional[Property]:
+        """
+        Try to get a property object from the source (asynchronous version)
+
+        :param url: URL to parse
+        :param source: source to try
+        :param fields: the property fields to get
+        :param previous: the stored listing to parse the changes only
         """
         result = None
         try:
-            if source.check_url(url):
-                result = source.parse(url)
+            if not source.check_url(url):
+                pass
+            elif previous is None:
+                result = await source.aparse(url, fields)
+            else:
+                result = await source.aparse_changes(
+                    url, previous.content_hashes, fields)
         except ParserException:
             pass
         return result
 
-    def parse(self, urls: Iterable[str]) -> Iterator[Property]:
+    def _parse_url(
+            self,
+            url: str,
+            fields: Sequence[str],
+            coalescer: RequestCoalescer = None,
+    ) -> Optional[Property]:
+        """
+        Parse an URL with the suitable source
+
+        :param url: URL to parse
+        :param fields: the property fields to get
+        :param coalescer: the coalescer of the duplicate URLs
+        """
+        source = self.router.route(url)
+        if not source:
+            return None
+        if not coalescer:
+            return self._parse_source(source, url, fields)
+        return _with_url(
+            coalescer.call(source.get_url_key(url), self._parse_source,
+                           source, url, fields), url)
+
+    def _parse_source(self, source: BaseSource, url: str,
+                      fields: Sequence[str]) -> Optional[Property]:
+        """
+        Parse an URL with the source reusing the fresh stored fields
+
+        :param source: the source of the URL
+        :param url: URL to parse
+        :param fields: the property fields to get
+        """
+        store = self.result_store
+        if not store:
+            return self._try_source(source, url, fields)
+        key = source.get_url_key(url)
+        stored, expired = store.get(key, url, fields)
+        if not expired:
+            return stored
+        previous = store.get_previous(key, url,
+                                      expired) if self.incremental else None
+        result = self._try_source(source, url, expired, previous)
+        return _merge_stored(store, key, stored, result, fields, expired,
+                             source, previous)
+
+    def parse(
+            self,
+            urls: Iterable[str],
+            workers: int = None,
+            ordered: bool = True,
+            fields: Iterable[str] = None,
+            dedupe: bool = True,
+    ) -> Iterator[Property]:
         """
         Parse the provided urls list
 
         :param urls: an iterator object with urls to parse
+        :param workers: the number of URLs to parse at once
+        :param ordered: yield the results in the order of the urls
+        :param fields: the property fields to get (all by default)
+        :param dedupe: fetch and parse the URLs of the same page once
+                       (see BaseSource.get_url_key)
+        """
+        fields = get_fields(fields)
+        coalescer = RequestCoalescer() if dedupe else None
+        yield from self._map(
+            functools.partial(self._parse_url,
+                              fields=fields,
+                              coalescer=coalescer), urls, workers, ordered)
+
+    def parse_batches(
+            self,
+            urls: Iterable[str],
+            batch_size: int = 1000,
+            workers: int = None,
+            ordered: bool = True,
+            fields: Iterable[str] = None,
+    ) -> Iterator[PropertyBatch]:
+        """
+        Parse the provided urls list and yield the columnar batches
+        of the results (see batches.PropertyBatch)
+
+        :param urls: an iterator object with urls to parse
+        :param batch_size: the maximum number of the properties in a batch
+        :param workers: the number of URLs to parse at once
+        :param ordered: yield the results in the order of the urls
+        :param fields: the property fields to get (all by default)
+        """
+        yield from iter_batches(self.parse(urls, workers, ordered, fields),
+                                batch_size)
+
+    def parse_pipelined(
+            self,
+            urls: Iterable[str],
+            fetch_workers: int = 8,
+            parse_workers: int = None,
+            queue_size: int = None,
+            ordered: bool = True,
+            fields: Iterable[str] = None,
+            dedupe: bool = True,
+    ) -> Iterator[Property]:
+        """
+        Parse the provided urls list fetching the pages with threads
+        and parsing them with processes (see pipeline.ParsePipeline)
+
+        :param urls: an iterator object with urls to parse
+        :param fetch_workers: the number of the fetching threads
+        :param parse_workers: the number of the parsing processes
+        :param queue_size: the maximum number of the fetched pages
+                           waiting for a parser
+        :param ordered: yield the results in the order of the urls
+        :param fields: the property fields to get (all by default)
+        :param dedupe: fetch the URLs of the same page once
+        """
+        from .pipeline import ParsePipeline
+
+        pipeline = ParsePipeline(self,
+                                 fetch_workers,
+                                 parse_workers,
+                                 queue_size,
+                                 fields,
+                                 dedupe=dedupe)
+        yield from pipeline.run(urls, ordered)  # type: ignore
+
+    def refresh_prices(
+            self,
+            listing_ids: Iterable[Union[int, str]],
+            source_id: str = 'airbnb',
+            workers: int = None,
+            ordered: bool = True,
+    ) -> Iterator[Property]:
+        """
+        Get the prices of the known listings without parsing their pages
+
+        :param listing_ids: an iterator object with the listing IDs
+        :param source_id: the ID of a source able to refresh the prices
+        :param workers: the number of listings to refresh at once
+        :param ordered: yield the results in the order of the IDs
+        """
+        source = self._get_price_source(source_id)
+
+        def _refresh(listing_id: Union[int, str]) -> Optional[Property]:
+            try:
+                price = source.refresh_price(listing_id)  # type: ignore
+            except ParserException:
+                return None
+            return self._create_price_property(source, listing_id, price)
+
+        yield from self._map(_refresh, listing_ids, workers, ordered)
+
+    def _get_price_source(self, source_id: str) -> BaseSource:
         """
-        for url in urls:
-            for source in self._sources:
-                result = self._try_source(source, url)
-                if result:
-                    yield result
+        Get a source able to refresh the prices by its ID
+
+        :param source_id: a source ID
+        """
+        source = self.get_source(source_id)[1]
+        if not hasattr(source, 'refresh_price'):
+            raise ParserException(
+                'Source with id={} can not refresh prices.'.format(source_id))
+        return source
+
+    @staticmethod
+    def _create_price_property(source: BaseSource,
+                               listing_id: Union[int, str],
+                               price: Optional[Decimal]) -> Property:
+        """
+        Create a Property object with the refreshed price
+
+        :param source: the source of the listing
+        :param listing_id: the listing ID
+        :param price: the listing price
+        """
+        result = Property(
+            source.listing_url.format(id=listing_id))  # type: ignore
+        result.source_id = source.id
+        result.price = price
+        return result
+
+    def _map(
+            self,
+            function: Callable[[Any], Optional[Property]],
+            items: Iterable[Any],
+            workers: Optional[int],
+            ordered: bool,
+    ) -> Iterator[Property]:
+        """
+        Apply the function to the items and yield the results
+
+        :param function: a function returning a property or None
+        :param items: an iterator object with the function arguments
+        :param workers: the number of items to process at once
+        :param ordered: yield the results in the order of the items
+        """
+        workers = workers or self.concurrency
+        if workers > 1:
+            yield from self._map_concurrently(function, items, workers,
+                                              ordered)
+            return
+        for item in items:
+            result = function(item)
+            if result:
+                yield result
+
+    @staticmethod
+    def _map_concurrently(
+            function: Callable[[Any], Optional[Property]],
+            items: Iterable[Any],
+            workers: int,
+            ordered: bool,
+    ) -> Iterator[Property]:
+        """
+        Apply the function to the items with a pool of workers
+
+        No more than two items per worker are in flight at once,
+        so the memory stays bounded even for an endless iterator.
+
+        :param function: a function returning a property or None
+        :param items: an iterator object with the function arguments
+        :param workers: the number of the workers
+        :param ordered: yield the results in the order of the items
+        """
+        max_pending = workers * 2
+        items_iterator = iter(items)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+
+            def submit(count: int) -> List[Future]:
+                futures = []
+                for item in items_iterator:
+                    futures.append(executor.submit(function, item))
+                    if len(futures) >= count:
+                        break
+                return futures
+
+            if ordered:
+                queue: Deque[Future] = deque(submit(max_pending))
+                while queue:
+                    result = queue.popleft().result()
+                    queue.extend(submit(1))
+                    if result:
+                        yield result
+                return
+
+            pending: Set[Future] = set(submit(max_pending))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                pending.update(submit(len(done)))
+                for future in done:
+                    if future.result():
+                        yield future.result()
+
+    async def _aparse_url(
+            self,
+            url: str,
+            fields: Sequence[str],
+            coalescer: RequestCoalescer = None,
+    ) -> Optional[Property]:
+        """
+        Parse an URL with the suitable source (asynchronous version)
+
+        :param url: URL to parse
+        :param fields: the property fields to get
+        :param coalescer: the coalescer of the duplicate URLs
+        """
+        source = self.router.route(url)
+        if not source:
+            return None
+        if not coalescer:
+            return await self._aparse_source(source, url, fields)
+        return _with_url(
+            await coalescer.acall(source.get_url_key(url),
+                                  self._aparse_source, source, url, fields),
+            url)
+
+    async def _aparse_source(self, source: BaseSource, url: str,
+                             fields: Sequence[str]) -> Optional[Property]:
+        """
+        Parse an URL with the source reusing the fresh stored fields
+        (asynchronous version)
+
+        :param source: the source of the URL
+        :param url: URL to parse
+        :param fields: the property fields to get
+        """
+        store = self.result_store
+        if not store:
+            return await self._atry_source(source, url, fields)
+        key = source.get_url_key(url)
+        stored, expired = store.get(key, url, fields)
+        if not expired:
+            return stored
+        previous = store.get_previous(key, url,
+                                      expired) if self.incremental else None
+        result = await self._atry_source(source, url, expired, previous)
+        return _merge_stored(store, key, stored, result, fields, expired,
+                             source, previous)
+
+    async def aparse(
+            self,
+            urls: Union[Iterable[str], AsyncIterable[str]],
+            workers: int = None,
+            ordered: bool = True,
+            fields: Iterable[str] = None,
+            dedupe: bool = True,
+    ) -> AsyncIterator[Property]:
+        """
+        Parse the provided urls list on the running event loop
+
+        :param urls: an iterator or an async iterator with urls to parse
+        :param workers: the number of URLs to parse at once
+        :param ordered: yield the results in the order of the urls
+        :param fields: the property fields to get (all by default)
+        :param dedupe: fetch and parse the URLs of the same page once
+                       (see BaseSource.get_url_key)
+        """
+        fields = get_fields(fields)
+        coalescer = RequestCoalescer() if dedupe else None
+        results = self._amap(
+            functools.partial(self._aparse_url,
+                              fields=fields,
+                              coalescer=coalescer), urls, workers, ordered)
+        async for result in results:
+            yield result
+
+    async def arefresh_prices(
+            self,
+            listing_ids: Union[Iterable[Union[int, str]],
+                               AsyncIterable[Union[int, str]]],
+            source_id: str = 'airbnb',
+            workers: int = None,
+            ordered: bool = True,
+    ) -> AsyncIterator[Property]:
+        """
+        Get the prices of the known listings without parsing their pages
+        (asynchronous version)
+
+        :param listing_ids: an iterator or an async iterator with the IDs
+        :param source_id: the ID of a source able to refresh the prices
+        :param workers: the number of listings to refresh at once
+        :param ordered: yield the results in the order of the IDs
+        """
+        source = self._get_price_source(source_id)
+
+        async def _refresh(listing_id: Union[int, str]) -> Optional[Property]:
+            try:
+                price = await source.arefresh_price(  # type: ignore
+                    listing_id)
+            except ParserException:
+                return None
+            return self._create_price_property(source, listing_id, price)
+
+        async for result in self._amap(_refresh, listing_ids, workers,
+                                       ordered):
+            yield result
+
+    async def _amap(
+            self,
+            function: Callable[[Any], Awaitable[Optional[Property]]],
+            items: Union[Iterable[Any], AsyncIterable[Any]],
+            workers: Optional[int],
+            ordered: bool,
+    ) -> AsyncIterator[Property]:
+        """
+        Apply the coroutine function to the items on the running event loop
+
+        No more than two items per worker are in flight at once,
+        so the memory stays bounded even for an endless iterator.
+
+        :param function: a coroutine function returning a property or None
+        :param items: an iterator or an async iterator with the arguments
+        :param workers: the number of items to process at once
+        :param ordered: yield the results in the order of the items
+        """
+        max_pending = (workers or self.concurrency) * 2
+        items_iterator = _aiter(items)
+
+        async def submit(count: int) -> List[asyncio.Future]:
+            futures: List[asyncio.Future] = []
+            async for item in items_iterator:
+                futures.append(asyncio.ensure_future(function(item)))
+                if len(futures) >= count:
+                    break
+            return futures
+
+        if ordered:
+            queue: Deque[asyncio.Future] = deque(await submit(max_pending))
+            try:
+                while queue:
+                    result = await queue[0]
+                    queue.popleft()
+                    queue.extend(await submit(1))
+                    if result:
+                        yield result
+            finally:
+                for future in queue:
+                    future.cancel()
+            return
+
+        pending: Set[asyncio.Future] = set(await submit(max_pending))
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.update(await submit(len(done)))
+                for future in done:
+                    if future.result():
+                        yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+async def _aiter(
+        items: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+    """
+    Iterate over an iterator or an async iterator
+    """
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+def _with_url(result: Optional[Property], url: str) -> Optional[Property]:
+    """
+    Get the shared result of a duplicate URL with the URL
+    (a shallow copy of the property)
+    """
+    if result is None or result.url == url:
+        return result
+    duplicate = copy.copy(result)
+    duplicate.url = url
+    return duplicate
+
+
+def _merge_stored(
+        store: ResultStore,
+        key: str,
+        stored: Optional[Property],
+        result: Optional[Property],
+        fields: Sequence[str],
+        expired: Sequence[str],
+        source: BaseSource,
+        previous: Optional[StoredListing] = None,
+) -> Optional[Property]:
+    """
+    Save the parsed expired fields of a listing
+    and add the fresh stored fields to the result
+
+    :param store: the result store
+    :param key: the listing key
+    :param stored: the property with the fresh stored fields
+    :param result: the property with the parsed expired fields
+    :param fields: the requested property fields
+    :param expired: the parsed property fields
+    :param source: the source of the listing
+    :param previous: the stored listing if the changes only were parsed
+    """
+    if result is None:
+        return None
+    if previous is not None and previous.result is not None:
+        reused = source.get_reusable_fields(previous.content_hashes,
+                                            result.content_hash)
+        if reused:
+            # the content has not changed, so these fields were not parsed
+            store.stats.skipped += 1
+            for field in reused:
+                setattr(result, field, getattr(previous.result, field))
+    store.set(key, result, expired, result.content_hash)
+    if stored is not None:
+        for field in fields:
+            if field not in expired:
+                setattr(result, field, getattr(stored, field))
+    return result
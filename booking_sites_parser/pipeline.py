@@ -0,0 +1,294 @@
+"""
+Pipelined parsing
+
+Fetching the pages is bound by the network and building the documents
+by the CPU, so the stages have their own workers: the threads fetch
+the raw bodies into a bounded queue and the processes parse them.
+The worker processes create their own sources by the import paths
+of the source classes, so the sources (and their parse contexts)
+are never pickled. The prices requested from an API are fetched
+with the pages, so the requests go through the client of the parser.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import (FIRST_COMPLETED, Future, ProcessPoolExecutor,
+                                wait)
+from decimal import Decimal
+from typing import (TYPE_CHECKING, Any, Dict, Iterable, Iterator, NamedTuple,
+                    Optional, Tuple, Union)
+
+from .coalescing import RequestCoalescer
+from .models import (BaseSource, CompactProperty, ParserException, Property,
+                     get_fields)
+from .registry import get_class_path, load_object
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .parser import Parser
+
+# the sources of a worker process by their import paths and backends
+_worker_sources: Dict[Tuple[str, Optional[str]], BaseSource] = {}
+
+
+class ParseTask(NamedTuple):
+    """
+    A fetched page to parse in a worker process
+    """
+    source_path: str
+    html_backend: Optional[str]
+    url: str
+    source_code: Union[str, bytes]
+    encoding: Optional[str]
+    fields: Tuple[str, ...]
+    # the price fetched with the page (see BaseSource.remote_price)
+    price: Optional[Decimal] = None
+
+
+def _get_worker_source(path: str, html_backend: Optional[str]) -> BaseSource:
+    """
+    Get the source of a worker process (created on first use)
+    """
+    key = (path, html_backend)
+    source = _worker_sources.get(key)
+    if source is None:
+        source = _worker_sources[key] = load_object(path)()
+        if html_backend:
+            source.html_backend = html_backend  # type: ignore
+    return source
+
+
+def parse_task(task: ParseTask) -> Optional[CompactProperty]:
+    """
+    Parse a fetched page (runs in a worker process)
+
+    :param task: the fetched page
+    :return: the compact property or None if the page can not be parsed
+    """
+    source = _get_worker_source(task.source_path, task.html_backend)
+    try:
+        result = source.parse_source(task.url, task.source_code,
+                                     task.encoding, task.fields)
+    except ParserException:
+        return None
+    if task.price is not None:
+        result.price = task.price
+    return result.to_compact()
+
+
+def _get_default_context() -> Any:
+    """
+    Get the start method of the worker processes
+    (forking a process with the running fetchers is not safe)
+    """
+    methods = multiprocessing.get_all_start_methods()
+    method = 'forkserver' if 'forkserver' in methods else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+class ParsePipeline():
+    """
+    Pipeline fetching the pages with threads and parsing them
+    with a pool of processes
+
+    The number of the URLs in flight (fetched, queued, parsed or waiting
+    for their turn to be yielded) is bounded, so the fetchers wait
+    when the parsers fall behind and the memory stays bounded
+    even for an endless iterator.
+    """
+
+    def __init__(
+            self,
+            parser: 'Parser',
+            fetch_workers: int = 8,
+            parse_workers: int = None,
+            queue_size: int = None,
+            fields: Iterable[str] = None,
+            mp_context: Any = None,
+            dedupe: bool = True,
+    ) -> None:
+        """
+        Class constructor
+
+        :param parser: the parser to route the URLs to the sources
+        :param fetch_workers: the number of the fetching threads
+        :param parse_workers: the number of the parsing processes
+                              (the number of CPUs by default)
+        :param queue_size: the maximum number of the fetched pages
+                           waiting for a parser (parse_workers * 2 by default)
+        :param fields: the property fields to get (all by default)
+        :param mp_context: the multiprocessing context of the parsers
+        :param dedupe: fetch the URLs of the same page once
+                       (see BaseSource.get_url_key)
+        """
+        self.parser = parser
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.queue_size = queue_size or self.parse_workers * 2
+        self.fields = get_fields(fields)
+        self.mp_context = mp_context or _get_default_context()
+        self.dedupe = dedupe
+
+    @property
+    def window(self) -> int:
+        """
+        The maximum number of the URLs in flight
+        """
+        return self.fetch_workers + self.queue_size + self.parse_workers * 2
+
+    def fetch(self,
+              url: str,
+              coalescer: RequestCoalescer = None) -> Optional[ParseTask]:
+        """
+        Fetch the page of the URL with the suitable source
+
+        :param url: URL to fetch
+        :param coalescer: the coalescer of the duplicate URLs
+        :return: the page to parse or None if it can not be fetched
+        """
+        source = self.parser.router.route(url)
+        if not source:
+            return None
+        if coalescer:
+            task = coalescer.call(source.get_url_key(url), self._fetch,
+                                  source, url)
+            return task._replace(url=url) if task else None
+        return self._fetch(source, url)
+
+    def _fetch(self, source: BaseSource, url: str) -> Optional[ParseTask]:
+        """
+        Fetch the page of the URL with the source
+        """
+        fields = self.fields
+        price = None
+        try:
+            response = source.fetch(url)
+            if source.remote_price and 'price' in fields:
+                price = source.fetch_price(url, response.body,
+                                           response.encoding)
+                fields = tuple(x for x in fields if x != 'price')
+        except ParserException:
+            return None
+        return ParseTask(get_class_path(type(source)), source.html_backend,
+                         url, response.body, response.encoding, fields, price)
+
+    def run(self,
+            urls: Iterable[str],
+            ordered: bool = True,
+            compact: bool = False) -> Iterator[Union[Property,
+                                                     CompactProperty]]:
+        """
+        Fetch and parse the URLs
+
+        :param urls: an iterator object with urls to parse
+        :param ordered: yield the results in the order of the urls
+        :param compact: yield the compact properties as they are received
+                        from the parsers
+        """
+        tasks: queue.Queue = queue.Queue(self.queue_size)
+        slots = threading.Semaphore(self.window)
+        stop = threading.Event()
+        urls_iterator = enumerate(urls)
+        urls_lock = threading.Lock()
+        # the fetched bodies are large, so only the recent ones are shared
+        coalescer = RequestCoalescer(self.window) if self.dedupe else None
+
+        def put(item: Any) -> None:
+            while not stop.is_set():
+                try:
+                    tasks.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def fetch() -> None:
+            try:
+                while not stop.is_set():
+                    if not slots.acquire(timeout=0.1):
+                        continue
+                    with urls_lock:
+                        item = next(urls_iterator, None)
+                    if item is None:
+                        break
+                    put((item[0], self.fetch(item[1], coalescer)))
+            except Exception as error:  # pylint: disable=W0703
+                put((None, error))
+            finally:
+                put(None)
+
+        threads = [
+            threading.Thread(target=fetch, daemon=True)
+            for _ in range(self.fetch_workers)
+        ]
+        for thread in threads:
+            thread.start()
+        executor = ProcessPoolExecutor(self.parse_workers,
+                                       mp_context=self.mp_context)
+        pending: Dict[Future, int] = {}
+        try:
+            yield from self._collect(tasks, slots, executor, pending, ordered,
+                                     compact)
+        finally:
+            stop.set()
+            # shutdown(cancel_futures=True) requires Python 3.9
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _collect(
+            self,
+            tasks: queue.Queue,
+            slots: threading.Semaphore,
+            executor: ProcessPoolExecutor,
+            pending: Dict[Future, int],
+            ordered: bool,
+            compact: bool,
+    ) -> Iterator[Union[Property, CompactProperty]]:
+        """
+        Pass the fetched pages to the parsers and yield the results
+
+        :param tasks: the queue of the fetched pages
+        :param slots: the semaphore of the URLs in flight
+        :param executor: the pool of the parsers
+        :param pending: the futures of the pages being parsed
+        :param ordered: yield the results in the order of the urls
+        :param compact: yield the compact properties
+        """
+        running = self.fetch_workers
+        max_pending = self.parse_workers * 2
+        results: Dict[int, Optional[CompactProperty]] = {}
+        next_index = 0
+        while running or pending or results:
+            while running and len(pending) < max_pending:
+                try:
+                    # wait for a page only if there is nothing to parse
+                    item = tasks.get_nowait() if pending else tasks.get(
+                        timeout=0.05)
+                except queue.Empty:
+                    break
+                if item is None:
+                    running -= 1
+                    continue
+                index, task = item
+                if isinstance(task, Exception):
+                    raise task
+                if task is None:
+                    results[index] = None
+                else:
+                    pending[executor.submit(parse_task, task)] = index
+            if pending:
+                done, _ = wait(pending, timeout=0.05,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[pending.pop(future)] = future.result()
+            while results:
+                if ordered:
+                    if next_index not in results:
+                        break
+                    result = results.pop(next_index)
+                    next_index += 1
+                else:
+                    result = results.popitem()[1]
+                slots.release()
+                if result:
+                    yield result if compact else result.to_property()
@@ -0,0 +1,222 @@
+"""
+Per-domain rate limiting
+"""
+import threading
+import time
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+
+class TokenBucket():
+    """
+    Token bucket allowing the rate of requests with short bursts
+    """
+
+    def __init__(self, rate: float, capacity: float = None) -> None:
+        """
+        Class constructor
+        :param rate: the number of tokens added per second
+        :param capacity: the maximum number of tokens (the burst size)
+        """
+        self._rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """
+        The number of tokens added per second
+        """
+        return self._rate
+
+    @rate.setter
+    def rate(self, value: float) -> None:
+        with self._lock:
+            self._refill()
+            self._rate = value
+
+    def _refill(self) -> None:
+        """
+        Add the tokens for the time passed since the last update
+        """
+        now = time.monotonic()
+        added = (now - self._updated_at) * self._rate
+        self._tokens = min(self.capacity, self._tokens + added)
+        self._updated_at = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Take the tokens (in advance if the bucket is empty)
+
+        :param tokens: the number of tokens to take
+        :return: how long to wait before using the tokens in seconds
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self._rate
+
+
+class AimdController():
+    """
+    Additive increase/multiplicative decrease controller of a bucket rate
+
+    The rate grows while the server responds quickly and drops
+    when the server throttles the requests (429, 503)
+    or the latency exceeds the threshold.
+    """
+
+    def __init__(
+            self,
+            bucket: TokenBucket,
+            min_rate: float = 0.1,
+            max_rate: float = 50,
+            additive_increase: float = 0.5,
+            multiplicative_decrease: float = 0.5,
+            latency_threshold: float = 5,
+            throttle_statuses: Iterable[int] = (429, 503),
+            cooldown: float = 1,
+    ) -> None:
+        """
+        Class constructor
+        :param bucket: the controlled bucket
+        :param min_rate: the minimum rate
+        :param max_rate: the maximum rate
+        :param additive_increase: the rate increase per second of successes
+        :param multiplicative_decrease: the rate multiplier on throttling
+        :param latency_threshold: the latency to slow down at in seconds
+        :param throttle_statuses: the statuses of a throttling server
+        :param cooldown: the minimum interval between decreases in seconds
+        """
+        self.bucket = bucket
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.additive_increase = additive_increase
+        self.multiplicative_decrease = multiplicative_decrease
+        self.latency_threshold = latency_threshold
+        self.throttle_statuses = frozenset(throttle_statuses)
+        self.cooldown = cooldown
+        self._decreased_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, status_code: Optional[int], latency: float) -> None:
+        """
+        Adjust the rate by the result of a request
+
+        :param status_code: the response status code
+        :param latency: the response time in seconds
+        """
+        with self._lock:
+            rate = self.bucket.rate
+            if status_code in self.throttle_statuses or \
+                    latency > self.latency_threshold:
+                now = time.monotonic()
+                if self._decreased_at is not None and \
+                        now - self._decreased_at < self.cooldown:
+                    return
+                self._decreased_at = now
+                rate *= self.multiplicative_decrease
+            else:
+                # about +additive_increase per second at the current rate
+                rate += self.additive_increase / rate
+            self.bucket.rate = min(max(rate, self.min_rate), self.max_rate)
+
+
+class DomainRateLimiter():
+    """
+    Rate limiter with a token bucket per domain
+    """
+
+    def __init__(
+            self,
+            rate: float = 2,
+            burst: float = None,
+            adaptive: bool = True,
+            domain_rates: Dict[str, float] = None,
+            **controller_kwargs,
+    ) -> None:
+        """
+        Class constructor
+        :param rate: the initial number of requests per second to a domain
+        :param burst: the maximum number of requests sent at once
+        :param adaptive: adjust the rates by the server responses
+        :param domain_rates: the initial rates of the specific domains
+        :param controller_kwargs: the AimdController arguments
+        """
+        self.rate = rate
+        self.burst = burst
+        self.adaptive = adaptive
+        self.domain_rates = domain_rates or {}
+        self.controller_kwargs = controller_kwargs
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._controllers: Dict[str, AimdController] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_domain(url: str) -> str:
+        """
+        Get the domain of the URL
+        """
+        domain = urlsplit(url).hostname or ''
+        return domain[4:] if domain.startswith('www.') else domain
+
+    def _get_bucket(self, domain: str) -> TokenBucket:
+        """
+        Get the bucket of the domain (created on first use)
+        """
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(domain)
+                if bucket is None:
+                    bucket = TokenBucket(
+                        self.domain_rates.get(domain, self.rate), self.burst)
+                    self._controllers[domain] = AimdController(
+                        bucket, **self.controller_kwargs)
+                    self._buckets[domain] = bucket
+        return bucket
+
+    def reserve(self, url: str) -> float:
+        """
+        Reserve a request to the URL domain
+
+        :return: how long to wait before sending the request in seconds
+        """
+        return self._get_bucket(self.get_domain(url)).reserve()
+
+    def acquire(self, url: str) -> None:
+        """
+        Wait until a request to the URL domain is allowed
+        """
+        delay = self.reserve(url)
+        if delay:
+            time.sleep(delay)
+
+    def record(self, url: str, status_code: Optional[int],
+               latency: float) -> None:
+        """
+        Adjust the rate of the URL domain by the result of a request
+
+        :param url: the requested URL
+        :param status_code: the response status code
+        :param latency: the response time in seconds
+        """
+        if not self.adaptive:
+            return
+        domain = self.get_domain(url)
+        self._get_bucket(domain)
+        self._controllers[domain].record(status_code, latency)
+
+    @property
+    def rates(self) -> Dict[str, float]:
+        """
+        The current number of requests per second to each domain
+        """
+        return {
+            domain: bucket.rate
+            for domain, bucket in list(self._buckets.items())
+        }
@@ -0,0 +1,83 @@
+"""
+Registry of the parser sources
+
+The sources are registered by their import paths, so a source module
+is imported only when the sources are created. Other packages can add
+their sources with the entry points of the group:
+
+    entry_points={
+        'booking_sites_parser.sources': [
+            'my_source = my_package.sources:MySource',
+        ]
+    }
+"""
+import importlib
+import sys
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .models import BaseSource
+
+ENTRY_POINT_GROUP = 'booking_sites_parser.sources'
+DEFAULT_SOURCES: Dict[str, str] = {
+    'airbnb': 'booking_sites_parser.sources.airbnb:Airbnb',
+    'airbnb_plus': 'booking_sites_parser.sources.airbnb_plus:AirbnbPlus',
+    'booking': 'booking_sites_parser.sources.booking:Booking',
+}
+
+
+def load_object(path: str) -> Any:
+    """
+    Import an object by its path (package.module:name)
+
+    :param path: the object path
+    """
+    module_name, _, name = path.partition(':')
+    module = importlib.import_module(module_name)
+    return getattr(module, name) if name else module
+
+
+def get_class_path(cls: type) -> str:
+    """
+    Get the import path of a class (package.module:name)
+
+    :param cls: the class
+    """
+    return '{}:{}'.format(cls.__module__, cls.__qualname__)
+
+
+def _get_entry_points() -> Dict[str, str]:
+    """
+    Get the source paths registered by the installed packages
+    """
+    if sys.version_info >= (3, 8):
+        from importlib.metadata import entry_points
+    else:  # pragma: no cover
+        # the backport is installed with the package
+        from importlib_metadata import entry_points
+    found: Iterable[Any]
+    try:
+        found = entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:  # pragma: no cover
+        # Python < 3.10 returns a dict of the entry points by their groups
+        groups: Dict[str, Any] = entry_points()
+        found = groups.get(ENTRY_POINT_GROUP, [])
+    return {entry.name: entry.value for entry in sorted(found,
+                                                        key=lambda x: x.name)}
+
+
+def get_source_paths() -> Dict[str, str]:
+    """
+    Get the import paths of the registered sources by their names
+    (the default sources first)
+    """
+    paths = dict(DEFAULT_SOURCES)
+    paths.update(_get_entry_points())
+    return paths
+
+
+def create_sources() -> List['BaseSource']:
+    """
+    Import and create the registered sources
+    """
+    return [load_object(path)() for path in get_source_paths().values()]
@@ -0,0 +1,239 @@
+"""
+Persistent store of the parsed results
+
+The fields of the parsed properties are kept by the listing keys
+(see BaseSource.get_url_key) with their own TTLs: the prices change
+often, the titles and the images rarely, so a repeated crawl parses
+only the expired fields of a listing or nothing at all.
+The fields keep the content hashes of their pages as well, so the expired
+fields extracted from an unchanged content can be reused
+(see BaseSource.parse_changes).
+"""
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from .models import PROPERTY_FIELDS, Property
+from .serializers import json_default
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# how long the fields of a listing are fresh in seconds
+DEFAULT_TTLS: Dict[str, float] = {
+    'title': 7 * DAY,
+    'description': 7 * DAY,
+    'address': 30 * DAY,
+    'price': HOUR,
+    'images': 7 * DAY,
+    'services': 7 * DAY,
+    'service_names': 7 * DAY,
+    'cancellation_policy': DAY,
+    'max_guests': 7 * DAY,
+}
+
+
+class StoredListing(NamedTuple):
+    """
+    The stored fields of a listing regardless of their TTLs
+    """
+    result: Optional[Property]
+    fields: Tuple[str, ...]
+    # the content hashes of the pages the fields were extracted from
+    content_hashes: Dict[str, str]
+
+
+class ResultStoreStats():
+    """
+    Statistics of the result store
+    """
+
+    def __init__(self) -> None:
+        """
+        Class constructor
+        """
+        self.hits = 0
+        self.partial = 0
+        self.misses = 0
+        # the pages parsed again only for their volatile fields
+        self.skipped = 0
+
+    def __str__(self) -> str:
+        """
+        Return a stats summary
+        """
+        return 'hits: {}, partial: {}, misses: {}, skipped: {}'.format(
+            self.hits, self.partial, self.misses, self.skipped)
+
+
+class ResultStore():
+    """
+    SQLite store of the parsed property fields
+
+    A listing is a hit when all the requested fields are fresh,
+    a partial hit when only some of them are (the expired ones
+    are parsed again) and a miss otherwise.
+    """
+
+    def __init__(
+            self,
+            path: str = 'results.sqlite',
+            ttls: Dict[str, float] = None,
+    ) -> None:
+        """
+        Class constructor
+        :param path: the database file path (':memory:' for a memory store)
+        :param ttls: how long the fields are fresh in seconds
+                     (overrides DEFAULT_TTLS)
+        """
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            invalid = set(ttls).difference(PROPERTY_FIELDS)
+            if invalid:
+                raise ValueError('Invalid property fields: {}.'.format(
+                    ', '.join(sorted(invalid))))
+            self.ttls.update(ttls)
+        self.stats = ResultStoreStats()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS fields (
+                key TEXT NOT NULL,
+                field TEXT NOT NULL,
+                source_id TEXT,
+                value TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                content_hash TEXT,
+                PRIMARY KEY (key, field)
+            )""")
+        columns = [
+            row[1]
+            for row in self._connection.execute('PRAGMA table_info(fields)')
+        ]
+        if 'content_hash' not in columns:
+            self._connection.execute(
+                'ALTER TABLE fields ADD COLUMN content_hash TEXT')
+        self._connection.commit()
+
+    def get(self, key: str, url: str, fields: Iterable[str]
+            ) -> Tuple[Optional[Property], Tuple[str, ...]]:
+        """
+        Get the fresh fields of the listing
+
+        :param key: the listing key
+        :param url: the requested URL of the listing
+        :param fields: the requested property fields
+        :return: the property with the fresh fields (None if there are none)
+                 and the fields to parse
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT field, source_id, value, stored_at FROM fields '
+                'WHERE key = ?', (key, )).fetchall()
+        now = time.time()
+        stored = {row[0]: row for row in rows}
+        data: Dict[str, Any] = {'url': url}
+        expired = []
+        for field in fields:
+            row = stored.get(field)
+            if row is None or now - row[3] >= self.ttls[field]:
+                expired.append(field)
+                continue
+            data['source_id'] = row[1]
+            data[field] = json.loads(row[2])
+        if len(data) == 1:
+            self.stats.misses += 1
+            return None, tuple(expired)
+        if expired:
+            self.stats.partial += 1
+        else:
+            self.stats.hits += 1
+        return Property.from_dict(data), tuple(expired)
+
+    def get_previous(self, key: str, url: str,
+                     fields: Iterable[str]) -> StoredListing:
+        """
+        Get the stored fields of the listing regardless of their TTLs
+        with the content hashes of their pages
+
+        :param key: the listing key
+        :param url: the requested URL of the listing
+        :param fields: the requested property fields
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT field, source_id, value, content_hash FROM fields '
+                'WHERE key = ?', (key, )).fetchall()
+        stored = {row[0]: row for row in rows}
+        data: Dict[str, Any] = {'url': url}
+        content_hashes = {}
+        for field in fields:
+            if field in stored:
+                data['source_id'] = stored[field][1]
+                data[field] = json.loads(stored[field][2])
+                if stored[field][3]:
+                    content_hashes[field] = stored[field][3]
+        fields = tuple(x for x in fields if x in data)
+        return StoredListing(Property.from_dict(data) if fields else None,
+                             fields, content_hashes)
+
+    def set(self,
+            key: str,
+            result: Property,
+            fields: Iterable[str],
+            content_hash: Optional[str] = None) -> None:
+        """
+        Save the parsed fields of the listing
+
+        :param key: the listing key
+        :param result: the parsed property
+        :param fields: the parsed property fields
+        :param content_hash: the content hash of the page
+                             the fields were extracted from
+        """
+        data = result.to_dict()
+        now = time.time()
+        rows = [(key, field, result.source_id,
+                 json.dumps(data[field], separators=(',', ':'),
+                            default=json_default), now, content_hash)
+                for field in fields]
+        with self._lock:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO fields (key, field, source_id, value, '
+                'stored_at, content_hash) VALUES (?, ?, ?, ?, ?, ?)', rows)
+            self._connection.commit()
+
+    def purge(self) -> int:
+        """
+        Delete the expired fields
+        (they can not be reused for the unchanged pages anymore)
+
+        :return: the number of the deleted fields
+        """
+        now = time.time()
+        with self._lock:
+            count = 0
+            for field, ttl in self.ttls.items():
+                count += self._connection.execute(
+                    'DELETE FROM fields WHERE field = ? AND stored_at <= ?',
+                    (field, now - ttl)).rowcount
+            self._connection.commit()
+        return count
+
+    def clear(self) -> None:
+        """
+        Delete all the stored fields
+        """
+        with self._lock:
+            self._connection.execute('DELETE FROM fields')
+            self._connection.commit()
+
+    def close(self) -> None:
+        """
+        Close the database
+        """
+        with self._lock:
+            self._connection.close()
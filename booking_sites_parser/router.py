@@ -0,0 +1,93 @@
+"""
+URL routing module
+"""
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .models import BaseSource
+
+HOST_LABEL_PATTERN = re.compile(r'^https?://(?:www\.)?([^/.:?#]+)',
+                                re.IGNORECASE)
+DOMAIN_PREFIX_PATTERN = re.compile(r'^[a-zA-Z0-9-]+')
+
+
+def get_domain_prefix(source: BaseSource) -> Optional[str]:
+    """
+    Get the literal prefix of the source domain regex
+    or None if the source can't be indexed by its host
+
+    :param source: a source
+    """
+    if source.url_regex_pattern != BaseSource.url_regex_pattern:
+        return None
+    domain = source.domain
+    match = DOMAIN_PREFIX_PATTERN.match(domain)
+    if not match or '|' in domain:
+        return None
+    prefix = match.group()
+    if domain[len(prefix):len(prefix) + 1] in ('?', '*', '{'):
+        prefix = prefix[:-1]
+    return prefix or None
+
+
+class SourceRouter():
+    """
+    Index for finding the source of an URL
+
+    The sources are indexed by the literal prefixes of their domains,
+    so an URL is checked only against the sources which can match its host.
+    """
+
+    def __init__(self, sources: Sequence[BaseSource]) -> None:
+        """
+        Class constructor
+
+        :param sources: the sources to route to
+        """
+        self.sources = tuple(sources)
+        ordered = sorted(enumerate(self.sources),
+                         key=lambda x: (x[1].priority, x[0]))
+        self._index: Dict[str, List[Tuple[int, BaseSource]]] = {}
+        self._generic: List[Tuple[int, BaseSource]] = []
+        for i, source in ordered:
+            prefix = get_domain_prefix(source)
+            if prefix:
+                self._index.setdefault(prefix, []).append((i, source))
+            else:
+                self._generic.append((i, source))
+        self._prefix_lengths = sorted({len(x) for x in self._index})
+        self._cache: Dict[str, List[BaseSource]] = {}
+
+    def get_candidates(self, url: str) -> List[BaseSource]:
+        """
+        Get the sources which can match the URL ordered by their priority
+
+        :param url: an URL
+        """
+        match = HOST_LABEL_PATTERN.match(url)
+        label = match.group(1) if match else ''
+        candidates = self._cache.get(label)
+        if candidates is not None:
+            return candidates
+        found = list(self._generic)
+        for length in self._prefix_lengths:
+            if length > len(label):
+                # a longer prefix would look the whole label up again
+                break
+            found += self._index.get(label[:length], [])
+        found.sort(key=lambda x: (x[1].priority, x[0]))
+        candidates = [source for _, source in found]
+        if len(self._cache) < 10000:
+            self._cache[label] = candidates
+        return candidates
+
+    def route(self, url: str) -> Optional[BaseSource]:
+        """
+        Get the source for the URL
+
+        :param url: an URL
+        """
+        for source in self.get_candidates(url):
+            if source.check_url(url):
+                return source
+        return None
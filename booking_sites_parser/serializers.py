@@ -0,0 +1,74 @@
+"""
+JSON serialization of the properties
+
+The orjson package is used if it is installed
+(pip install booking-sites-parser[orjson]).
+"""
+import json
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, Iterable
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .models import Property
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:  # pragma: no cover
+    HAS_ORJSON = False
+
+
+def json_default(value: Any) -> Any:
+    """
+    Encode an object not supported by the JSON encoder
+    (the decimals are kept as strings to keep their precision)
+    """
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    raise TypeError('Object of type {} is not JSON serializable'.format(
+        type(value).__name__))
+
+
+def dumps(value: Any, indent: int = None, use_orjson: bool = True) -> str:
+    """
+    Encode the value to JSON
+    (the properties, the addresses and the decimals are supported)
+
+    :param value: the value to encode
+    :param indent: the indentation of the output (compact if None)
+    :param use_orjson: use orjson if it is installed and supports the indent
+    """
+    if use_orjson and HAS_ORJSON and indent in (None, 2):
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(value, default=json_default,
+                            option=option).decode('utf-8')
+    separators = None if indent else (',', ':')
+    return json.dumps(value,
+                      indent=indent,
+                      separators=separators,
+                      default=json_default)
+
+
+def encode_property(result: 'Property', use_orjson: bool = True) -> str:
+    """
+    Encode the property to a compact JSON object
+
+    :param result: the property to encode
+    :param use_orjson: use orjson if it is installed
+    """
+    return dumps(result.to_dict(), use_orjson=use_orjson)
+
+
+def encode_properties(results: Iterable['Property'],
+                      indent: int = None,
+                      use_orjson: bool = True) -> str:
+    """
+    Encode the properties to a JSON array
+
+    :param results: the properties to encode
+    :param indent: the indentation of the output (compact if None)
+    :param use_orjson: use orjson if it is installed and supports the indent
+    """
+    return dumps([x.to_dict() for x in results], indent, use_orjson)
@@ -2,31 +2,106 @@
 Airbnb module
 """
 import json
+import re
+import threading
+import time
 from datetime import date, timedelta
 from decimal import Decimal
-from typing import Any, Callable, Iterable, List, Optional
+from typing import (TYPE_CHECKING, Any, Callable, Iterable, List, Optional,
+                    Pattern, Tuple, Union)
 
-from bs4 import BeautifulSoup
-
-from booking_sites_parser.models import Address
+from booking_sites_parser.models import Address, ParseContext, ParserException
 
+from ..content_types import decode
+from ..html_backends import HtmlDocument
 from ..http_client import HttpClient, HttpResponse
 
 
+class ApiKeyCache():
+    """
+    Cache of the Airbnb API key
+    """
+
+    def __init__(self, ttl: float = 3600) -> None:
+        """
+        Class constructor
+
+        :param ttl: how long the key is valid in seconds
+        """
+        self.ttl = ttl
+        self._key: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[str]:
+        """
+        Get the key if it has not expired
+        """
+        with self._lock:
+            if self._key and time.monotonic() < self._expires_at:
+                return self._key
+            return None
+
+    def set(self, key: str) -> None:
+        """
+        Save the key
+        """
+        with self._lock:
+            self._key = key
+            self._expires_at = time.monotonic() + self.ttl
+
+    def invalidate(self, key: str = None) -> None:
+        """
+        Remove the key (only if it is equal to the provided one)
+
+        :param key: the rejected key
+        """
+        with self._lock:
+            if key is None or key == self._key:
+                self._key = None
+                self._expires_at = 0.0
+
+
 class AirbnbMixin():
     """
     Mixin for Airbnb classes
     """
 
-    parser: BeautifulSoup
+    document: HtmlDocument
+    context: ParseContext
+    source_code: str
     http_client: HttpClient
-    _do_request: Callable[[object, str], HttpResponse]
+    async_http_client: Any
+    _check_response: Callable[[HttpResponse], None]
     get_services: Callable[[object], List[Any]]
+    new_context: Callable[..., ParseContext]
+    load_source: Callable[..., None]
+
+    if TYPE_CHECKING:
+        # pylint: disable=W0613
+        def _do_request(self, url: str, use_cache: bool = True
+                        ) -> HttpResponse:
+            ...
+
+        async def _ado_request(self, url: str,
+                               use_cache: bool = True) -> HttpResponse:
+            ...
+
+        async def aload_source(self, url: str = None) -> None:
+            ...
 
-    _js_data: Optional[dict] = None
-    _listing_price_data: Optional[dict] = None
     script_selector: str = 'script[data-state=true]'
     script_selector_fallback: str = 'script[data-hypernova-key=spaspabundlejs]'
+    fast_extraction: bool = True
+    remote_price: bool = True
+    # the raw bytes are searched, so the page is not decoded
+    script_patterns: List[Pattern[bytes]] = [
+        re.compile(rb'<script\b[^>]*\sdata-state\s*=\s*(["\']?)true\1'
+                   rb'(?=[\s/>])[^>]*>', re.IGNORECASE),
+        re.compile(
+            rb'<script\b[^>]*\sdata-hypernova-key\s*=\s*(["\']?)'
+            rb'spaspabundlejs\1(?=[\s/>])[^>]*>', re.IGNORECASE),
+    ]
     listing_path: List[str] = [
         'reduxData', 'homePDP', 'listingInfo', 'listing'
     ]
@@ -49,6 +124,26 @@ class AirbnbMixin():
         ['location_title'],
     ]
     api_key_js_path: List[str] = ['layout-init', 'api_config', 'key']
+    api_key_cache: ApiKeyCache = ApiKeyCache()
+    auth_error_codes: Tuple[int, ...] = (401, 403)
+    listing_url: str = 'https://www.airbnb.co.uk/rooms/{id}'
+    listing_id_pattern: Pattern = re.compile(r'/rooms/((?:plus/)?\d+)')
+
+    @property
+    def _js_data(self) -> Optional[dict]:
+        return self.context.data.get('js_data')
+
+    @_js_data.setter
+    def _js_data(self, value: Optional[dict]) -> None:
+        self.context.data['js_data'] = value
+
+    @property
+    def _listing_price_data(self) -> Optional[dict]:
+        return self.context.data.get('listing_price_data')
+
+    @_listing_price_data.setter
+    def _listing_price_data(self, value: Optional[dict]) -> None:
+        self.context.data['listing_price_data'] = value
 
     def get_description(self) -> str:
         """
@@ -119,18 +214,51 @@ class AirbnbMixin():
         if self._listing_price_data:
             return self._listing_price_data
 
-        property_id = self.get_id()
-        api_key = self.get_api_key()
+        # the prices change often, so they are not cached
+        response = self._do_request(self.get_listing_price_url(),
+                                    use_cache=False)
+        return self._set_listing_price_data(response)
+
+    async def aget_listing_price_data(self) -> Optional[dict]:
+        """
+        Get the property listing price data from the API
+        (asynchronous version)
+        """
+        if self._listing_price_data:
+            return self._listing_price_data
+
+        response = await self._ado_request(self.get_listing_price_url(),
+                                           use_cache=False)
+        return self._set_listing_price_data(response)
+
+    def get_listing_price_url(self,
+                              property_id: Union[int, str] = None,
+                              api_key: str = None) -> str:
+        """
+        Get the URL of the property listing price API
+
+        :param property_id: the listing ID (from the JS data by default)
+        :param api_key: the API key (from the JS data by default)
+        """
+        if property_id is None:
+            property_id = self.get_id()
+        if api_key is None:
+            api_key = self.get_api_key()
         date_format = '%Y-%m-%d'
         today = date.today()
         tommorow = today + timedelta(days=1)
-        url = self.price_url.format(
+        return self.price_url.format(
             key=api_key,
             id=property_id,
             check_in=today.strftime(date_format),
             check_out=tommorow.strftime(date_format),
         )
-        response = self._do_request(url)
+
+    def _set_listing_price_data(self,
+                                response: HttpResponse) -> Optional[dict]:
+        """
+        Save the property listing price data from the API response
+        """
         if not response.json:
             return None
         self._listing_price_data = response.json.get(
@@ -154,7 +282,20 @@ class AirbnbMixin():
         """
         Get property price
         """
-        listings = self.get_listing_price_data()
+        return self._get_price_from_listings(self.get_listing_price_data())
+
+    async def aget_price(self) -> Optional[Decimal]:
+        """
+        Get property price (asynchronous version)
+        """
+        return self._get_price_from_listings(
+            await self.aget_listing_price_data())
+
+    @staticmethod
+    def _get_price_from_listings(listings: Any) -> Optional[Decimal]:
+        """
+        Get property price from the listing price data
+        """
         if not listings or not isinstance(listings, list):
             return None
         data = listings.pop()
@@ -164,6 +305,15 @@ class AirbnbMixin():
             return Decimal(price)
         return None
 
+    def get_content_payload(self) -> bytes:
+        """
+        Get the listing subtree of the bootstrap JSON
+        (the price is requested from the API, so it is not included)
+        """
+        return json.dumps(self.get_js_listing_node(),
+                          sort_keys=True,
+                          separators=(',', ':')).encode('utf-8')
+
     def get_id(self) -> Optional[int]:
         """
         Get the property ID
@@ -173,6 +323,17 @@ class AirbnbMixin():
             return int(property_id)
         return property_id
 
+    def get_url_key(self, url: str) -> str:
+        """
+        Get the key of the listing of an URL
+        (the same for all the Airbnb domains and query strings)
+        :param url: an URL
+        """
+        match = self.listing_id_pattern.search(url)
+        if not match:
+            return super().get_url_key(url)  # type: ignore
+        return '{}:{}'.format(self.id, match.group(1))  # type: ignore
+
     def get_api_key(self) -> Optional[str]:
         """
         Get the API key
@@ -180,8 +341,94 @@ class AirbnbMixin():
         api_key = self.get_api_key_from_js_data()
         # if not api_key:
         #     api_key = self.get_api_key_from_html()
+        if api_key:
+            self.api_key_cache.set(api_key)
+        return api_key
+
+    def get_cached_api_key(self) -> str:
+        """
+        Get the cached API key or the key from the current listing page
+        """
+        api_key = self.api_key_cache.get()
+        if api_key:
+            return api_key
+        if not self.context.source_code:
+            self.load_source()
+        return self._get_page_api_key()
+
+    async def aget_cached_api_key(self) -> str:
+        """
+        Get the cached API key or the key from the current listing page
+        (asynchronous version)
+        """
+        api_key = self.api_key_cache.get()
+        if api_key:
+            return api_key
+        if not self.context.source_code:
+            await self.aload_source()
+        return self._get_page_api_key()
+
+    def _get_page_api_key(self) -> str:
+        """
+        Get the API key from the current listing page
+        """
+        api_key = self.get_api_key()
+        if not api_key:
+            raise ParserException('The API key has not been found.')
         return api_key
 
+    def refresh_price(self, listing_id: Union[int, str]) -> Optional[Decimal]:
+        """
+        Get the price of a known listing with the cached API key
+        (the listing page is requested only to get a new key)
+
+        :param listing_id: the listing ID
+        """
+        self.new_context(self.listing_url.format(id=listing_id))
+        for _ in range(2):
+            api_key = self.get_cached_api_key()
+            response = self.http_client.get(
+                self.get_listing_price_url(listing_id, api_key),
+                use_cache=False)
+            if self._check_price_response(response, api_key):
+                return self._get_price_from_listings(
+                    self._set_listing_price_data(response))
+        raise ParserException('The API key has been rejected.')
+
+    async def arefresh_price(self,
+                             listing_id: Union[int, str]) -> Optional[Decimal]:
+        """
+        Get the price of a known listing with the cached API key
+        (asynchronous version)
+
+        :param listing_id: the listing ID
+        """
+        self.new_context(self.listing_url.format(id=listing_id))
+        for _ in range(2):
+            api_key = await self.aget_cached_api_key()
+            response = await self.async_http_client.get(
+                self.get_listing_price_url(listing_id, api_key),
+                use_cache=False)
+            if self._check_price_response(response, api_key):
+                return self._get_price_from_listings(
+                    self._set_listing_price_data(response))
+        raise ParserException('The API key has been rejected.')
+
+    def _check_price_response(self, response: HttpResponse,
+                              api_key: str) -> bool:
+        """
+        Check the price API response and invalidate the rejected API key
+
+        :return: False if the API key has been rejected
+        """
+        if response.status_code in self.auth_error_codes:
+            self.api_key_cache.invalidate(api_key)
+            self.source_code = ''
+            self._js_data = None
+            return False
+        self._check_response(response)
+        return True
+
     def get_api_key_from_js_data(self) -> Optional[str]:
         """
         Get the API key from the JS data
@@ -195,17 +442,56 @@ class AirbnbMixin():
         if self._js_data:
             return self._js_data
 
-        fallback = False
-        element = self.parser.select_one(self.script_selector)
-        if not element:
-            element = self.parser.select_one(self.script_selector_fallback)
-        if element:
+        finders: List[Callable[[], Optional[str]]] = [self._select_script]
+        if self.fast_extraction:
+            # the DOM is built only if the raw script is not found
+            # or its JSON is invalid (e.g. a commented out or truncated one)
+            finders.insert(
+                0, lambda: self._find_script(self.context.source_code,
+                                             self.context.encoding))
+        for find in finders:
+            script = find()
+            if script is None:
+                continue
             try:
-                self._js_data = json.loads(
-                    element.text.replace('<!--', '').replace('-->', ''))
+                data = json.loads(
+                    script.replace('<!--', '').replace('-->', ''))
             except json.decoder.JSONDecodeError:
-                return self._js_data
-        if not fallback and element and isinstance(self._js_data, dict):
-            self._js_data = self._js_data.get('bootstrapData')
+                continue
+            if isinstance(data, dict):
+                data = data.get('bootstrapData')
+            self._js_data = data
+            break
 
         return self._js_data
+
+    def _find_script(self,
+                     source_code: Union[str, bytes],
+                     encoding: str = None) -> Optional[str]:
+        """
+        Find the js data script in the raw source code without a DOM
+        (only the script is decoded)
+        :param source_code: the raw bytes or the text of the page
+        :param encoding: the declared encoding of the bytes
+        """
+        if isinstance(source_code, str):
+            source_code = source_code.encode('utf-8')
+            encoding = 'utf-8'
+        for pattern in self.script_patterns:
+            match = pattern.search(source_code)
+            if not match:
+                continue
+            end = source_code.find(b'</script', match.end())
+            if end != -1:
+                return decode(source_code[match.end():end], encoding)
+        return None
+
+    def _select_script(self) -> Optional[str]:
+        """
+        Select the js data script from the parsed source code
+        """
+        document = self.document
+        element = document.select_one(self.script_selector)
+        if not element:
+            element = document.select_one(self.script_selector_fallback)
+        return element.text if element else None
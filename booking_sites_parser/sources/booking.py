@@ -1,14 +1,39 @@
 """
 Boooking.com module
 """
-
-from collections import namedtuple
+import re
 from decimal import Decimal
 from typing import Any, List, Optional
 
 from booking_sites_parser.models import BaseSource
 
 
+class Facility(dict):
+    """
+    Property facility (a dictionary with the attribute access,
+    so it is serialized as a JSON object)
+    """
+
+    def __init__(self, category: str, name: str) -> None:
+        """
+        Class constructor
+
+        :param category: the facility category
+        :param name: the facility name
+        """
+        super().__init__(category=category, name=name)
+
+    @property
+    def category(self) -> str:
+        """ Get the facility category """
+        return self['category']
+
+    @property
+    def name(self) -> str:
+        """ Get the facility name """
+        return self['name']
+
+
 class Booking(BaseSource):
     """
     Parser for airbnb.com website
@@ -16,6 +41,9 @@ class Booking(BaseSource):
 
     id: str = 'booking'
     domain: str = r'booking.*'
+    partial_parsing: bool = True
+
+    hotel_slug_pattern = re.compile(r'/hotel/([a-z]{2})/([^/.?#]+)', re.I)
 
     title_css_selector = 'h2#hp_hotel_name'
     description_css_selector = 'div#property_description_content'
@@ -23,11 +51,31 @@ class Booking(BaseSource):
     images_css_selector = 'div#photos_distinct a'
     facilities_css_selector = 'div.facilitiesChecklistSection'
 
+    def get_url_key(self, url: str) -> str:
+        """
+        Get the key of the hotel of an URL (its country and slug,
+        the same for all the languages and query strings)
+        :param url: an URL
+        """
+        match = self.hotel_slug_pattern.search(url)
+        if not match:
+            return super().get_url_key(url)
+        return '{}:{}/{}'.format(self.id, match.group(1).lower(),
+                                 match.group(2).lower())
+
+    def get_content_payload(self) -> bytes:
+        """
+        Get the content sections of the loaded page
+        (the texts of the sections and the links of the images)
+        """
+        images = '\x00'.join(self.get_images()).encode('utf-8')
+        return super().get_content_payload() + b'\x00' + images
+
     def get_images(self) -> List[str]:
         """
         Get property images
         """
-        images_links = self.parser.select(self.images_css_selector)
+        images_links = self.document.select(self.images_css_selector)
         return [
             i['href'].replace('max400', 'max1024x768') for i in images_links
         ]
@@ -37,11 +85,11 @@ class Booking(BaseSource):
         Get property amenities
         """
         facilities = []
-        Facility = namedtuple('Facility', ['category', 'name'])
-        facilities_categories = self.parser.select(
+        facilities_categories = self.document.select(
             self.facilities_css_selector)
         for category in facilities_categories:
-            category_name = category.select_one('h5').text.strip()
+            heading = category.select_one('h5')
+            category_name = heading.text.strip() if heading else ''
             for facility in category.select('ul li'):
                 tag = facility.select_one('span')
                 if not tag:
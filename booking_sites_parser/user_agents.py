@@ -0,0 +1,93 @@
+"""
+User agents of the HTTP clients
+"""
+import random
+import threading
+from typing import Any, Optional, Sequence
+
+# desktop browsers, update from time to time
+USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:129.0) '
+    'Gecko/20100101 Firefox/129.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14.6; rv:129.0) '
+    'Gecko/20100101 Firefox/129.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 '
+    '(KHTML, like Gecko) Version/17.6 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36 Edg/128.0.0.0',
+)
+
+
+class UserAgentPool():
+    """
+    Pool of the user agents
+
+    The bundled user agents work offline. The fake-useragent package
+    is used only if it is enabled and then imported on the first request.
+    """
+
+    def __init__(
+            self,
+            user_agents: Sequence[str] = USER_AGENTS,
+            rotate: bool = True,
+            use_fake_useragent: bool = False,
+    ) -> None:
+        """
+        Class constructor
+        :param user_agents: the user agents to choose from
+        :param rotate: choose a user agent for each request
+        :param use_fake_useragent: get the user agents from fake-useragent
+                                   (falls back to the bundled ones)
+        """
+        self.user_agents = tuple(user_agents)
+        self.rotate = rotate
+        self.use_fake_useragent = use_fake_useragent
+        self._fake_useragent: Any = None
+        self._current: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _get_fake_useragent(self) -> Any:
+        """
+        Get the fake-useragent instance (created on first use)
+        or None if it is not available
+        """
+        if self._fake_useragent is None:
+            with self._lock:
+                if self._fake_useragent is None:
+                    try:
+                        from fake_useragent import UserAgent
+                        self._fake_useragent = UserAgent()
+                    except Exception:  # pylint: disable=W0703
+                        self._fake_useragent = False
+        return self._fake_useragent
+
+    def _choose(self) -> str:
+        """
+        Choose a user agent
+        """
+        fake_useragent = self.use_fake_useragent and \
+            self._get_fake_useragent()
+        if fake_useragent:
+            try:
+                return fake_useragent.random
+            except Exception:  # pylint: disable=W0703
+                pass
+        return random.choice(self.user_agents)
+
+    def get(self) -> str:
+        """
+        Get a user agent for a request
+        """
+        if self.rotate:
+            return self._choose()
+        if self._current is None:
+            self._current = self._choose()
+        return self._current
@@ -21,17 +21,36 @@ setup(
     classifiers=[
         'License :: OSI Approved :: MIT License',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
     ],
-    python_requires='>=3.6.0',
+    python_requires='>=3.7.0',
     packages=find_packages(
         exclude=['tests', '*.tests', '*.tests.*', 'tests.*']),
     include_package_data=True,
-    install_requires=['requests', 'beautifulsoup4', 'fake-useragent'],
+    install_requires=[
+        'requests',
+        'beautifulsoup4',
+        # the entry points of the sources (importlib.metadata of Python 3.8)
+        'importlib-metadata>=3.6; python_version < "3.8"',
+    ],
+    extras_require={
+        'async': ['aiohttp'],
+        'lxml': ['lxml'],
+        'html5lib': ['html5lib'],
+        'selectolax': ['selectolax'],
+        'fake-useragent': ['fake-useragent'],
+        'orjson': ['orjson'],
+        'arrow': ['pyarrow'],
+    },
     entry_points={
         "console_scripts": [
             'booking-sites-parser=booking_sites_parser.__main__:run',
-        ]
+        ],
+        'booking_sites_parser.sources': [
+            'airbnb = booking_sites_parser.sources.airbnb:Airbnb',
+            ('airbnb_plus = '
+             'booking_sites_parser.sources.airbnb_plus:AirbnbPlus'),
+            'booking = booking_sites_parser.sources.booking:Booking',
+        ],
     },
 )
@@ -1,12 +1,17 @@
 """
 Base fixtures for the test suites
 """
+import json
+import threading
 from decimal import Decimal
-from typing import Any, Callable, List, Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 import pytest
+import requests
 
 from booking_sites_parser import Address, BaseSource, Parser, Property
+from booking_sites_parser.http_client import HttpResponse
 
 
 @pytest.fixture
@@ -70,15 +75,57 @@ def airbnb_js_data() -> dict:
     }
 
 
+def make_requests_response(url: str, response: Any) -> requests.Response:
+    """
+    Convert a fake HTTP response to a requests response
+    """
+    if not isinstance(response, HttpResponse):
+        return response
+    result = requests.Response()
+    result.url = url
+    result.status_code = response.status_code or 0
+    result.reason = 'OK' if response.ok else 'Error'
+    result.encoding = 'utf-8'
+    json_data = response.json() if callable(response.json) else response.json
+    if response.json is not None:
+        result.headers['content-type'] = 'application/json'
+        result._content = json.dumps(  # pylint: disable=W0212
+            json_data).encode()
+    else:
+        result.headers['content-type'] = 'text/html; charset=utf-8'
+        result._content = response.text.encode()  # pylint: disable=W0212
+    return result
+
+
 @pytest.fixture
 def patch_http_client(monkeypatch) -> Callable:
     """
     Patch HTTP client
     """
-    client_path: str = 'booking_sites_parser.http_client.HttpClient.client.get'
+    client_path: str = 'requests.Session.get'
 
     def _make_patch(response: Callable):
-        monkeypatch.setattr(client_path, lambda x, headers: response(x))
+        monkeypatch.setattr(
+            client_path, lambda session, url, **kwargs: make_requests_response(
+                url, response(url)))
+
+    return _make_patch
+
+
+@pytest.fixture
+def patch_async_http_client(monkeypatch) -> Callable:
+    """
+    Patch asynchronous HTTP client
+    """
+    client_path: str = ('booking_sites_parser.async_http_client.'
+                        'AsyncHttpClient.get')
+
+    def _make_patch(response: Callable):
+
+        async def _get(client, url: str, use_cache: bool = True):
+            return response(url)
+
+        monkeypatch.setattr(client_path, _get)
 
     return _make_patch
 
@@ -158,3 +205,46 @@ def source() -> BaseSource:
     result.url = 'https://newsource.com/?test=true'
 
     return result
+
+
+class LocalHandler(BaseHTTPRequestHandler):
+    """
+    Keep-alive handler of the local HTTP server
+    """
+    protocol_version = 'HTTP/1.1'
+    routes: Dict[str, Callable] = {}
+
+    def do_GET(self):  # pylint: disable=C0103
+        """
+        Process a GET request
+        """
+        route = self.routes.get(self.path.split('?')[0])
+        status, headers, body = route(self) if route else (404, {}, b'')
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=W0221
+        """
+        Keep the output clean
+        """
+
+
+@pytest.fixture
+def local_server() -> Iterator[Tuple[str, Dict[str, Callable]]]:
+    """
+    Run a local HTTP server and return its URL and routes
+    """
+    routes: Dict[str, Callable] = {}
+    handler = type('Handler', (LocalHandler, ), {'routes': routes})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(server.server_address[1]), routes
+    server.shutdown()
+    server.server_close()
@@ -36,6 +36,20 @@ def test_check_url():
         'https://www.airbnb.co.uk/rooms/plus/4950937?guests=1&adults=1')
 
 
+def test_get_url_key():
+    """
+    Get_url_key should return the same key for the URLs of a listing
+    """
+    airbnb = Airbnb()
+
+    assert airbnb.get_url_key(PROPERTY_URL) == 'airbnb:14299729'
+    assert airbnb.get_url_key(
+        'https://www.airbnb.co.uk/rooms/14299729?adults=2&source_impression_id'
+        '=p3_1') == 'airbnb:14299729'
+    assert airbnb.get_url_key('https://www.airbnb.co.uk/rooms/plus/123') == \
+        'airbnb:plus/123'
+
+
 @pytest.mark.http
 def test_get_id_real_http():
     """
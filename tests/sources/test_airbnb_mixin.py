@@ -1,11 +1,26 @@
 """
 Test suite for the airbnb mixin
 """
+import asyncio
+import json
 from decimal import Decimal
 from unittest.mock import MagicMock
 
+import pytest
+
 from booking_sites_parser.http_client import HttpResponse
+from booking_sites_parser.models import ParserException
 from booking_sites_parser.sources.airbnb import Airbnb
+from booking_sites_parser.sources.airbnb_mixin import (AirbnbMixin,
+                                                       ApiKeyCache)
+
+PRICE_DETAILS = {
+    'pdp_listing_booking_details': [{
+        'p3_display_rate': {
+            'amount': '10.5'
+        }
+    }]
+}
 
 
 def test_get_js_listing_node(airbnb_js_data):
@@ -75,6 +90,89 @@ def test_get_js_data():
     assert data == {'test': 12, '15': 11}
 
 
+def test_get_js_data_without_dom():
+    """
+    Get_js_data should find the JS data in the source code
+    without building a parser
+    """
+    airbnb = Airbnb()
+    airbnb.source_code = """
+    <html>
+        <script src="app.js"></script>
+        <script type="application/json" data-state=true>
+            <!--{"bootstrapData": {"test": 12}}-->
+        </script>
+    </html>
+    """
+    assert airbnb.get_js_data() == {'test': 12}
+    assert airbnb.context.document is None
+
+
+def test_get_js_data_raw_bytes():
+    """
+    Get_js_data should decode only the JS data script of the raw bytes
+    """
+    airbnb = Airbnb()
+    airbnb.context.source_code = """
+    <html>
+        <title>Квартира</title>
+        <script data-state="true">{"bootstrapData": {"name": "Дом"}}</script>
+    </html>
+    """.encode('cp1251')
+    airbnb.context.encoding = 'cp1251'
+    assert airbnb.get_js_data() == {'name': 'Дом'}
+    assert isinstance(airbnb.context.source_code, bytes)
+    assert airbnb.context.document is None
+
+
+def test_get_js_data_invalid_script_fallback():
+    """
+    Get_js_data should fall back to the parser if the JSON
+    of the script found in the raw source code is invalid
+    """
+    airbnb = Airbnb()
+    airbnb.source_code = """
+    <html>
+        <!-- <script data-state="true">{"bootstrapData": {"te</script> -->
+        <script data-state="true">{"bootstrapData": {"test": 12}}</script>
+    </html>
+    """
+    assert airbnb.get_js_data() == {'test': 12}
+    assert airbnb.context.document is not None
+
+
+def test_get_js_data_dom_fallback():
+    """
+    Get_js_data should fall back to the parser if the script
+    is not found in the raw source code
+    """
+    airbnb = Airbnb()
+    airbnb.source_code = """
+    <html>
+        <script data-info="a>b" data-state="true">
+            {"bootstrapData": {"test": 12}}
+        </script>
+    </html>
+    """
+    assert airbnb._find_script(  # pylint: disable=W0212
+        airbnb.source_code) is None
+    assert airbnb.get_js_data() == {'test': 12}
+    assert airbnb.context.document is not None
+
+
+def test_get_js_data_fast_extraction_disabled():
+    """
+    Get_js_data should use the parser if the fast extraction is disabled
+    """
+    airbnb = Airbnb()
+    airbnb.fast_extraction = False
+    airbnb.source_code = """
+    <script data-state="true">{"bootstrapData": {"test": 12}}</script>
+    """
+    assert airbnb.get_js_data() == {'test': 12}
+    assert airbnb.context.document is not None
+
+
 def test_get_js_data_fallback():
     """
     Get_js_data should return the JS data from the source code (fallback mode)
@@ -93,6 +191,49 @@ def test_get_js_data_fallback():
     assert data == {'test': 12, '15': 11}
 
 
+def test_js_data_does_not_leak_between_listings(patch_http_client):
+    """
+    Parse should not reuse the JS data of the previous listing
+    """
+    airbnb = Airbnb()
+    html = '<script data-state="true">{}</script>'
+    pages = {
+        '1': {'bootstrapData': {'reduxData': {'homePDP': {'listingInfo': {
+            'listing': {'name': 'first'}}}}}},
+        '2': {},
+    }
+    patch_http_client(lambda x: HttpResponse(
+        200, html.format(json.dumps(pages[x[-1]])), True))
+    airbnb.get_price = MagicMock(return_value=None)
+
+    assert airbnb.parse('https://www.airbnb.com/rooms/1').title == 'first'
+    assert airbnb.parse('https://www.airbnb.com/rooms/2').title == ''
+
+
+def test_parse_without_price(patch_http_client):
+    """
+    Parse should not request the price API if the price is not requested
+    """
+    html = '<script data-state="true">{}</script>'.format(
+        json.dumps({'bootstrapData': {'reduxData': {'homePDP': {
+            'listingInfo': {'listing': {'name': 'title'}}}}}}))
+    urls = []
+
+    def _response(url: str):
+        urls.append(url)
+        return HttpResponse(200, html, True)
+
+    patch_http_client(_response)
+    airbnb = Airbnb()
+    result = airbnb.parse('https://www.airbnb.com/rooms/1',
+                          fields=['title', 'images'])
+
+    assert result.title == 'title'
+    assert result.images == []
+    assert result.price is None
+    assert urls == ['https://www.airbnb.com/rooms/1']
+
+
 def test_get_title_description(airbnb_js_data):
     """
     Get_description should return the property description
@@ -194,6 +335,31 @@ def test_get_price(patch_http_client, airbnb_js_data):
     assert price == Decimal(price)
 
 
+def test_aget_price(patch_async_http_client, airbnb_js_data):
+    """
+    Aget_price should return the property price from the API
+    """
+    airbnb = Airbnb()
+    airbnb._js_data = airbnb_js_data  # pylint: disable=W0212
+    details = {
+        'pdp_listing_booking_details': [{
+            'p3_display_rate': {
+                'amount': '99.5'
+            }
+        }]
+    }
+    urls = []
+
+    def _response(url: str):
+        urls.append(url)
+        return HttpResponse(200, '', True, details)
+
+    patch_async_http_client(_response)
+    assert asyncio.run(airbnb.aget_price()) == Decimal('99.5')
+    assert 'listing_id=777' in urls[0]
+    assert 'key=api_key' in urls[0]
+
+
 def test_get_price_not_found(patch_http_client, airbnb_js_data):
     """
     Get_price should return None if the property price is not found
@@ -258,3 +424,106 @@ def test_get_services_saving_to_variable():
     airbnb.get_services()
     airbnb.get_services()
     airbnb._get_services.assert_called_once()  # pylint: disable=W0212
+
+
+def test_api_key_cache(monkeypatch):
+    """
+    ApiKeyCache should return the key until it expires or is invalidated
+    """
+    now = [100.0]
+    monkeypatch.setattr('time.monotonic', lambda: now[0])
+    cache = ApiKeyCache(ttl=10)
+    assert cache.get() is None
+    cache.set('key')
+    assert cache.get() == 'key'
+    cache.invalidate('other_key')
+    assert cache.get() == 'key'
+    now[0] += 10
+    assert cache.get() is None
+    cache.set('key')
+    cache.invalidate('key')
+    assert cache.get() is None
+
+
+def _patch_refresh(monkeypatch, patch_http_client, airbnb_js_data,
+                   statuses=()):
+    """
+    Patch the HTTP client to return the listing page and the prices
+
+    :return: the requested URLs
+    """
+    monkeypatch.setattr(AirbnbMixin, 'api_key_cache', ApiKeyCache())
+    html = '<script data-state="true">{}</script>'.format(
+        json.dumps({'bootstrapData': airbnb_js_data}))
+    statuses = list(statuses)
+    urls = []
+
+    def _response(url: str):
+        urls.append(url)
+        if 'rooms' in url:
+            return HttpResponse(200, html, True)
+        status = statuses.pop(0) if statuses else 200
+        return HttpResponse(status, '', status == 200, PRICE_DETAILS)
+
+    patch_http_client(_response)
+    return urls
+
+
+def test_refresh_price(monkeypatch, patch_http_client, airbnb_js_data):
+    """
+    Refresh_price should request the listing page only to get the API key
+    """
+    urls = _patch_refresh(monkeypatch, patch_http_client, airbnb_js_data)
+    airbnb = Airbnb()
+
+    assert airbnb.refresh_price(1) == Decimal('10.5')
+    assert airbnb.refresh_price(2) == Decimal('10.5')
+    assert urls[0] == 'https://www.airbnb.co.uk/rooms/1'
+    assert len(urls) == 3
+    assert 'listing_id=1&' in urls[1] and 'key=api_key' in urls[1]
+    assert 'listing_id=2&' in urls[2]
+
+
+def test_refresh_price_rejected_key(monkeypatch, patch_http_client,
+                                    airbnb_js_data):
+    """
+    Refresh_price should get a new API key if the cached one is rejected
+    """
+    urls = _patch_refresh(monkeypatch, patch_http_client, airbnb_js_data,
+                          [401])
+    AirbnbMixin.api_key_cache.set('old_key')
+    airbnb = Airbnb()
+
+    assert airbnb.refresh_price(1) == Decimal('10.5')
+    assert 'key=old_key' in urls[0]
+    assert urls[1] == 'https://www.airbnb.co.uk/rooms/1'
+    assert 'key=api_key' in urls[2]
+    assert AirbnbMixin.api_key_cache.get() == 'api_key'
+
+    _patch_refresh(monkeypatch, patch_http_client, airbnb_js_data,
+                   [403, 403])
+    with pytest.raises(ParserException, match='rejected'):
+        airbnb.refresh_price(1)
+
+    _patch_refresh(monkeypatch, patch_http_client, airbnb_js_data, [404])
+    with pytest.raises(ParserException, match='failed'):
+        airbnb.refresh_price(1)
+
+
+def test_arefresh_price(monkeypatch, patch_async_http_client,
+                        airbnb_js_data):
+    """
+    Arefresh_price should return the price with the cached API key
+    """
+    monkeypatch.setattr(AirbnbMixin, 'api_key_cache', ApiKeyCache())
+    AirbnbMixin.api_key_cache.set('cached_key')
+    urls = []
+
+    def _response(url: str):
+        urls.append(url)
+        return HttpResponse(200, '', True, PRICE_DETAILS)
+
+    patch_async_http_client(_response)
+    assert asyncio.run(Airbnb().arefresh_price(5)) == Decimal('10.5')
+    assert len(urls) == 1
+    assert 'key=cached_key' in urls[0]
@@ -40,25 +40,30 @@ def test_check_url():
     assert not bookign.check_url('http://bookign.ru')
 
 
-def test_get_images(patch_http_client):
+@pytest.mark.parametrize('backend', ['html.parser', 'selectolax'])
+def test_get_images(patch_http_client, backend):
     """
     Get_images should return the property images
     """
+    pytest.importorskip('bs4' if backend == 'html.parser' else backend)
     html = '<div id="photos_distinct"><a href="/images/max400/1.jpg">\
 </a><a href="/images/max400/2.png"></a></div>'
 
     patch_http_client(lambda x: HttpResponse(200, html, True))
     booking = Booking()
+    booking.html_backend = backend
     booking.url = PROPERTY_URL
     booking.get_parser()
     images = booking.get_images()
     assert images == ['/images/max1024x768/1.jpg', '/images/max1024x768/2.png']
 
 
-def test_get_services(patch_http_client):
+@pytest.mark.parametrize('backend', ['html.parser', 'selectolax'])
+def test_get_services(patch_http_client, backend):
     """
     Get_images should return the property facilities
     """
+    pytest.importorskip('bs4' if backend == 'html.parser' else backend)
     html = '<div class="facilitiesChecklistSection"><h5>Category 1</h5>\
 <ul><li>facility 1</li><li>facility 1.1</li></ul></div>'
 
@@ -67,6 +72,7 @@ def test_get_services(patch_http_client):
 
     patch_http_client(lambda x: HttpResponse(200, html, True))
     booking = Booking()
+    booking.html_backend = backend
     booking.url = PROPERTY_URL
     booking.get_parser()
     facilities = booking.get_services()
@@ -77,6 +83,7 @@ def test_get_services(patch_http_client):
     assert facilities[1].name == 'facility 1.1'
     assert facilities[2].category == 'Category 2'
     assert facilities[2].name == 'facility 2'
+    assert facilities[2] == {'category': 'Category 2', 'name': 'facility 2'}
 
     facilities_names = booking.get_service_names()
     assert facilities_names == [
@@ -85,6 +92,39 @@ def test_get_services(patch_http_client):
     ]
 
 
+def test_get_services_without_category():
+    """
+    Get_services should return the facilities of a category without a heading
+    """
+    booking = Booking()
+    booking.source_code = '<div class="facilitiesChecklistSection">\
+<ul><li>facility</li></ul></div>'
+    facilities = booking.get_services()
+
+    assert facilities == [{'category': '', 'name': 'facility'}]
+
+
+def test_partial_parsing():
+    """
+    Booking should build only the subtrees needed by its selectors
+    """
+    booking = Booking()
+    booking.source_code = '<html><body><div class="header">Header</div>\
+<h2 id="hp_hotel_name">Hotel</h2><div id="property_description_content">\
+Description</div><p class="address"><span class="hp_address_subtitle">\
+Street, City, Country</span></p><div id="photos_distinct">\
+<a href="/max400/1.jpg"></a></div><div class="facilitiesChecklistSection">\
+<h5>Category</h5><ul><li>facility</li></ul></div></body></html>'
+
+    assert booking.partial_parsing
+    assert booking.get_title() == 'Hotel'
+    assert booking.get_description() == 'Description'
+    assert str(booking.get_address()) == 'Street, City, Country'
+    assert booking.get_images() == ['/max1024x768/1.jpg']
+    assert booking.get_service_names() == ['Category: facility']
+    assert booking.document.select_one('div.header') is None
+
+
 @pytest.mark.http
 def test_get_title_real_http():
     """
@@ -149,3 +189,52 @@ def test_get_services_real_http():
     facilities_names = booking.get_service_names()
     assert 'Languages spoken: Turkish' in facilities_names
     assert 'Food & Drink: Breakfast in the room' in facilities_names
+
+
+def test_get_url_key():
+    """
+    Get_url_key should return the same key for the URLs of a hotel
+    """
+    booking = Booking()
+    key = booking.get_url_key(PROPERTY_URL)
+
+    assert key == 'booking:gb/milestoneredcarnationhotels'
+    assert booking.get_url_key(
+        'https://booking.com/hotel/GB/milestoneredcarnationhotels.html'
+        '?label=gen173nr&aid=1') == key
+    assert booking.get_url_key('https://www.booking.com/searchresults.html'
+                               '?b=2&a=1') == \
+        'booking:https://www.booking.com/searchresults.html?a=1&b=2'
+
+
+def test_get_content_hash(patch_http_client):
+    """
+    Get_content_hash should change only with the content sections
+    """
+    pages = []
+
+    def _get_hash(html: str) -> str:
+        pages.append(html)
+        booking = Booking()
+        booking.url = PROPERTY_URL
+        booking.load_source()
+        return booking.get_content_hash()
+
+    patch_http_client(lambda x: HttpResponse(200, pages[-1], True))
+    html = '<h2 id="hp_hotel_name">Hotel</h2><div id="photos_distinct">\
+<a href="/{}.jpg"></a></div><p>{}</p>'
+    content_hash = _get_hash(html.format(1, 'token 1'))
+
+    assert _get_hash(html.format(1, 'token 2')) == content_hash
+    assert _get_hash(html.format(2, 'token 1')) != content_hash
+
+
+def test_parse_empty_page(patch_http_client):
+    """
+    Parse should return an empty property for an empty page
+    """
+    patch_http_client(lambda x: HttpResponse(200, '', True))
+    result = Booking().parse(PROPERTY_URL)
+    assert result.title == ''
+    assert result.images == []
+    assert result.services == []
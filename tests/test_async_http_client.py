@@ -0,0 +1,143 @@
+"""
+Test suite for the asynchronous HTTP client
+"""
+import asyncio
+
+from booking_sites_parser.async_http_client import AsyncHttpClient
+from booking_sites_parser.http_client import BaseHttpResponse, RetryPolicy
+
+
+def test_get(local_server):
+    """
+    The client should be able to make GET request
+    """
+    url, routes = local_server
+    routes['/'] = lambda request: (200, {}, b'<title>Local</title>')
+
+    async def _get():
+        client = AsyncHttpClient()
+        response = await client.get(url + '/')
+        await client.close()
+        return response
+
+    response = asyncio.run(_get())
+    assert isinstance(response, BaseHttpResponse)
+    assert response.status_code == 200
+    assert response.ok
+    assert response.text == '<title>Local</title>'
+    assert response.json is None
+
+
+def test_get_json(local_server):
+    """
+    The client should be able to parse a JSON response
+    """
+    url, routes = local_server
+    routes['/api'] = lambda request: (200, {
+        'Content-Type': 'application/json'
+    }, b'{"key": "value"}')
+
+    async def _get():
+        client = AsyncHttpClient()
+        response = await client.get(url + '/api')
+        await client.close()
+        return response
+
+    assert asyncio.run(_get()).json == {'key': 'value'}
+
+
+def test_get_invalid(local_server):
+    """
+    The client should be able to process invalid URLs
+    """
+    url = local_server[0]
+
+    async def _get():
+        client = AsyncHttpClient()
+        responses = [
+            await client.get(url + '/404'),
+            await client.get('http://127.0.0.1:1/'),
+        ]
+        await client.close()
+        return responses
+
+    not_found, invalid = asyncio.run(_get())
+    assert not not_found.ok
+    assert not_found.status_code == 404
+    assert not invalid.ok
+    assert invalid.status_code is None
+    assert not invalid.text
+
+
+def test_keep_alive_connections_reuse(local_server):
+    """
+    The client should reuse the keep-alive connections
+    """
+    url, routes = local_server
+    routes['/'] = lambda request: (200, {}, b'')
+    client = AsyncHttpClient()
+
+    async def _get():
+        for _ in range(4):
+            await client.get(url + '/')
+        await client.close()
+
+    asyncio.run(_get())
+    assert client.stats.requests == 4
+    assert client.stats.connections == 1
+
+
+def test_retries(local_server):
+    """
+    The client should retry the overloaded server statuses
+    """
+    url, routes = local_server
+    calls = []
+
+    def _busy(request):
+        calls.append(request.path)
+        return (503 if len(calls) < 2 else 200), {'Retry-After': '0'}, b''
+
+    routes['/'] = _busy
+    client = AsyncHttpClient(retry_policy=RetryPolicy(backoff_factor=0))
+
+    async def _get():
+        response = await client.get(url + '/')
+        await client.close()
+        return response
+
+    assert asyncio.run(_get()).ok
+    assert len(calls) == 2
+
+
+def test_sessions_by_loop():
+    """
+    The client should keep a session per running event loop
+    and drop the sessions of the closed loops
+    """
+    client = AsyncHttpClient()
+
+    async def _get_session():
+        return client.session
+
+    first = asyncio.run(_get_session())
+    second = asyncio.run(_get_session())
+    assert first is not second
+    assert list(client._sessions.values()) == [  # pylint: disable=W0212
+        second
+    ]
+    # the sessions without connections can be detached from the closed loops
+    first.detach()
+    second.detach()
+
+    loop = asyncio.new_event_loop()
+    try:
+        session = loop.run_until_complete(_get_session())
+        other = asyncio.run(_get_session())
+        other.detach()
+        assert other is not session
+        assert loop.run_until_complete(_get_session()) is session
+        loop.run_until_complete(client.close())
+        assert session.closed
+    finally:
+        loop.close()
@@ -0,0 +1,131 @@
+"""
+Test suite for the columnar batches
+"""
+import math
+from decimal import Decimal
+from typing import List
+
+import pytest
+
+from booking_sites_parser.batches import (PropertyBatch, iter_batches,
+                                          write_arrow, write_parquet)
+from booking_sites_parser.models import Address, Property
+
+
+@pytest.fixture
+def properties(address: Address) -> List[Property]:
+    """
+    Returns the properties with and without the optional fields
+    """
+    first = Property('https://www.booking.com/hotel/1.html')
+    first.source_id = 'booking'
+    first.title = 'Hotel'
+    first.address = address
+    first.price = Decimal('99.90')
+    first.max_guests = 4
+    first.images = ['image1', 'image2']
+    first.service_names = ['Wi-Fi']
+    second = Property('https://www.airbnb.com/rooms/2')
+    second.source_id = 'airbnb'
+    third = Property('https://www.booking.com/hotel/3.html')
+    third.source_id = 'booking'
+    third.address = Address(address='road', region='region', country='other')
+    third.images = ['image3']
+    third.service_names = ['TV', 'Wi-Fi']
+    return [first, second, third]
+
+
+def test_property_batch(properties: List[Property]):
+    """
+    Property batch should store the properties by columns
+    """
+    batch = PropertyBatch.create_from_properties(properties)
+
+    assert len(batch) == 3
+    assert batch.url == [x.url for x in properties]
+    assert batch.title == ['Hotel', None, None]
+    assert batch.address == ['street', None, 'road']
+    assert batch.price[0] == 99.9
+    assert math.isnan(batch.price[1])
+    assert list(batch.max_guests) == [4, -1, -1]
+
+
+def test_property_batch_dictionaries(properties: List[Property]):
+    """
+    Property batch should encode the repeated strings with the dictionaries
+    """
+    batch = PropertyBatch.create_from_properties(properties)
+
+    assert batch.source_id.dictionary == ['booking', 'airbnb']
+    assert list(batch.source_id.indices) == [0, 1, 0]
+    assert list(batch.country.indices) == [0, -1, 1]
+    assert batch.country.to_pylist() == ['country', None, 'other']
+    assert batch.region.dictionary == ['region']
+
+
+def test_property_batch_lists(properties: List[Property]):
+    """
+    Property batch should store the lists as the offsets and the values
+    """
+    batch = PropertyBatch.create_from_properties(properties)
+
+    assert list(batch.images.offsets) == [0, 2, 2, 3]
+    assert batch.images.values == ['image1', 'image2', 'image3']
+    assert batch.service_names.to_pylist() == [['Wi-Fi'], [], ['TV', 'Wi-Fi']]
+
+
+def test_iter_batches(properties: List[Property]):
+    """
+    Iter_batches should group the properties by the batch size
+    """
+    batches = list(iter_batches(properties * 3, batch_size=4))
+
+    assert [len(x) for x in batches] == [4, 4, 1]
+    assert not list(iter_batches([]))
+
+
+def test_property_batch_to_arrow(properties: List[Property]):
+    """
+    Property batch should be converted to an Arrow record batch
+    """
+    pyarrow = pytest.importorskip('pyarrow')
+    record_batch = PropertyBatch.create_from_properties(properties).to_arrow()
+    data = record_batch.to_pydict()
+
+    assert record_batch.schema.field('source_id').type == pyarrow.dictionary(
+        pyarrow.int32(), pyarrow.string())
+    assert data['source_id'] == ['booking', 'airbnb', 'booking']
+    assert data['price'] == [99.9, None, None]
+    assert data['max_guests'] == [4, None, None]
+    assert data['country'] == ['country', None, 'other']
+    assert data['images'] == [['image1', 'image2'], [], ['image3']]
+
+
+def test_write_parquet(properties: List[Property], tmp_path):
+    """
+    Write_parquet should write the batches to a Parquet file
+    """
+    pytest.importorskip('pyarrow')
+    from pyarrow import parquet
+    path = str(tmp_path / 'results.parquet')
+    count = write_parquet(iter_batches(properties * 2, batch_size=4), path)
+    table = parquet.read_table(path)
+
+    assert count == 6
+    assert table.num_rows == 6
+    assert table.column('url').to_pylist() == [x.url for x in properties] * 2
+
+
+def test_write_arrow(properties: List[Property], tmp_path):
+    """
+    Write_arrow should write the batches to an Arrow stream file
+    """
+    pyarrow = pytest.importorskip('pyarrow')
+    path = str(tmp_path / 'results.arrow')
+    count = write_arrow(iter_batches(properties, batch_size=2), path)
+    with pyarrow.OSFile(path) as source:
+        table = pyarrow.ipc.open_stream(source).read_all()
+
+    assert count == 3
+    assert table.column('service_names').to_pylist() == [['Wi-Fi'], [],
+                                                         ['TV', 'Wi-Fi']]
@@ -0,0 +1,110 @@
+"""
+Test suite for the request coalescing
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from booking_sites_parser.coalescing import RequestCoalescer
+
+
+def test_call_coalesced():
+    """
+    The concurrent calls with the same key should share one execution
+    """
+    coalescer = RequestCoalescer()
+    calls = []
+    started = threading.Event()
+
+    def _slow(value):
+        calls.append(value)
+        started.set()
+        time.sleep(0.1)
+        return value * 2
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(coalescer.call, 'key', _slow, 1)
+        started.wait()
+        waiters = [
+            executor.submit(coalescer.call, 'key', _slow, 1) for _ in range(3)
+        ]
+        results = [leader.result()] + [x.result() for x in waiters]
+
+    assert results == [2] * 4
+    assert calls == [1]
+    assert str(coalescer.stats) == 'calls: 1, coalesced: 3, reused: 0'
+
+
+def test_call_remembered():
+    """
+    The recent results should be reused and the old ones forgotten
+    """
+    coalescer = RequestCoalescer(max_results=2)
+    calls = []
+
+    def _call(value):
+        calls.append(value)
+        return None
+
+    for key in ['a', 'b', 'a', 'c', 'a', 'b']:
+        assert coalescer.call(key, _call, key) is None
+
+    assert calls == ['a', 'b', 'c', 'b']
+    assert coalescer.stats.reused == 2
+    assert RequestCoalescer(max_results=0).call('a', _call, 'd') is None
+
+
+def test_call_exception():
+    """
+    An exception should be raised but not remembered
+    """
+    coalescer = RequestCoalescer()
+
+    def _fail():
+        raise ValueError('error')
+
+    with pytest.raises(ValueError):
+        coalescer.call('key', _fail)
+    assert coalescer.call('key', lambda: 'value') == 'value'
+
+
+def test_acall_coalesced():
+    """
+    The concurrent coroutines with the same key should share one execution
+    """
+    coalescer = RequestCoalescer()
+    calls = []
+
+    async def _slow(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value * 2
+
+    async def _run():
+        return await asyncio.gather(
+            *[coalescer.acall('key', _slow, 2) for _ in range(5)])
+
+    assert asyncio.run(_run()) == [4] * 5
+    assert calls == [2]
+    assert coalescer.stats.coalesced == 4
+
+
+def test_acall_exception():
+    """
+    An exception of a coroutine should be shared with the waiters
+    """
+    coalescer = RequestCoalescer()
+
+    async def _fail():
+        await asyncio.sleep(0.01)
+        raise ValueError('error')
+
+    async def _run():
+        return await asyncio.gather(
+            *[coalescer.acall('key', _fail) for _ in range(3)],
+            return_exceptions=True)
+
+    assert [type(x) for x in asyncio.run(_run())] == [ValueError] * 3
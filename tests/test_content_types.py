@@ -0,0 +1,46 @@
+"""
+Test suite for the content types and encodings
+"""
+from booking_sites_parser.content_types import (decode, get_encoding,
+                                                get_media_type, is_json_type)
+
+
+def test_get_media_type():
+    """
+    Get_media_type should return the media type without the parameters
+    """
+    assert get_media_type('Application/JSON; charset=utf-8') == \
+        'application/json'
+    assert get_media_type(None) == ''
+
+
+def test_is_json_type():
+    """
+    Is_json_type should match the JSON media types only
+    """
+    assert is_json_type('application/json')
+    assert is_json_type('application/problem+json')
+    assert not is_json_type('text/html')
+    assert not is_json_type('')
+
+
+def test_get_encoding():
+    """
+    Get_encoding should return the declared encoding only
+    """
+    html = b'<html><head><meta charset="windows-1251"></head></html>'
+    assert get_encoding('text/html; charset="ISO-8859-1"') == 'iso8859-1'
+    assert get_encoding('text/html', html) == 'cp1251'
+    assert get_encoding(None, html) == 'cp1251'
+    assert get_encoding('application/json', html) is None
+    assert get_encoding('text/html', b' ' * 1024 + html) is None
+    assert get_encoding('text/html; charset=unknown') is None
+
+
+def test_decode():
+    """
+    Decode should use UTF-8 if the encoding is not declared
+    """
+    assert decode('тест'.encode('cp1251'), 'cp1251') == 'тест'
+    assert decode('тест'.encode()) == 'тест'
+    assert decode(b'\xff') == '�'
@@ -0,0 +1,163 @@
+"""
+Test suite for the HTML parser backends
+"""
+import pytest
+from bs4 import FeatureNotFound
+
+from booking_sites_parser.html_backends import (BACKENDS, HtmlDocument,
+                                                HtmlElement, SelectorRoot,
+                                                SelectorStrainer,
+                                                create_document)
+
+HTML = '''<html><body>
+<h2 id="title">Test <b>title</b></h2>
+<div class="images"><a href="/1.jpg">one</a><a href="/2.jpg">two</a></div>
+<p class="address text"><span>Street, Country</span></p>
+</body></html>'''
+
+PACKAGES = {
+    'html.parser': 'bs4',
+    'lxml': 'lxml',
+    'html5lib': 'html5lib',
+    'selectolax': 'selectolax.lexbor',
+}
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request) -> str:
+    """
+    Returns an available backend name
+    """
+    pytest.importorskip(PACKAGES[request.param])
+    return request.param
+
+
+def test_create_document(backend: str):
+    """
+    Create_document should parse the source code with the backend
+    """
+    document = create_document(HTML, backend)
+
+    assert isinstance(document, HtmlDocument)
+    assert document.tree is not None
+    title = document.select_one('h2#title')
+    assert isinstance(title, HtmlElement)
+    assert title.text == 'Test title'
+    assert document.select_one('h2#invalid') is None
+
+
+def test_create_document_from_bytes(backend: str):
+    """
+    Create_document should parse the raw bytes with the declared encoding
+    """
+    html = '<html><body><h2 id="title">Тест</h2></body></html>'
+    for encoding in ('utf-8', 'cp1251'):
+        document = create_document(html.encode(encoding), backend,
+                                   encoding=encoding)
+        assert document.select_one('h2#title').text == 'Тест'
+    document = create_document(html.encode(), backend)
+    assert document.select_one('h2#title').text == 'Тест'
+
+
+def test_select_elements(backend: str):
+    """
+    The elements should be selected by the CSS selectors
+    """
+    document = create_document(HTML, backend)
+    links = document.select('div.images a')
+
+    assert [a['href'] for a in links] == ['/1.jpg', '/2.jpg']
+    assert [a.text for a in links] == ['one', 'two']
+    assert links[0].get('title') is None
+    assert links[0].get('title', 'default') == 'default'
+    with pytest.raises(KeyError):
+        assert links[0]['title']
+
+    address = document.select_one('p.address')
+    assert address.get('class') == 'address text'
+    assert address.select_one('span').text == 'Street, Country'
+    assert len(address.select('span')) == 1
+
+
+def test_unknown_backend():
+    """
+    Create_document should raise an exception for an unknown backend
+    """
+    with pytest.raises(ValueError) as exception:
+        create_document(HTML, 'invalid')
+    assert 'Unknown HTML backend: invalid' in str(exception.value)
+
+
+def test_missing_backend_package(monkeypatch):
+    """
+    Create_document should raise an import error if the backend package
+    is not installed
+    """
+
+    def _soup(source_code: str, features: str, **kwargs):
+        raise FeatureNotFound(features)
+
+    monkeypatch.setattr('booking_sites_parser.html_backends.BeautifulSoup',
+                        _soup)
+    with pytest.raises(ImportError):
+        create_document(HTML, 'lxml')
+
+
+@pytest.mark.parametrize('selector,tag,element_id,classes', [
+    ('h2#title', 'h2', 'title', set()),
+    ('p.address.text span.subtitle', 'p', None, {'address', 'text'}),
+    ('div#photos>a', 'div', 'photos', set()),
+    ('.section ul li', None, None, {'section'}),
+    ('*#main', None, 'main', set()),
+])
+def test_selector_root(selector, tag, element_id, classes):
+    """
+    SelectorRoot should be created from the first compound of a selector
+    """
+    root = SelectorRoot.create_from_selector(selector)
+    assert root.tag == tag
+    assert root.element_id == element_id
+    assert root.classes == classes
+
+
+@pytest.mark.parametrize('selector', [
+    'script[data-state=true]',
+    'li:first-child span',
+    '#one#two',
+    '',
+])
+def test_selector_root_not_supported(selector):
+    """
+    SelectorRoot should not be created from the unsupported selectors
+    """
+    assert SelectorRoot.create_from_selector(selector) is None
+    assert SelectorStrainer.create_from_selectors(['h2', selector]) is None
+
+
+@pytest.mark.parametrize('backend', ['html.parser', 'lxml'])
+def test_create_document_parse_only(backend: str):
+    """
+    Create_document should build only the subtrees needed by the selectors
+    """
+    pytest.importorskip(PACKAGES[backend])
+    selectors = ['h2#title', 'p.address span', 'div.images a']
+    document = create_document(HTML, backend, parse_only=selectors)
+
+    assert document.select_one('body') is None
+    assert document.select_one('h2#title').text == 'Test title'
+    assert document.select_one('p.address span').text == 'Street, Country'
+    assert len(document.select('div.images a')) == 2
+    assert len(document.tree.find_all(True)) == 7
+
+
+def test_create_document_parse_only_not_supported():
+    """
+    Create_document should parse the whole document if the selectors
+    are not supported or the backend can't build the subtrees only
+    """
+    document = create_document(HTML, parse_only=['h2[id=title]'])
+    assert document.select_one('body') is not None
+
+    pytest.importorskip('html5lib')
+    document = create_document(HTML, 'html5lib', parse_only=['h2#title'])
+    assert document.select_one('body') is not None
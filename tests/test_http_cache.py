@@ -0,0 +1,173 @@
+"""
+Test suite for the HTTP cache
+"""
+import asyncio
+
+from booking_sites_parser.async_http_client import AsyncHttpClient
+from booking_sites_parser.http_cache import HttpCache, normalize_url
+from booking_sites_parser.http_client import HttpClient
+
+
+def test_normalize_url():
+    """
+    Normalize_url should return the same key for the equivalent URLs
+    """
+    assert normalize_url('HTTPS://WWW.Example.com:443?b=2&a=1#top') == \
+        'https://www.example.com/?a=1&b=2'
+    assert normalize_url('http://example.com:8080/Path') == \
+        'http://example.com:8080/Path'
+
+
+def test_cache_get_set(monkeypatch, tmp_path):
+    """
+    The cache should persist the compressed responses with their validators
+    """
+    now = [1000.0]
+    monkeypatch.setattr('time.time', lambda: now[0])
+    path = str(tmp_path / 'cache.sqlite')
+    cache = HttpCache(path, ttl=10)
+    text = '<html>' + 'text ' * 1000 + '</html>'
+    assert cache.get('https://example.com/') is None
+    cache.set('https://example.com/?b=1&a=2', text, '"etag"', 'yesterday')
+    cache.close()
+
+    cache = HttpCache(path, ttl=10)
+    entry = cache.get('https://example.com/?a=2&b=1')
+    assert entry.text == text
+    assert cache.size < len(text) / 10
+    assert cache.is_fresh(entry)
+    assert entry.get_conditional_headers() == {
+        'if-none-match': '"etag"',
+        'if-modified-since': 'yesterday',
+    }
+    now[0] += 10
+    assert not cache.is_fresh(cache.get('https://example.com/?a=2&b=1'))
+    cache.touch('https://example.com/?a=2&b=1')
+    assert cache.is_fresh(cache.get('https://example.com/?a=2&b=1'))
+    cache.clear()
+    assert cache.size == 0
+
+
+def test_cache_content_type():
+    """
+    The cache should keep the raw body with its content type
+    """
+    cache = HttpCache(':memory:')
+    content = 'Тест'.encode('cp1251')
+    cache.set('https://example.com/', content, content_type='text/plain; '
+              'charset=cp1251')
+    entry = cache.get('https://example.com/')
+    assert entry.content == content
+    assert entry.text == 'Тест'
+
+
+def test_cache_lru_eviction(monkeypatch):
+    """
+    The cache should evict the least recently used responses
+    """
+    now = [1000.0]
+    monkeypatch.setattr('time.time', lambda: now[0])
+    cache = HttpCache(':memory:')
+    cache.set('https://example.com/1', 'first')
+    cache.max_size = cache.size * 2
+    for i in range(2, 4):
+        now[0] += 1
+        cache.set('https://example.com/{}'.format(i), 'other')
+        now[0] += 1
+        cache.get('https://example.com/1')
+    assert cache.get('https://example.com/1')
+    assert cache.get('https://example.com/2') is None
+    assert cache.get('https://example.com/3')
+
+
+def test_cache_access_batches(monkeypatch, tmp_path):
+    """
+    The cache should save the access times of the hits in batches
+    and keep the size of the bodies without scanning them
+    """
+    now = [1000.0]
+    monkeypatch.setattr('time.time', lambda: now[0])
+    path = str(tmp_path / 'cache.sqlite')
+    cache = HttpCache(path)
+    cache.access_batch_size = 2
+    cache.set('https://example.com/1', 'first')
+    cache.set('https://example.com/2', 'second')
+    size = cache.size
+
+    def _accessed_at(key):
+        # pylint: disable=W0212
+        return cache._connection.execute(
+            'SELECT accessed_at FROM responses WHERE key = ?',
+            (key, )).fetchone()[0]
+
+    now[0] += 1
+    cache.get('https://example.com/1')
+    assert _accessed_at('https://example.com/1') == 1000.0
+    cache.get('https://example.com/2')
+    assert _accessed_at('https://example.com/1') == 1001.0
+    now[0] += 1
+    cache.get('https://example.com/1')
+    cache.set('https://example.com/2', 'second')
+    assert cache.size == size
+    cache.close()
+
+    cache = HttpCache(path)
+    assert cache.size == size
+    assert _accessed_at('https://example.com/1') == 1002.0
+
+
+def test_http_client_cache(local_server, monkeypatch):
+    """
+    The client should serve the fresh responses from the cache
+    and revalidate the stale ones
+    """
+    now = [1000.0]
+    monkeypatch.setattr('time.time', lambda: now[0])
+    url, routes = local_server
+    requests = []
+
+    def _page(request):
+        requests.append(request.headers.get('If-None-Match'))
+        if request.headers.get('If-None-Match') == '"v1"':
+            return 304, {'ETag': '"v1"'}, b''
+        return 200, {
+            'ETag': '"v1"',
+            'Content-Type': 'application/json',
+        }, b'{"page": 1}'
+
+    routes['/page'] = _page
+    cache = HttpCache(':memory:', ttl=60)
+    client = HttpClient(cache=cache)
+
+    assert client.get(url + '/page').json == {'page': 1}
+    assert client.get(url + '/page').json == {'page': 1}
+    now[0] += 60
+    response = client.get(url + '/page')
+    assert response.status_code == 200
+    assert response.text == '{"page": 1}'
+    assert requests == [None, '"v1"']
+    assert str(cache.stats) == 'hits: 1, revalidated: 1, misses: 1'
+    assert not client.get(url + '/404').ok
+    assert cache.get(url + '/404') is None
+    assert client.get(url + '/page?price=1', use_cache=False).ok
+    assert client.get(url + '/page?price=1', use_cache=False).ok
+    assert requests[2:] == [None, None]
+    assert cache.get(url + '/page?price=1') is None
+
+
+def test_async_http_client_cache(local_server):
+    """
+    The asynchronous client should serve the responses from the cache
+    """
+    url, routes = local_server
+    calls = []
+    routes['/'] = lambda request: calls.append(1) or (200, {}, b'cached')
+    client = AsyncHttpClient(cache=HttpCache(':memory:'))
+
+    async def _get():
+        responses = [await client.get(url + '/') for _ in range(3)]
+        await client.close()
+        return responses
+
+    assert [r.text for r in asyncio.run(_get())] == ['cached'] * 3
+    assert len(calls) == 1
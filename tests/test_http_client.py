@@ -1,11 +1,16 @@
 """
 Test suite for the HTTP client
 """
+import time
+
 import pytest
 import requests
 
-from booking_sites_parser.http_client import (BaseHttpResponse, HttpClient,
-                                              HttpResponse)
+from booking_sites_parser.http_client import (BaseHttpResponse,
+                                              CircuitBreaker, HttpClient,
+                                              HttpClientStats, HttpResponse,
+                                              RetryPolicy)
+from booking_sites_parser.models import BaseSource
 
 
 def _valid_request():
@@ -92,6 +97,105 @@ def test_get_json(patch_http_client):
     _json_request()
 
 
+def test_response_content():
+    """
+    The response should decode the body and parse the JSON on first use
+    """
+    content = '<title>Тест</title>'.encode('cp1251')
+    headers = {'content-type': 'text/html; charset=cp1251'}
+    response = HttpResponse(200, ok=True, headers=headers, content=content)
+    assert response.body is content
+    assert response.encoding == 'cp1251'
+    assert response.text == '<title>Тест</title>'
+    assert response.json is None
+
+    response = HttpResponse(200,
+                            ok=True,
+                            headers={'content-type': 'application/json'},
+                            content=b'{"key": "value"}')
+    assert response.is_json
+    assert response.json == {'key': 'value'}
+
+    response = HttpResponse(200, '{"key": "value"}', True)
+    assert response.json is None
+    assert response.body == '{"key": "value"}'
+    assert response.content == b'{"key": "value"}'
+
+
+def test_get_bytes(local_server):
+    """
+    The client should keep the raw body and decode it with the declared
+    encoding without detecting it
+    """
+    url, routes = local_server
+    page = '<meta charset="windows-1251"><title>Тест</title>'.encode('cp1251')
+    routes['/'] = lambda request: (200, {'Content-Type': 'text/html'}, page)
+    routes['/api'] = lambda request: (200, {}, b'{"key": "value"}')
+    client = HttpClient()
+    response = client.get(url + '/')
+    assert response.content == page
+    assert response.text.endswith('<title>Тест</title>')
+    assert response.json is None
+    assert client.get(url + '/api').json is None
+    client.close()
+
+
+def test_stats():
+    """
+    The stats should count the reused connections
+    """
+    stats = HttpClientStats()
+    assert stats.reuse_rate == 0.0
+    for _ in range(4):
+        stats.add_request()
+    stats.add_connection()
+    assert stats.reused == 3
+    assert stats.reuse_rate == 0.75
+    assert 'reuse rate: 75.00%' in str(stats)
+
+
+def test_keep_alive_connections_reuse(local_server):
+    """
+    The client should reuse the keep-alive connections
+    """
+    url, routes = local_server
+    routes['/'] = lambda request: (200, {}, b'<title>Local</title>')
+    client = HttpClient(pool_maxsize=2)
+    for _ in range(5):
+        response = client.get(url + '/')
+        assert response.ok
+        assert response.text == '<title>Local</title>'
+    assert client.stats.requests == 5
+    assert client.stats.connections == 1
+    assert client.stats.reuse_rate == 0.8
+    client.close()
+
+
+def test_keep_alive_disabled(local_server):
+    """
+    The client should open a new connection for each request
+    if the keep-alive is disabled
+    """
+    url, routes = local_server
+    routes['/'] = lambda request: (200, {}, b'')
+    client = HttpClient(keep_alive=False)
+    client.get(url + '/')
+    client.get(url + '/')
+    assert client.stats.connections == 2
+    assert client.stats.reuse_rate == 0.0
+
+
+def test_session_is_shared():
+    """
+    The client session should be created once and shared by the sources
+    """
+    client = HttpClient()
+    assert client.session is client.session
+    assert isinstance(BaseSource.http_client, HttpClient)
+    client.close()
+    assert client._session is None  # pylint: disable=W0212
+
+
 @pytest.mark.http
 def test_get_real_http():
     """
@@ -115,3 +219,130 @@ def test_get_invalid_real_http():
     """
     _invalid_request()
     _invalid_request_404()
+
+
+def _counting_route(statuses):
+    """
+    Create a route returning the statuses and counting the requests
+    """
+    calls = []
+
+    def _route(request):
+        calls.append(request.path)
+        status = statuses[min(len(calls), len(statuses)) - 1]
+        return status, {}, b'body'
+
+    return _route, calls
+
+
+def test_retries(local_server):
+    """
+    The client should retry the overloaded server statuses only
+    """
+    url, routes = local_server
+    routes['/busy'], busy_calls = _counting_route([503, 429, 200])
+    routes['/404'], not_found_calls = _counting_route([404])
+    client = HttpClient(retry_policy=RetryPolicy(backoff_factor=0))
+
+    response = client.get(url + '/busy')
+    assert response.ok
+    assert len(busy_calls) == 3
+    response = client.get(url + '/404')
+    assert response.status_code == 404
+    assert response.error == 'Status code: 404.'
+    assert len(not_found_calls) == 1
+
+
+def test_timeout(local_server):
+    """
+    The client should not wait for a stalled server longer than the timeout
+    """
+    url, routes = local_server
+
+    def _stalled(request):
+        time.sleep(0.5)
+        return 200, {}, b''
+
+    routes['/'] = _stalled
+    client = HttpClient(timeout=(1, 0.1), retry_policy=RetryPolicy(0))
+    response = client.get(url + '/')
+    assert not response.ok
+    assert response.status_code is None
+    assert 'ReadTimeout' in response.error
+
+
+def test_backoff():
+    """
+    The backoff should grow exponentially and respect Retry-After
+    """
+    policy = RetryPolicy(backoff_factor=1, max_backoff=5)
+    assert 0 <= policy.get_backoff(0) <= 1
+    assert all(0 <= policy.get_backoff(10) <= 5 for _ in range(10))
+    assert policy.get_backoff(0, '3') == 3
+    assert policy.get_backoff(0, '60') == 5
+    assert policy.should_retry(HttpResponse(500), 1)
+    assert not policy.should_retry(HttpResponse(500), 2)
+    assert not policy.should_retry(HttpResponse(404), 0)
+    assert policy.should_retry(HttpResponse(), 0)
+
+
+def test_circuit_breaker(monkeypatch):
+    """
+    The circuit breaker should open after the failures
+    and allow a single trial request after the recovery timeout
+    """
+    now = [0.0]
+    monkeypatch.setattr('time.monotonic', lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow_request()
+
+    now[0] = 10
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert not breaker.allow_request()
+
+    now[0] = 20
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow_request()
+
+
+def test_circuit_breaker_invalid_trial(monkeypatch):
+    """
+    An invalid trial request should not keep the circuit open
+    """
+    errors = [requests.exceptions.ConnectionError('refused'),
+              requests.exceptions.TooManyRedirects('redirects')]
+
+    def _get(session, url, **kwargs):
+        raise errors.pop(0)
+
+    now = [0.0]
+    monkeypatch.setattr('time.monotonic', lambda: now[0])
+    monkeypatch.setattr('requests.Session.get', _get)
+    client = HttpClient(retry_policy=RetryPolicy(0), failure_threshold=1,
+                        recovery_timeout=10)
+    assert 'refused' in client.get('https://example.com/').error
+    now[0] = 10
+    assert 'redirects' in client.get('https://example.com/').error
+    breaker = client.circuit_breakers.get('https://example.com/')
+    assert breaker.allow_request()
+
+
+def test_circuit_breaker_fails_fast(local_server):
+    """
+    The client should stop requesting a failing domain
+    """
+    url, routes = local_server
+    routes['/'], calls = _counting_route([500])
+    client = HttpClient(retry_policy=RetryPolicy(0), failure_threshold=2)
+    for _ in range(4):
+        response = client.get(url + '/')
+    assert len(calls) == 2
+    assert 'circuit breaker' in response.error
@@ -1,10 +1,19 @@
 """
 Test suite for the main module
 """
-
+import io
+import json
 from decimal import Decimal
 
-from booking_sites_parser.__main__ import json_encode
+import pytest
+
+from booking_sites_parser import serializers
+from booking_sites_parser.__main__ import (get_arguments, get_urls, in_shard,
+                                           json_encode, parse_shard,
+                                           parse_urls, run, write_jsonl)
+from booking_sites_parser.models import BaseSource
+from booking_sites_parser.router import SourceRouter
+from booking_sites_parser.sources.booking import Booking
 
 
 def test_json_encode(base_property):
@@ -14,7 +23,7 @@ def test_json_encode(base_property):
     base_property.title = 'Test property'
     base_property.description = 'Test property description'
     base_property.images = ['image one', 'image two']
-    base_property.price = Decimal(12.33)
+    base_property.price = Decimal('12.33')
     base_property.services = [
         {
             'service_one': 'service_one'
@@ -25,8 +34,143 @@ def test_json_encode(base_property):
     ]
     json_str = json_encode([base_property])
 
-    assert json_str == '[{"url": "https://booking.com", \
-"title": "Test property", "description": "Test property description", \
-"images": ["image one", "image two"], \
-"price": "12.3300000000000000710542735760100185871124267578125", \
-"services": [{"service_one": "service_one"}, {"service_two": "service_two"}]}]'
+    assert json_str == '[{"url":"https://booking.com","source_id":null,\
+"title":"Test property","description":"Test property description",\
+"address":null,"price":"12.33","images":["image one","image two"],\
+"services":[{"service_one":"service_one"},{"service_two":"service_two"}],\
+"service_names":[],"cancellation_policy":null,"max_guests":null}]'
+    assert json.loads(json_encode([base_property], indent=4)) == \
+        json.loads(json_str)
+
+
+def test_write_jsonl(base_property):
+    """
+    Write_jsonl should write and flush a line per property
+    as soon as it is yielded
+    """
+    stream = io.StringIO()
+    lines = []
+
+    def _results():
+        for i in range(3):
+            base_property.title = 'title {}'.format(i)
+            yield base_property
+            lines.append(stream.getvalue().count('\n'))
+
+    assert write_jsonl(_results(), stream) == 3
+    assert lines == [1, 2, 3]
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [r['title'] for r in records] == ['title 0', 'title 1', 'title 2']
+    assert ', "' not in stream.getvalue()
+
+
+def test_run_jsonl(monkeypatch, capsys, base_property):
+    """
+    Run should print JSON Lines with the jsonl format
+    """
+    monkeypatch.setattr('sys.argv', ['prog', '--format', 'jsonl', 'url'])
+    monkeypatch.setattr('booking_sites_parser.__main__.parse_urls',
+                        lambda urls, *args: iter([base_property] * 2))
+    run()
+    output = capsys.readouterr().out
+    assert len(output.splitlines()) == 2
+    assert json.loads(output.splitlines()[0])['url'] == base_property.url
+    assert get_arguments(['url']).format == 'json'
+
+
+def test_run_json(monkeypatch, capsys, base_property):
+    """
+    Run should print an indented array with the fast encoder
+    """
+    monkeypatch.setattr('sys.argv', ['prog', 'url'])
+    monkeypatch.setattr('booking_sites_parser.__main__.parse_urls',
+                        lambda urls, *args: iter([base_property] * 2))
+    if serializers.HAS_ORJSON:
+        monkeypatch.setattr('booking_sites_parser.serializers.json', None)
+    run()
+    output = capsys.readouterr().out
+    assert output.startswith('[\n  {\n    "url"')
+    assert len(json.loads(output)) == 2
+
+
+def test_get_urls_from_input(tmp_path):
+    """
+    Get_urls should read the URLs from the arguments and the input file
+    """
+    path = tmp_path / 'urls.txt'
+    path.write_text('https://one\n\n# comment\n  https://two  \n')
+    arguments = get_arguments(['https://zero', '--input', str(path)])
+    assert list(get_urls(arguments)) == [
+        'https://zero', 'https://one', 'https://two'
+    ]
+
+
+def test_get_urls_from_stdin(monkeypatch):
+    """
+    Get_urls should read the URLs from stdin lazily
+    """
+    monkeypatch.setattr('sys.stdin', io.StringIO('https://one\nhttps://two'))
+    urls = get_urls(get_arguments(['-i', '-']))
+    assert next(urls) == 'https://one'
+    assert list(urls) == ['https://two']
+
+
+def test_get_arguments_errors(capsys):
+    """
+    Get_arguments should reject invalid arguments
+    """
+    for args in [[], ['url', '--shard', '2/2'], ['url', '--shard', 'x']]:
+        with pytest.raises(SystemExit):
+            get_arguments(args)
+    assert 'shard' in capsys.readouterr().err
+    assert parse_shard('1/4') == (1, 4)
+
+
+def test_shards():
+    """
+    Each URL should belong to exactly one shard
+    """
+    urls = ['https://www.booking.com/hotel/{}.html'.format(i)
+            for i in range(100)]
+    shards = [
+        list(get_urls(get_arguments(urls + ['--shard', '{}/3'.format(i)])))
+        for i in range(3)
+    ]
+    assert sorted(sum(shards, [])) == sorted(urls)
+    assert all(shards)
+    router = SourceRouter([Booking()])
+    assert all(in_shard(x, 1, 3, router) for x in shards[1])
+    assert in_shard('https://example.com/', 1, 3) == in_shard(
+        'https://example.com/', 1, 3, router)
+
+
+def test_shards_by_page():
+    """
+    The URLs of the same page should belong to the same shard
+    """
+    urls = ['https://www.airbnb.co.uk/rooms/{}?adults={}'.format(i, j)
+            for i in range(20) for j in range(5)]
+    shards = [
+        set(get_urls(get_arguments(urls + ['--shard', '{}/3'.format(i)])))
+        for i in range(3)
+    ]
+    assert sorted(set.union(*shards)) == sorted(urls)
+    for shard in shards:
+        listings = {x.split('?')[0] for x in shard}
+        assert shard == {x for x in urls if x.split('?')[0] in listings}
+
+
+def test_parse_urls_options(monkeypatch):
+    """
+    Parse_urls should pass the workers and the rate to the parser
+    """
+    calls = []
+    monkeypatch.setattr(
+        'booking_sites_parser.parser.Parser.parse',
+        lambda self, urls, workers=None: calls.append(
+            (workers, self._sources[0].http_client)  # pylint: disable=W0212
+        ) or iter([]))
+    assert list(parse_urls(['url'], workers=4, rate=2.5)) == []
+    assert calls[0][0] == 4
+    assert calls[0][1].rate_limiter.rate == 2.5
+    assert BaseSource.http_client.rate_limiter is None
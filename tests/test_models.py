@@ -1,8 +1,10 @@
 """
 Test suite for the parser models
 """
+import asyncio
+import threading
 from decimal import Decimal
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 import requests
@@ -10,6 +12,9 @@ from bs4 import BeautifulSoup
 
 from booking_sites_parser import Address, BaseSource, ParserException, Property
 from booking_sites_parser.http_client import HttpResponse
+from booking_sites_parser.models import (PROPERTY_FIELDS, CompactProperty,
+                                         ParseContext, get_fields)
+from booking_sites_parser.sources.booking import Facility
 
 
 def test_property_id(base_property: Property):
@@ -78,6 +83,41 @@ def test_sources_check_url_method(source: BaseSource):
     assert 'URL has not been provided' in str(exception)
 
 
+def test_sources_new_context(source: BaseSource):
+    """
+    New_context method should reset the parse state of the source
+    """
+    source.source_code = 'old_source'
+    source._amenities = ['old_amenity']  # pylint: disable=W0212
+    context = source.new_context('https://newsource.com/new')
+
+    assert isinstance(context, ParseContext)
+    assert source.context is context
+    assert source.url == 'https://newsource.com/new'
+    assert source.source_code == ''
+    assert source.parser is None
+    assert source._amenities == []  # pylint: disable=W0212
+
+
+def test_sources_context_is_thread_local(source: BaseSource):
+    """
+    The parse context should not be shared between threads
+    """
+    source.source_code = 'main_thread'
+    results = []
+
+    def _parse():
+        results.append(source.source_code)
+        source.source_code = 'other_thread'
+
+    thread = threading.Thread(target=_parse)
+    thread.start()
+    thread.join()
+
+    assert results == ['']
+    assert source.source_code == 'main_thread'
+
+
 def test_sources_get_parser_method(source: BaseSource, patch_http_client):
     """
     Get_parser method should create a parser object
@@ -93,6 +133,31 @@ def test_sources_get_parser_method(source: BaseSource, patch_http_client):
     assert parser.title.text == title
 
 
+def test_sources_get_css_selectors(source: BaseSource):
+    """
+    Get_css_selectors should return the CSS selectors declared by the source
+    """
+    assert source.get_css_selectors() == [
+        'div.address',
+        'div.description',
+        'span.title',
+    ]
+
+
+def test_sources_partial_parsing(source: BaseSource):
+    """
+    Get_document should build only the subtrees needed by the selectors
+    if the partial parsing is enabled
+    """
+    source.source_code = '<div><span class="title">Title</span><p>text</p>\
+<div class="address">Street, Country</div></div>'
+    source.partial_parsing = True
+
+    assert source.get_title() == 'Title'
+    assert str(source.get_address()) == 'Street, Country'
+    assert source.document.select_one('p') is None
+
+
 def test_sources_get_source_method(source: BaseSource, patch_http_client):
     """
     Get_source method should save HTML source to the source_code property
@@ -105,6 +170,20 @@ def test_sources_get_source_method(source: BaseSource, patch_http_client):
     assert source.source_code == html
 
 
+def test_sources_load_source_method(source: BaseSource, patch_http_client):
+    """
+    Load_source method should keep the raw bytes until the text is needed
+    """
+    html = '<title>Тест</title>'
+    patch_http_client(lambda x: HttpResponse(200, html, True))
+    source.load_source('http://newsource.com/12')
+    assert source.context.source_code == html.encode()
+    assert source.context.encoding == 'utf-8'
+    assert source.document.select_one('title').text == 'Тест'
+    assert source.source_code == html
+    assert source.context.source_code == html
+
+
 def test_sources_get_source_method_exception(source: BaseSource,
                                              patch_http_client):
     """
@@ -125,6 +204,10 @@ def test_sources_get_source_method_exception(source: BaseSource,
         assert source.source_code == ''
     assert 'The HTTP request has failed.' in str(exception)
 
+    patch_http_client(lambda x: HttpResponse(404, '', False))
+    with pytest.raises(ParserException, match='Status code: 404.'):
+        source.get_source('http://newsource.com/12')
+
 
 def test_sources_parse_method(source: BaseSource, patch_http_client):
     """
@@ -183,6 +266,144 @@ def test_sources_parse_method(source: BaseSource, patch_http_client):
     assert result.cancellation_policy == cancellation_policy
 
 
+def test_sources_parse_method_fields(source: BaseSource, patch_http_client):
+    """
+    Parse method should call only the getters of the requested fields
+    """
+    patch_http_client(lambda x: HttpResponse(200, '<title>Test</title>', True))
+    source.get_title = MagicMock(return_value='title')
+    source.get_price = MagicMock(return_value=Decimal(10))
+    source.get_images = MagicMock(return_value=[])
+    source.get_services = MagicMock(return_value=[])
+
+    result = source.parse('https://newsource.com/1', fields=['price', 'title'])
+
+    assert result.title == 'title'
+    assert result.price == Decimal(10)
+    assert result.images == ()
+    assert result.description is None
+    assert list(vars(result)) == ['url', 'source_id', 'title', 'price']
+    source.get_images.assert_not_called()
+    source.get_services.assert_not_called()
+
+
+def test_sources_parse_changes_method(source: BaseSource, patch_http_client):
+    """
+    Parse_changes method should skip the reusable fields
+    if the content of the page has not changed
+    """
+    pages = ['<span class="title">Test</span><i>1</i>',
+             '<span class="title">Test</span><i>2</i>',
+             '<span class="title">New</span>']
+    patch_http_client(lambda x: HttpResponse(200, pages.pop(0), True))
+    source.get_title = MagicMock(return_value='title')
+    source.get_price = MagicMock(return_value=Decimal(10))
+    url = 'https://newsource.com/1'
+    fields = ['price', 'title']
+
+    result = source.parse_changes(url, {}, fields)
+    assert (result.title, result.price) == ('title', Decimal(10))
+    content_hash = result.content_hash
+    assert len(content_hash) == 32
+    hashes = {'title': content_hash, 'price': content_hash}
+
+    result = source.parse_changes(url, hashes, fields)
+    assert result.content_hash == content_hash
+    assert (result.title, result.price) == (None, Decimal(10))
+    assert source.get_title.call_count == 1
+
+    result = source.parse_changes(url, hashes, fields)
+    assert result.content_hash != content_hash
+    assert result.title == 'title'
+    assert source.get_price.call_count == 3
+
+
+def _make_property(index: int) -> Property:
+    """
+    Make a property with the strings created at runtime
+    """
+    result = Property('https://booking.com/{}'.format(index))
+    result.source_id = ''.join(['book', 'ing'])
+    result.address = Address(''.join(['Coun', 'try']), 'street',
+                             ''.join(['Reg', 'ion']))
+    result.price = Decimal(index)
+    result.images = ['image']
+    result.services = [Facility(''.join(['Gene', 'ral']), 'Wi-Fi'),
+                       {'id': 1, 'name': ''.join(['T', 'V'])}]
+    result.service_names = [''.join(['Wi', '-Fi'])]
+    return result
+
+
+def test_property_to_compact():
+    """
+    To_compact should return an immutable property
+    with the interned strings and the shared services
+    """
+    first = _make_property(1).to_compact()
+    second = _make_property(2).to_compact()
+
+    assert isinstance(first, CompactProperty)
+    assert first.images == ('image', )
+    assert first.address.country is second.address.country
+    assert first.address.region is second.address.region
+    assert first.source_id is second.source_id
+    assert first.service_names[0] is second.service_names[0]
+    assert first.services[0] is second.services[0]
+    assert first.services[1] is second.services[1]
+    assert first.services[0].category == 'General'
+    assert first.to_dict() == _make_property(1).to_dict()
+
+    result = first.to_property()
+    assert result.services == list(first.services)
+    assert result.services[0] is not first.services[0]
+    assert isinstance(result.services[0], Facility)
+    assert str(result.address) == 'street, Region, Country'
+    assert Property('url').to_compact().address is None
+
+
+def test_get_fields():
+    """
+    Get_fields should check the fields and return them in the fields order
+    """
+    assert get_fields() == PROPERTY_FIELDS
+    assert get_fields(['images', 'title', 'images']) == ('title', 'images')
+    assert get_fields([]) == ()
+    with pytest.raises(ValueError) as exception:
+        get_fields(['title', 'invalid', 'other'])
+    assert 'Invalid property fields: invalid, other.' in str(exception.value)
+
+
+def test_sources_aparse_method(source: BaseSource,
+                               patch_async_http_client):
+    """
+    Aparse method should fetch the source code asynchronously
+    and return a filled property object
+    """
+    html = '<span class="title">Test title</span>'
+    patch_async_http_client(lambda x: HttpResponse(200, html, True))
+    price = Decimal('12.3')
+    source.aget_price = AsyncMock(return_value=price)
+
+    result = asyncio.run(source.aparse('https://newsource.com/?test=true'))
+
+    assert isinstance(result, Property)
+    assert result.source_id == source.id
+    assert result.title == 'Test title'
+    assert result.price == price
+    source.aget_price.assert_awaited_once()
+
+
+def test_sources_aparse_method_exception(source: BaseSource,
+                                         patch_async_http_client):
+    """
+    Aparse method should raise an exception if a request has failed
+    """
+    patch_async_http_client(lambda x: HttpResponse())
+    with pytest.raises(ParserException) as exception:
+        asyncio.run(source.aparse('https://newsource.com/?test=true'))
+    assert 'The HTTP request has failed.' in str(exception)
+
+
 def test_sources_parse_method_invalid_url(source: BaseSource):
     """
     Parse method should call raise an exception if the invalid URL is provided
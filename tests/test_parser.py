@@ -2,13 +2,18 @@
 Test suite for the parser
 """
 
+import asyncio
+import itertools
+import time
 from collections.abc import Iterator
 from typing import Callable
+from unittest.mock import MagicMock
 
 import pytest
 
 from booking_sites_parser import BaseSource, Parser, ParserException, Property
-from booking_sites_parser.http_client import HttpResponse
+from booking_sites_parser.http_client import HttpClient, HttpResponse
+from booking_sites_parser.result_store import ResultStore
 from booking_sites_parser.sources.airbnb import Airbnb
 from booking_sites_parser.sources.airbnb_plus import AirbnbPlus
 from booking_sites_parser.sources.booking import Booking
@@ -42,6 +47,82 @@ def test_parser_initialization_with_sources(source):
     assert parser._sources[0] == source  # pylint: disable=W0212
 
 
+def test_parser_http_client(source: BaseSource):
+    """
+    The parser should set its HTTP client for its sources only
+    """
+    client = HttpClient()
+    Parser(sources=[source], http_client=client)
+    assert source.http_client is client
+    assert BaseSource.http_client is not client
+
+
+def test_parse_method_single_source(source: BaseSource,
+                                    patch_http_client: Callable):
+    """
+    Parse method should parse an URL with a single source
+    even if several sources match it
+    """
+    _patch_titles(patch_http_client)
+    other = Airbnb()
+    other.domain = source.domain
+    parser = Parser(sources=[source, other])
+    results = list(parser.parse(['https://newsource.com/1']))
+
+    assert len(results) == 1
+    assert results[0].source_id == source.id
+
+
+def test_parse_method_fields(source: BaseSource,
+                             patch_http_client: Callable,
+                             patch_async_http_client: Callable):
+    """
+    Parse and aparse methods should get only the requested fields
+    """
+    _patch_titles(patch_http_client)
+    _patch_async_titles(patch_async_http_client)
+    source.get_images = MagicMock(return_value=[])
+    parser = Parser(sources=[source])
+    urls = ['https://newsource.com/1']
+
+    async def _aparse():
+        return [p async for p in parser.aparse(urls, fields=['title'])]
+
+    for results in (list(parser.parse(urls, fields=['title'])),
+                    list(parser.parse(urls, workers=2, fields=['title'])),
+                    asyncio.run(_aparse())):
+        assert results[0].title == '1'
+        assert 'images' not in vars(results[0])
+    source.get_images.assert_not_called()
+
+    with pytest.raises(ValueError):
+        list(parser.parse(urls, fields=['invalid']))
+
+
+def test_parser_router(base_parser: Parser, source: BaseSource):
+    """
+    The parser router should be rebuilt when the sources are changed
+    """
+    router = base_parser.router
+    assert base_parser.router is router
+    assert base_parser.router.route('https://newsource.com/1') is None
+
+    base_parser.set_source(source)
+    assert base_parser.router is not router
+    assert base_parser.router.route('https://newsource.com/1') is source
+
+
+def test_parser_html_backend(source: BaseSource):
+    """
+    The parser should set the HTML backend for its sources
+    """
+    parser = Parser(sources=[source], html_backend='html5lib')
+    assert source.html_backend == 'html5lib'
+    assert Parser().get_source('booking')[1].html_backend == 'html.parser'
+    with pytest.raises(ValueError):
+        parser.set_html_backend('invalid')
+
+
 def test_parse_method_results_count(base_parser: Parser, source: BaseSource,
                                     patch_http_client: Callable):
     """
@@ -66,6 +147,284 @@ def test_parse_method_results_count(base_parser: Parser, source: BaseSource,
     assert len(list(properties)) == should_return_count - 1
 
 
+def _patch_titles(patch_http_client: Callable, delays: dict = None):
+    """
+    Patch the HTTP client to return the URL path as the title
+    """
+
+    def _response(url: str):
+        path = url.split('/')[-1]
+        time.sleep((delays or {}).get(path, 0))
+        html = '<span class="title">{}</span>'.format(path)
+        return HttpResponse(200, html, True)
+
+    patch_http_client(_response)
+
+
+def test_parse_concurrently_ordered(source: BaseSource,
+                                    patch_http_client: Callable):
+    """
+    Parse method should return the results in order of the URLs
+    when the workers are used
+    """
+    _patch_titles(patch_http_client, {'0': 0.05, '1': 0.02})
+    parser = Parser(sources=[source], concurrency=4)
+    urls = ['https://www.newsource.com/{}'.format(i) for i in range(10)]
+    urls.insert(3, 'invalid_url')
+    titles = [p.title for p in parser.parse(urls)]
+
+    assert titles == [str(i) for i in range(10)]
+
+
+def test_parse_concurrently_as_completed(source: BaseSource,
+                                         patch_http_client: Callable):
+    """
+    Parse method should return the results as soon as they are completed
+    """
+    _patch_titles(patch_http_client, {'0': 0.2})
+    parser = Parser(sources=[source])
+    urls = ['https://www.newsource.com/{}'.format(i) for i in range(4)]
+    titles = [p.title for p in parser.parse(urls, workers=2, ordered=False)]
+
+    assert sorted(titles) == ['0', '1', '2', '3']
+    assert titles[-1] == '0'
+
+
+def test_parse_dedupe(source: BaseSource, patch_http_client: Callable):
+    """
+    Parse method should fetch and parse the duplicate URLs once
+    """
+    requested = []
+
+    def _response(url: str) -> HttpResponse:
+        requested.append(url)
+        time.sleep(0.05)
+        return HttpResponse(200, '<title>{}</title>'.format(len(requested)),
+                            True)
+
+    patch_http_client(_response)
+    source.get_url_key = lambda url: url.split('?')[0]
+    parser = Parser(sources=[source])
+    urls = ['https://www.newsource.com/1?copy={}'.format(i) for i in range(4)]
+    urls.append('https://www.newsource.com/2')
+    results = list(parser.parse(urls, workers=4))
+
+    assert len(requested) == 2
+    assert [p.url for p in results] == urls
+    assert len(set(id(p) for p in results)) == 5
+    assert len(list(parser.parse(urls, dedupe=False))) == 5
+    assert len(requested) == 7
+
+
+def test_parse_result_store(monkeypatch, source: BaseSource,
+                            patch_http_client: Callable):
+    """
+    Parse method should parse only the expired fields of the stored listings
+    """
+    now = [1000.0]
+    monkeypatch.setattr('time.time', lambda: now[0])
+    requested = []
+
+    def _response(url: str) -> HttpResponse:
+        requested.append(url)
+        return HttpResponse(
+            200, '<span class="title">{}</span>'.format(len(requested)), True)
+
+    patch_http_client(_response)
+    source.get_price = MagicMock(side_effect=[10, 20])
+    source.get_url_key = lambda url: url.split('?')[0]
+    store = ResultStore(':memory:', ttls={'price': 10})
+    parser = Parser(sources=[source], result_store=store)
+    url = 'https://www.newsource.com/1'
+    fields = ['title', 'price']
+
+    assert [(p.title, p.price) for p in parser.parse([url], fields=fields)
+            ] == [('1', 10)]
+    result = list(parser.parse([url + '?copy=1'], fields=fields))[0]
+    assert (result.url, result.title, result.price) == (url + '?copy=1',
+                                                        '1', 10)
+    assert len(requested) == 1
+    now[0] += 10
+    assert [(p.title, p.price) for p in parser.parse([url], fields=fields)
+            ] == [('1', 20)]
+    assert len(requested) == 2
+    assert str(store.stats) == 'hits: 1, partial: 1, misses: 1, skipped: 0'
+
+
+def test_parse_incremental(monkeypatch, source: BaseSource,
+                           patch_http_client: Callable):
+    """
+    Parse method should parse only the volatile fields
+    of the unchanged pages in the incremental mode
+    """
+    now = [1000.0]
+    monkeypatch.setattr('time.time', lambda: now[0])
+    titles = ['Title', 'Title', 'New']
+    patch_http_client(lambda url: HttpResponse(
+        200, '<span class="title">{}</span>'.format(titles.pop(0)), True))
+    source.get_price = MagicMock(side_effect=[10, 20, 30])
+    store = ResultStore(':memory:', ttls={'price': 10, 'title': 10})
+    parser = Parser(sources=[source], result_store=store, incremental=True)
+    url = 'https://www.newsource.com/1'
+    fields = ['title', 'price']
+
+    def _parse():
+        now[0] += 10
+        return [(p.title, p.price) for p in parser.parse([url], fields=fields)]
+
+    source.get_title = MagicMock(wraps=source.get_title)
+    assert _parse() == [('Title', 10)]
+    assert _parse() == [('Title', 20)]
+    assert source.get_title.call_count == 1
+    assert _parse() == [('New', 30)]
+    assert source.get_title.call_count == 2
+    assert str(store.stats) == 'hits: 0, partial: 0, misses: 3, skipped: 1'
+
+
+def test_parse_incremental_partial(monkeypatch, source: BaseSource,
+                                   patch_http_client: Callable):
+    """
+    Parse method should not reuse the fields stored before the page
+    has changed in the incremental mode
+    """
+    now = [1000.0]
+    monkeypatch.setattr('time.time', lambda: now[0])
+    titles = ['Old', 'New', 'New']
+    patch_http_client(lambda url: HttpResponse(
+        200, '<span class="title">{}</span>'.format(titles.pop(0)), True))
+    source.get_price = MagicMock(side_effect=[10, 20, 30])
+    store = ResultStore(':memory:', ttls={'price': 10, 'title': 100})
+    parser = Parser(sources=[source], result_store=store, incremental=True)
+    url = 'https://www.newsource.com/1'
+    fields = ['title', 'price']
+
+    def _parse(delay: float):
+        now[0] += delay
+        return [(p.title, p.price) for p in parser.parse([url], fields=fields)]
+
+    assert _parse(0) == [('Old', 10)]
+    # only the price has expired, the changed title is still fresh
+    assert _parse(10) == [('Old', 20)]
+    assert _parse(100) == [('New', 30)]
+    assert store.stats.skipped == 0
+
+
+def test_parse_batches(source: BaseSource, patch_http_client: Callable):
+    """
+    Parse_batches method should group the results into the columnar batches
+    """
+    _patch_titles(patch_http_client, {})
+    parser = Parser(sources=[source])
+    urls = ['https://www.newsource.com/{}'.format(i) for i in range(5)]
+    batches = list(parser.parse_batches(urls, batch_size=2))
+
+    assert [len(x) for x in batches] == [2, 2, 1]
+    assert batches[1].title == ['2', '3']
+    assert batches[2].source_id.to_pylist() == [source.id]
+
+
+def test_parse_concurrently_bounded(source: BaseSource,
+                                    patch_http_client: Callable):
+    """
+    Parse method should not consume an endless iterator
+    faster than the workers parse the URLs
+    """
+    _patch_titles(patch_http_client)
+    consumed = []
+
+    def _urls():
+        for i in itertools.count():
+            consumed.append(i)
+            yield 'https://www.newsource.com/{}'.format(i)
+
+    parser = Parser(sources=[source])
+    results = list(itertools.islice(parser.parse(_urls(), workers=3), 20))
+
+    assert len(results) == 20
+    assert len(consumed) <= 20 + 3 * 2
+
+
+def _patch_async_titles(patch_async_http_client: Callable):
+    """
+    Patch the asynchronous HTTP client to return the URL path as the title
+    """
+
+    def _response(url: str):
+        html = '<span class="title">{}</span>'.format(url.split('/')[-1])
+        return HttpResponse(200, html, True)
+
+    patch_async_http_client(_response)
+
+
+def test_aparse(source: BaseSource, patch_async_http_client: Callable):
+    """
+    Aparse method should return an async iterator with the results
+    in the order of the URLs
+    """
+    _patch_async_titles(patch_async_http_client)
+    parser = Parser(sources=[source], concurrency=3)
+    urls = ['https://www.newsource.com/{}'.format(i) for i in range(10)]
+    urls.insert(5, 'invalid_url')
+
+    async def _parse():
+        return [p.title async for p in parser.aparse(urls)]
+
+    assert asyncio.run(_parse()) == [str(i) for i in range(10)]
+
+
+def test_aparse_as_completed(source: BaseSource,
+                             patch_async_http_client: Callable):
+    """
+    Aparse method should accept an async iterator and return the results
+    as soon as they are completed
+    """
+    _patch_async_titles(patch_async_http_client)
+    parser = Parser(sources=[source])
+
+    async def _urls():
+        for i in range(6):
+            yield 'https://www.newsource.com/{}'.format(i)
+
+    async def _parse():
+        return [
+            p.title
+            async for p in parser.aparse(_urls(), workers=4, ordered=False)
+        ]
+
+    assert sorted(asyncio.run(_parse())) == [str(i) for i in range(6)]
+
+
+def test_refresh_prices(base_parser: Parser, source: BaseSource):
+    """
+    Refresh_prices should return the properties with the listing prices
+    """
+    airbnb = base_parser.get_source('airbnb')[1]
+
+    def _refresh_price(listing_id):
+        if listing_id == 2:
+            raise ParserException('The API key has been rejected.')
+        return listing_id * 10
+
+    airbnb.refresh_price = _refresh_price
+    results = list(base_parser.refresh_prices([1, 2, 3], workers=2))
+    assert [p.price for p in results] == [10, 30]
+    assert results[0].url == 'https://www.airbnb.co.uk/rooms/1'
+    assert results[0].source_id == 'airbnb'
+
+    async def _arefresh_price(listing_id):
+        return listing_id
+
+    async def _refresh():
+        return [p.price async for p in base_parser.arefresh_prices([4, 5])]
+
+    airbnb.arefresh_price = _arefresh_price
+    assert asyncio.run(_refresh()) == [4, 5]
+
+    base_parser.set_source(source)
+    with pytest.raises(ParserException, match='can not refresh prices'):
+        list(base_parser.refresh_prices([1], source_id='new_source'))
+
+
 @pytest.mark.http
 def test_parser_method_real_http(base_parser: Parser):
     """
@@ -0,0 +1,143 @@
+"""
+Test suite for the pipelined parsing
+"""
+import json
+from decimal import Decimal
+from typing import Callable
+
+import pytest
+
+from booking_sites_parser import Parser
+from booking_sites_parser.http_client import HttpResponse
+from booking_sites_parser.models import CompactProperty
+from booking_sites_parser.pipeline import ParsePipeline, ParseTask, parse_task
+from booking_sites_parser.sources.airbnb import Airbnb
+from booking_sites_parser.sources.booking import Booking
+
+URL = 'https://www.booking.com/hotel/gb/hotel-{}.html'
+
+
+@pytest.fixture
+def booking_pages(patch_http_client: Callable) -> None:
+    """
+    Patch the HTTP client to return the Booking pages with the numbered titles
+    """
+
+    def _response(url: str) -> HttpResponse:
+        number = url.rsplit('-', 1)[-1].split('.')[0]
+        return HttpResponse(
+            200, '<h2 id="hp_hotel_name">Hotel {}</h2>'.format(number), True)
+
+    patch_http_client(_response)
+
+
+def test_parse_task():
+    """
+    Parse_task should parse a fetched page with a source
+    created by its import path
+    """
+    task = ParseTask('booking_sites_parser.sources.booking:Booking', 'lxml',
+                     URL.format(1), b'<h2 id="hp_hotel_name">Hotel</h2>',
+                     'utf-8', ('title', 'price'))
+    result = parse_task(task)
+
+    assert isinstance(result, CompactProperty)
+    assert result.title == 'Hotel'
+    assert result.source_id == 'booking'
+    assert parse_task(task._replace(url='invalid')) is None
+
+
+def test_pipeline_fetch(booking_pages):
+    """
+    The pipeline should fetch the raw pages of the routed URLs
+    """
+    pipeline = ParsePipeline(Parser(sources=[Booking()]), parse_workers=1)
+    task = pipeline.fetch(URL.format(1))
+
+    assert task.source_path == 'booking_sites_parser.sources.booking:Booking'
+    assert task.source_code == b'<h2 id="hp_hotel_name">Hotel 1</h2>'
+    assert task.encoding == 'utf-8'
+    assert pipeline.fetch('https://invalid.com/') is None
+
+
+def test_pipeline_fetch_price(airbnb_js_data):
+    """
+    The pipeline should request the remote price with the client
+    of the parser and parse the page without it
+    """
+    page = '<script data-state="true">{}</script>'.format(
+        json.dumps({'bootstrapData': airbnb_js_data}))
+    price_data = {
+        'pdp_listing_booking_details': [{
+            'p3_display_rate': {
+                'amount': '10.5'
+            }
+        }]
+    }
+    requested = []
+
+    class _Client():
+        def get(self, url, use_cache=True):
+            requested.append(url)
+            if 'api' in url:
+                return HttpResponse(200, ok=True, json=price_data)
+            return HttpResponse(200, page, True)
+
+    parser = Parser(sources=[Airbnb()], http_client=_Client())
+    pipeline = ParsePipeline(parser, parse_workers=1)
+    task = pipeline.fetch('https://www.airbnb.co.uk/rooms/777')
+
+    assert len(requested) == 2
+    assert task.price == Decimal('10.5')
+    assert 'price' not in task.fields
+    result = parse_task(task)
+    assert result.price == Decimal('10.5')
+    assert result.title == 'test_name'
+
+
+def test_parse_pipelined(booking_pages):
+    """
+    Parse_pipelined method should fetch the pages with threads
+    and parse them with processes
+    """
+    parser = Parser(sources=[Booking()])
+    urls = [URL.format(i) for i in range(20)]
+    urls.insert(3, 'invalid_url')
+    results = list(
+        parser.parse_pipelined(urls,
+                               fetch_workers=3,
+                               parse_workers=2,
+                               queue_size=2,
+                               fields=['title']))
+
+    assert [p.title for p in results] == ['Hotel {}'.format(i)
+                                          for i in range(20)]
+    assert results[0].url == URL.format(0)
+
+    titles = [
+        p.title for p in parser.parse_pipelined(
+            urls, fetch_workers=3, parse_workers=2, ordered=False)
+    ]
+    assert sorted(titles) == sorted('Hotel {}'.format(i) for i in range(20))
+
+
+def test_pipeline_bounded(booking_pages):
+    """
+    The pipeline should not fetch more URLs than its window
+    """
+    fetched = []
+    pipeline = ParsePipeline(Parser(sources=[Booking()]),
+                             fetch_workers=2,
+                             parse_workers=1,
+                             queue_size=1)
+
+    def _urls():
+        for i in range(1000):
+            fetched.append(i)
+            yield URL.format(i)
+
+    results = pipeline.run(_urls(), compact=True)
+    assert next(results).title == 'Hotel 0'
+    results.close()
+
+    assert len(fetched) <= pipeline.window + 1
@@ -0,0 +1,95 @@
+"""
+Test suite for the rate limiter
+"""
+import pytest
+
+from booking_sites_parser.http_client import HttpClient, RetryPolicy
+from booking_sites_parser.rate_limiter import (AimdController,
+                                               DomainRateLimiter, TokenBucket)
+
+
+@pytest.fixture
+def clock(monkeypatch) -> list:
+    """
+    Patch the monotonic clock and return its current value
+    """
+    now = [100.0]
+    monkeypatch.setattr('time.monotonic', lambda: now[0])
+    return now
+
+
+def test_token_bucket(clock):
+    """
+    The bucket should allow the burst and then the rate of requests
+    """
+    bucket = TokenBucket(rate=2, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0.5
+    assert bucket.reserve() == 1.0
+    clock[0] += 1.0
+    assert bucket.reserve() == 0.5
+
+    bucket.rate = 4
+    clock[0] += 0.5
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0.25
+
+
+def test_aimd_controller(clock):
+    """
+    The controller should increase the rate additively
+    and decrease it multiplicatively once per cooldown
+    """
+    bucket = TokenBucket(rate=2)
+    controller = AimdController(bucket, min_rate=0.5, max_rate=3,
+                                latency_threshold=1)
+    controller.record(200, 0.1)
+    assert bucket.rate == 2.25
+    controller.record(429, 0.1)
+    assert bucket.rate == 1.125
+    controller.record(503, 0.1)
+    assert bucket.rate == 1.125
+    clock[0] += 1
+    controller.record(200, 2)
+    assert bucket.rate == 0.5625
+    clock[0] += 1
+    controller.record(429, 0.1)
+    assert bucket.rate == 0.5
+    for _ in range(100):
+        controller.record(200, 0.1)
+    assert bucket.rate == 3
+
+
+def test_domain_rate_limiter(clock):
+    """
+    The limiter should keep a bucket per domain
+    """
+    limiter = DomainRateLimiter(rate=1,
+                                burst=1,
+                                domain_rates={'airbnb.com': 4})
+    assert limiter.reserve('https://www.airbnb.com/rooms/1') == 0
+    assert limiter.reserve('https://airbnb.com/api/v2/') == 0.25
+    assert limiter.reserve('https://www.booking.com/hotel/') == 0
+    limiter.record('https://www.booking.com/hotel/', 429, 0.1)
+    assert limiter.rates == {'airbnb.com': 4, 'booking.com': 0.5}
+
+    limiter = DomainRateLimiter(rate=1, adaptive=False)
+    limiter.reserve('https://www.booking.com/hotel/')
+    limiter.record('https://www.booking.com/hotel/', 429, 0.1)
+    assert limiter.rates == {'booking.com': 1}
+
+
+def test_http_client_rates(local_server):
+    """
+    The client should slow down when the server throttles the requests
+    """
+    url, routes = local_server
+    statuses = [429, 200]
+    routes['/'] = lambda request: (statuses.pop(0), {}, b'')
+    client = HttpClient(retry_policy=RetryPolicy(backoff_factor=0),
+                        rate_limiter=DomainRateLimiter(rate=10))
+    assert client.rates == {}
+    assert client.get(url + '/').ok
+    assert 5 <= client.rates['127.0.0.1'] < 10
+    assert HttpClient().rates == {}
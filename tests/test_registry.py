@@ -0,0 +1,73 @@
+"""
+Test suite for the sources registry
+"""
+import subprocess
+import sys
+
+from booking_sites_parser import registry
+from booking_sites_parser.parser import Parser
+from booking_sites_parser.sources.airbnb import Airbnb
+from booking_sites_parser.sources.booking import Booking
+
+
+def test_load_object():
+    """
+    Load_object should import an object by its path
+    """
+    assert registry.load_object(
+        'booking_sites_parser.sources.booking:Booking') is Booking
+    assert registry.load_object('booking_sites_parser.registry') is registry
+
+
+def test_get_class_path():
+    """
+    Get_class_path should return the import path of a class
+    """
+    path = registry.get_class_path(Booking)
+
+    assert path == 'booking_sites_parser.sources.booking:Booking'
+    assert registry.load_object(path) is Booking
+
+
+def test_get_source_paths(monkeypatch):
+    """
+    Get_source_paths should add the entry points to the default sources
+    """
+    monkeypatch.setattr(
+        registry, '_get_entry_points', lambda: {
+            'booking': 'tests.conftest:Booking',
+            'new_source': 'tests.conftest:NewSource',
+        })
+    paths = registry.get_source_paths()
+    assert list(paths) == ['airbnb', 'airbnb_plus', 'booking', 'new_source']
+    assert paths['booking'] == 'tests.conftest:Booking'
+
+
+def test_create_sources(monkeypatch):
+    """
+    The parser should create the registered sources on first use
+    """
+    created = []
+
+    def _create_sources():
+        created.append(1)
+        return [Airbnb(), Booking()]
+
+    monkeypatch.setattr('booking_sites_parser.parser.create_sources',
+                        _create_sources)
+    parser = Parser(html_backend='lxml')
+    assert not created
+    assert parser.get_source('booking')[1].html_backend == 'lxml'
+    assert parser.router.route('https://www.booking.com/hotel/1.html')
+    assert created == [1]
+
+
+def test_lazy_package_import():
+    """
+    The package import should not load the parser dependencies
+    """
+    code = ('import sys, booking_sites_parser; '
+            'print(sorted({"bs4", "requests"} & set(sys.modules)), '
+            'booking_sites_parser.Parser.__name__)')
+    output = subprocess.check_output([sys.executable, '-c', code])
+    assert output.strip() == b'[] Parser'
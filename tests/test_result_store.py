@@ -0,0 +1,96 @@
+"""
+Test suite for the result store
+"""
+from decimal import Decimal
+
+import pytest
+
+from booking_sites_parser.models import Address, Property
+from booking_sites_parser.result_store import ResultStore
+
+
+def _create_property() -> Property:
+    """
+    Create a property with several fields
+    """
+    result = Property('https://example.com/1')
+    result.source_id = 'example'
+    result.title = 'Title'
+    result.price = Decimal('100.10')
+    result.address = Address('UK', 'London')
+    result.images = ['1.jpg', '2.jpg']
+    return result
+
+
+def test_store_get_set(monkeypatch, tmp_path):
+    """
+    The store should keep the fields of the listings with their own TTLs
+    """
+    now = [1000.0]
+    monkeypatch.setattr('time.time', lambda: now[0])
+    path = str(tmp_path / 'results.sqlite')
+    fields = ('title', 'address', 'price', 'images')
+    store = ResultStore(path, ttls={'price': 10, 'title': 20})
+    assert store.get('example:1', 'https://example.com/1', fields) == \
+        (None, fields)
+    store.set('example:1', _create_property(), fields)
+    store.close()
+
+    store = ResultStore(path, ttls={'price': 10, 'title': 20})
+    result, expired = store.get('example:1', 'https://example.com/1?a=1',
+                                fields)
+    assert expired == ()
+    assert result.url == 'https://example.com/1?a=1'
+    assert result.source_id == 'example'
+    assert result.price == Decimal('100.10')
+    assert str(result.address) == 'London, UK'
+    assert result.images == ['1.jpg', '2.jpg']
+
+    now[0] += 10
+    result, expired = store.get('example:1', 'https://example.com/1', fields)
+    assert expired == ('price', )
+    assert result.price is None
+    assert result.title == 'Title'
+    assert store.get('example:1', 'https://example.com/1',
+                     ('description', ))[1] == ('description', )
+    assert str(store.stats) == 'hits: 1, partial: 1, misses: 1, skipped: 0'
+
+    assert store.purge() == 1
+    store.clear()
+    assert store.get('example:1', 'https://example.com/1', fields)[0] is None
+
+
+def test_store_invalid_ttls():
+    """
+    The store should check the fields of the TTLs
+    """
+    with pytest.raises(ValueError, match='Invalid property fields: invalid.'):
+        ResultStore(':memory:', ttls={'invalid': 10})
+
+
+def test_store_get_previous(monkeypatch):
+    """
+    Get_previous should return the stored fields regardless of their TTLs
+    with the content hash of the page
+    """
+    now = [1000.0]
+    monkeypatch.setattr('time.time', lambda: now[0])
+    fields = ('title', 'price', 'description')
+    store = ResultStore(':memory:')
+    assert store.get_previous('example:1', 'https://example.com/1',
+                              fields) == (None, (), {})
+    store.set('example:1', _create_property(), ('title', 'price'), 'hash')
+    store.set('example:1', _create_property(), ('price', ), 'new hash')
+
+    now[0] += 365 * 24 * 3600
+    assert store.get('example:1', 'https://example.com/1',
+                     fields) == (None, fields)
+    result, stored_fields, content_hashes = store.get_previous(
+        'example:1', 'https://example.com/1', fields)
+    assert (result.title, result.price) == ('Title', Decimal('100.10'))
+    assert stored_fields == ('title', 'price')
+    assert content_hashes == {'title': 'hash', 'price': 'new hash'}
+
+    assert store.purge() == 2
+    assert store.get_previous('example:1', 'https://example.com/1',
+                              fields) == (None, (), {})
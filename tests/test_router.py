@@ -0,0 +1,101 @@
+"""
+Test suite for the URL router
+"""
+import copy
+
+import pytest
+
+from booking_sites_parser import BaseSource
+from booking_sites_parser.router import SourceRouter, get_domain_prefix
+from booking_sites_parser.sources.airbnb import Airbnb
+from booking_sites_parser.sources.airbnb_plus import AirbnbPlus
+from booking_sites_parser.sources.booking import Booking
+
+
+@pytest.mark.parametrize('domain,prefix', [
+    (r'airbnb((?!plus\/).)*', 'airbnb'),
+    (r'booking.*', 'booking'),
+    (r'newsource\.com.*', 'newsource'),
+    (r'book(ing)?\.com', 'book'),
+    (r'hotels?\.com', 'hotel'),
+    (r'a?\.com', None),
+    (r'(airbnb|booking).*', None),
+    (r'airbnb|booking', None),
+])
+def test_get_domain_prefix(source: BaseSource, domain: str, prefix: str):
+    """
+    Get_domain_prefix should return the literal prefix of the domain regex
+    """
+    source.domain = domain
+    assert get_domain_prefix(source) == prefix
+
+
+def test_get_domain_prefix_custom_pattern(source: BaseSource):
+    """
+    Get_domain_prefix should return None if the URL pattern is customized
+    """
+    source.url_regex_pattern = r'^https?:\/\/.*{domain}$'
+    assert get_domain_prefix(source) is None
+
+
+def test_route():
+    """
+    Route should return the source suitable for the URL
+    """
+    airbnb, airbnb_plus, booking = Airbnb(), AirbnbPlus(), Booking()
+    router = SourceRouter([airbnb, airbnb_plus, booking])
+
+    assert router.route('https://www.airbnb.co.uk/rooms/1') is airbnb
+    assert router.route('https://airbnb.com/rooms/plus/1') is airbnb_plus
+    assert router.route('https://www.booking.com/hotel/gb/a.html') is booking
+    assert router.route('https://www.google.com/') is None
+    assert router.route('invalid_url') is None
+    assert router.get_candidates('https://www.booking.com/hotel') == [
+        booking,
+    ]
+
+
+def test_get_candidates_unique(source: BaseSource):
+    """
+    Get_candidates should not repeat a source for the longer prefixes
+    """
+    source.domain = r'airbnbx\.com.*'
+    airbnb = Airbnb()
+    router = SourceRouter([airbnb, source])
+
+    assert router.get_candidates('https://www.airbnb.co.uk/rooms/1') == [
+        airbnb,
+    ]
+    assert router.get_candidates('https://airbnbx.com/1') == [
+        airbnb,
+        source,
+    ]
+
+
+def test_route_generic_sources(source: BaseSource):
+    """
+    Route should check the sources without a domain prefix for all URLs
+    """
+    source.domain = r'(newsource|othersource)\.com.*'
+    booking = Booking()
+    router = SourceRouter([booking, source])
+
+    assert router.route('https://othersource.com/1') is source
+    assert router.get_candidates('https://www.booking.com/') == [
+        booking,
+        source,
+    ]
+
+
+def test_route_priority(source: BaseSource):
+    """
+    Route should return the matching source with the lowest priority value
+    """
+    other = copy.copy(source)
+    other.priority = -1
+    router = SourceRouter([source, other])
+    assert router.route('https://newsource.com/1') is other
+
+    other.priority = 0
+    router = SourceRouter([source, other])
+    assert router.route('https://newsource.com/1') is source
@@ -0,0 +1,84 @@
+"""
+Test suite for the serializers
+"""
+import json
+from collections import namedtuple
+from decimal import Decimal
+
+import pytest
+
+from booking_sites_parser import serializers
+from booking_sites_parser.models import Address, Property
+
+
+@pytest.fixture
+def full_property(address: Address) -> Property:
+    """
+    Returns a property with all the fields
+    """
+    result = Property('https://www.booking.com/hotel/1.html')
+    result.source_id = 'booking'
+    result.title = 'Hotel'
+    result.address = address
+    result.price = Decimal('99.90')
+    result.images = ['image']
+    facility = namedtuple('Facility', ['category', 'name'])
+    result.services = [facility('General', 'Wi-Fi'), {'id': 1, 'name': 'TV'}]
+    result.service_names = ['Wi-Fi', 'TV']
+    return result
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_encode_property(full_property: Property, use_orjson: bool):
+    """
+    Encode_property should encode the property with the typed schema
+    """
+    data = json.loads(
+        serializers.encode_property(full_property, use_orjson=use_orjson))
+    assert list(data) == [
+        'url', 'source_id', 'title', 'description', 'address', 'price',
+        'images', 'services', 'service_names', 'cancellation_policy',
+        'max_guests'
+    ]
+    assert data['price'] == '99.90'
+    assert data['address'] == {
+        'address': 'street',
+        'region': 'region',
+        'country': 'country',
+    }
+    assert data['services'] == [
+        {
+            'category': 'General',
+            'name': 'Wi-Fi'
+        },
+        {
+            'id': 1,
+            'name': 'TV'
+        },
+    ]
+
+
+def test_encoders_output(full_property: Property):
+    """
+    The orjson and json outputs should be equal
+    """
+    assert serializers.encode_properties([full_property]) == \
+        serializers.encode_properties([full_property], use_orjson=False)
+    assert serializers.dumps({'a': 1}, indent=2) == '{\n  "a": 1\n}'
+    with pytest.raises(TypeError):
+        serializers.dumps(object(), use_orjson=False)
+
+
+def test_from_dict(full_property: Property):
+    """
+    Property.from_dict should restore the encoded property
+    """
+    data = json.loads(serializers.encode_property(full_property))
+    result = Property.from_dict(data)
+    assert result.price == Decimal('99.90')
+    assert str(result.address) == 'street, region, country'
+    assert result.to_dict() == dict(
+        full_property.to_dict(),
+        services=data['services'],
+    )
+    assert Property.from_dict({'url': 'url'}).source_id is None
@@ -0,0 +1,54 @@
+"""
+Test suite for the user agents
+"""
+import subprocess
+import sys
+
+from booking_sites_parser.http_client import HttpClient
+from booking_sites_parser.user_agents import USER_AGENTS, UserAgentPool
+
+
+def test_rotation():
+    """
+    The pool should choose a user agent for each request if rotated
+    """
+    pool = UserAgentPool()
+    agents = {pool.get() for _ in range(200)}
+    assert len(agents) > 1
+    assert agents <= set(USER_AGENTS)
+
+    pool = UserAgentPool(['first', 'second'], rotate=False)
+    assert len({pool.get() for _ in range(20)}) == 1
+
+
+def test_fake_useragent_fallback(monkeypatch):
+    """
+    The pool should use the bundled user agents
+    if fake-useragent is not available
+    """
+    monkeypatch.setitem(sys.modules, 'fake_useragent', None)
+    pool = UserAgentPool(['bundled'], use_fake_useragent=True)
+    assert pool.get() == 'bundled'
+
+
+def test_lazy_import():
+    """
+    The package import should not load fake-useragent
+    """
+    code = ('import sys, booking_sites_parser; '
+            'print("fake_useragent" in sys.modules)')
+    output = subprocess.check_output([sys.executable, '-c', code])
+    assert output.strip() == b'False'
+
+
+def test_http_client_user_agent(local_server):
+    """
+    The client should send a user agent from the pool
+    """
+    url, routes = local_server
+    agents = []
+    routes['/'] = lambda request: agents.append(
+        request.headers['User-Agent']) or (200, {}, b'')
+    client = HttpClient(user_agents=UserAgentPool(['agent']))
+    client.get(url + '/')
+    assert agents == ['agent']